@@ -0,0 +1,136 @@
+import os
+import random
+import zipfile
+from dataclasses import dataclass
+
+import yaml
+
+
+@dataclass
+class CohortSpec:
+    students: int = 100
+    questions: int = 4
+    # Zipped cohorts look like a Moodle download, one archive per student that ClassroomBuilder.unzip() extracts
+    zipped: bool = True
+    # Share of zipped students whose files sit in a second archive inside the first one
+    nested_zip_share: float = 0.1
+    # Question files are placed 0..max_nesting directories deep inside the submission
+    max_nesting: int = 2
+    # Lines per submission follow a log-normal distribution around mean_file_lines
+    mean_file_lines: int = 60
+    file_lines_sigma: float = 0.6
+    # Share of (student, question) pairs without a file, and of students with an extra file that matches no question
+    missing_share: float = 0.05
+    stray_file_share: float = 0.1
+    seed: int = 0
+
+
+_NAMES = ["Ali", "Ayşe", "Mehmet", "Zeynep", "Can", "Elif", "Emre", "Selin", "Burak", "Deniz", "Mert", "Ece"]
+_SURNAMES = ["Yılmaz", "Kaya", "Demir", "Şahin", "Çelik", "Öztürk", "Aydın", "Arslan", "Doğan", "Koç"]
+
+_STATEMENTS = [
+    "{v} = {n}",
+    "{v} = {v} + {n}",
+    "{v} = [{n}, {n}, {n}]",
+    "{v} = {{'key': {n}}}",
+    "print({v})",
+    "if {v} > {n}:\n{i}    {v} = {v} - {n}",
+    "for {w} in range({n}):\n{i}    {v} += {w}",
+    "while {v} < {n}:\n{i}    {v} += 1",
+    "{v} = sorted([{w} * {n} for {w} in range({n})])",
+    "{v} = str({v}).strip()",
+]
+_VARIABLES = ["x", "y", "total", "count", "result", "values", "index", "temp", "answer", "data"]
+
+
+def _generate_code(rng: random.Random, line_count: int) -> str:
+    lines = []
+    while len(lines) < line_count:
+        lines.append(f"def solve_{len(lines)}({rng.choice(_VARIABLES)}):")
+        for _ in range(rng.randint(3, 12)):
+            statement = rng.choice(_STATEMENTS).format(v=rng.choice(_VARIABLES), w=rng.choice(_VARIABLES),
+                                                       n=rng.randint(0, 100), i="    ")
+            lines.extend("    " + line for line in statement.split("\n"))
+        lines.append(f"    return {rng.choice(_VARIABLES)}")
+        lines.append("")
+
+    return "\n".join(lines[:line_count]) + "\n"
+
+
+def _get_nesting(rng: random.Random, spec: CohortSpec) -> str:
+    return os.path.join(*[f"part{depth}" for depth in range(rng.randint(0, spec.max_nesting))], "")
+
+
+def write_settings(directory: str, spec: CohortSpec) -> str:
+    rng = random.Random(spec.seed)
+    os.makedirs(os.path.join(directory, "base_code"), exist_ok=True)
+
+    questions = []
+    for question_number in range(1, spec.questions + 1):
+        base_code_file = os.path.join("base_code", f"q{question_number:02}.py")
+        with open(os.path.join(directory, base_code_file), "w", encoding="utf-8") as f:
+            f.write(_generate_code(rng, 10))
+
+        questions.append({
+            "question": f"Question{question_number}",
+            "keys": [f"q{question_number}", f"q{question_number:02}"],
+            "grade": 25,
+            "possible_grades": [0, 10, 25],
+            "base_code_file": base_code_file
+        })
+
+    settings_file_name = os.path.join(directory, "settings.yml")
+    with open(settings_file_name, "w", encoding="utf-8") as f:
+        yaml.safe_dump({"Questions": questions}, f, allow_unicode=True)
+
+    return settings_file_name
+
+
+def generate_cohort(directory: str, spec: CohortSpec) -> tuple[str, str]:
+    # Writes <directory>/settings.yml, its base code and <directory>/submissions, returns their paths. The same spec
+    # always produces the same cohort.
+    rng = random.Random(spec.seed)
+    settings_file_name = write_settings(directory, spec)
+    submissions_directory = os.path.join(directory, "submissions")
+    os.makedirs(submissions_directory, exist_ok=True)
+
+    for student_number in range(spec.students):
+        name = rng.choice(_NAMES)
+        surname = rng.choice(_SURNAMES)
+        submission_directory = os.path.join(submissions_directory,
+                                            f"{name} {surname}_{100000 + student_number}_assignsubmission_file")
+        os.makedirs(submission_directory, exist_ok=True)
+
+        # Archive member name -> code, the member names carry the nesting
+        files = {}
+        for question_number in range(1, spec.questions + 1):
+            if rng.random() < spec.missing_share:
+                continue
+            line_count = max(1, int(rng.lognormvariate(0, spec.file_lines_sigma) * spec.mean_file_lines))
+            key = rng.choice([f"q{question_number}", f"q{question_number:02}"])
+            files[f"{_get_nesting(rng, spec)}{key}.py"] = _generate_code(rng, line_count)
+        if rng.random() < spec.stray_file_share:
+            files[f"{_get_nesting(rng, spec)}helpers.py"] = _generate_code(rng, 10)
+
+        if not spec.zipped:
+            for member_name, code in files.items():
+                path = os.path.join(submission_directory, member_name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(code)
+            continue
+
+        zip_path = os.path.join(submission_directory, "homework.zip")
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zip_file:
+            if rng.random() < spec.nested_zip_share:
+                inner_path = os.path.join(submission_directory, "inner.zip")
+                with zipfile.ZipFile(inner_path, "w", zipfile.ZIP_DEFLATED) as inner_zip_file:
+                    for member_name, code in files.items():
+                        inner_zip_file.writestr(member_name, code)
+                zip_file.write(inner_path, "homework/inner.zip")
+                os.remove(inner_path)
+            else:
+                for member_name, code in files.items():
+                    zip_file.writestr(f"homework/{member_name}", code)
+
+    return settings_file_name, submissions_directory
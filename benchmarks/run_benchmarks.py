@@ -0,0 +1,207 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import Callable
+
+from benchmarks.cohort_generator import CohortSpec, generate_cohort
+from classroom_data import ClassroomBuilder, CodeStore, save_classroom_to_json, load_classroom_from_json
+from classroom_data.classroom import write_grades_to_excel
+
+
+@dataclass
+class StageResult:
+    stage: str
+    items: int
+    # Median, fastest and slowest run of the stage in seconds
+    seconds: float
+    min_seconds: float
+    max_seconds: float
+    items_per_second: float
+    # Per student (or per submission) latency in milliseconds
+    item_latency_ms: float
+    peak_memory_mb: float
+
+
+def measure(stage: str, items: int, action: Callable[[], object], repeats: int,
+            prepare: Callable[[], None] | None = None) -> StageResult:
+    # Timings and peak memory come from separate runs, tracemalloc slows allocation heavy code down. Memory of worker
+    # processes (unzip) is not included.
+    timings = []
+    for _ in range(repeats):
+        if prepare is not None:
+            prepare()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            action()
+            timings.append(time.perf_counter() - start)
+
+    if prepare is not None:
+        prepare()
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            action()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    seconds = statistics.median(timings)
+    return StageResult(stage=stage, items=items, seconds=seconds, min_seconds=min(timings), max_seconds=max(timings),
+                       items_per_second=items / seconds if seconds > 0 else float("inf"),
+                       item_latency_ms=1000 * seconds / max(items, 1), peak_memory_mb=peak_memory / (1 << 20))
+
+
+def run_pipeline(spec: CohortSpec, repeats: int, work_directory: str) -> list[StageResult]:
+    generated_directory = os.path.join(work_directory, "generated")
+    settings_file_name, generated_submissions = generate_cohort(generated_directory, spec)
+    submissions_directory = os.path.join(work_directory, "submissions")
+    classroom_file_name = os.path.join(work_directory, "classroom.json")
+    code_store_directory = os.path.join(work_directory, "classroom_code")
+    question_names = [f"Question{question_number}" for question_number in range(1, spec.questions + 1)]
+
+    def builder() -> ClassroomBuilder:
+        return ClassroomBuilder(submissions_directory).set_settings_file(settings_file_name)
+
+    def fresh_submissions():
+        shutil.rmtree(submissions_directory, ignore_errors=True)
+        shutil.copytree(generated_submissions, submissions_directory)
+
+    def fresh_classroom_file():
+        # Every save starts from an empty code store, so the code blobs are written each time
+        for file_name in (classroom_file_name, classroom_file_name + ".journal"):
+            if os.path.exists(file_name):
+                os.remove(file_name)
+        shutil.rmtree(code_store_directory, ignore_errors=True)
+        classroom.code_store = CodeStore(code_store_directory)
+
+    results = []
+    if spec.zipped:
+        # Reading the code straight from the archives, the alternative to unzip followed by build
+        fresh_submissions()
+        results.append(measure("build_archives", spec.students,
+                               lambda: builder().set_read_archives(True).build(), repeats))
+        # Cold extracts every archive, warm finds all of them unchanged in the manifest
+        results.append(measure("unzip_cold", spec.students, lambda: builder().unzip(), repeats, fresh_submissions))
+        results.append(measure("unzip_warm", spec.students, lambda: builder().unzip(), repeats))
+    else:
+        fresh_submissions()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        classroom = builder().build()
+    results.append(measure("build", spec.students, lambda: builder().build(), repeats))
+
+    results.append(measure("save", spec.students, lambda: save_classroom_to_json(classroom, classroom_file_name),
+                           repeats, fresh_classroom_file))
+    results.append(measure("load", spec.students,
+                           lambda: load_classroom_from_json(classroom_file_name, settings_file_name), repeats))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        loaded = load_classroom_from_json(classroom_file_name, settings_file_name)
+    results.append(measure("export_xlsx", spec.students,
+                           lambda: write_grades_to_excel(loaded, os.path.join(work_directory, "grades.xlsx")),
+                           repeats))
+
+    try:
+        from moss_plag_checker.submissions import get_student_submissions
+    except ImportError as e:
+        print(f"Skipping moss_submissions, the plagiarism checker cannot be imported. Reason: {e}")
+    else:
+        # What MossAPI._get_student_submissions does for every question before uploading
+        results.append(measure("moss_submissions", spec.students * spec.questions,
+                               lambda: [get_student_submissions(loaded, question_name)
+                                        for question_name in question_names], repeats))
+
+    return results
+
+
+def compare_to_baseline(results: list[StageResult], baseline: dict, tolerance: float) -> list[str]:
+    # A stage regresses when its median time or its peak memory grows by more than tolerance
+    regressions = []
+    for result in results:
+        baseline_result = baseline["stages"].get(result.stage)
+        if baseline_result is None:
+            continue
+
+        if result.seconds > baseline_result["seconds"] * (1 + tolerance):
+            regressions.append(f"{result.stage}: {result.seconds:.3f}s, baseline {baseline_result['seconds']:.3f}s")
+        if result.peak_memory_mb > baseline_result["peak_memory_mb"] * (1 + tolerance):
+            regressions.append(f"{result.stage}: {result.peak_memory_mb:.1f} MB peak memory, "
+                               f"baseline {baseline_result['peak_memory_mb']:.1f} MB")
+
+    return regressions
+
+
+def print_results(results: list[StageResult]):
+    print(f"{'stage':<18}{'items':>8}{'median s':>11}{'min s':>9}{'max s':>9}{'items/s':>11}{'ms/item':>10}"
+          f"{'peak MB':>10}")
+    for result in results:
+        print(f"{result.stage:<18}{result.items:>8}{result.seconds:>11.3f}{result.min_seconds:>9.3f}"
+              f"{result.max_seconds:>9.3f}{result.items_per_second:>11.1f}{result.item_latency_ms:>10.3f}"
+              f"{result.peak_memory_mb:>10.1f}")
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks the ingest to export pipeline on a synthetic cohort")
+    parser.add_argument("--students", type=int, default=CohortSpec.students)
+    parser.add_argument("--questions", type=int, default=CohortSpec.questions)
+    parser.add_argument("--extracted", action="store_true", help="write plain files instead of zip archives")
+    parser.add_argument("--nested-zip-share", type=float, default=CohortSpec.nested_zip_share)
+    parser.add_argument("--max-nesting", type=int, default=CohortSpec.max_nesting)
+    parser.add_argument("--mean-file-lines", type=int, default=CohortSpec.mean_file_lines)
+    parser.add_argument("--file-lines-sigma", type=float, default=CohortSpec.file_lines_sigma)
+    parser.add_argument("--seed", type=int, default=CohortSpec.seed)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown or memory growth against the baseline, 0.25 is 25%%")
+    parser.add_argument("--work-directory", help="keep the generated cohort and outputs in this directory")
+    args = parser.parse_args(argv)
+
+    spec = CohortSpec(students=args.students, questions=args.questions, zipped=not args.extracted,
+                      nested_zip_share=args.nested_zip_share, max_nesting=args.max_nesting,
+                      mean_file_lines=args.mean_file_lines, file_lines_sigma=args.file_lines_sigma, seed=args.seed)
+
+    if args.work_directory is not None:
+        os.makedirs(args.work_directory, exist_ok=True)
+        results = run_pipeline(spec, args.repeats, args.work_directory)
+    else:
+        with tempfile.TemporaryDirectory(prefix="grading_benchmark_") as work_directory:
+            results = run_pipeline(spec, args.repeats, work_directory)
+
+    print_results(results)
+
+    report = {"spec": asdict(spec), "python": sys.version.split()[0],
+              "stages": {result.stage: asdict(result) for result in results}}
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+
+    if args.baseline is not None:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if baseline["spec"] != report["spec"]:
+            print(f"{args.baseline} was recorded for a different cohort, run with the same cohort options")
+            return 2
+
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression in {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,4 +1,14 @@
 from .question_data import *
 from .student_data import *
-from .classroom import ClassroomBuilder, Classroom, save_classroom_to_json, load_classroom_from_json
+from .code_store import CodeStore, hash_code
+from .unzipper import UnzipFailure
+from .scanner import ScanIssue, ScanReport
+from .grade_journal import GradeJournal, GradeEntry
+from .roster import RosterMatcher, RosterReport, RosterIssue, RosterEntry
+from .classroom import ClassroomBuilder, Classroom, GradeConflictError, GradeChange, RefreshReport, BuildEvent, \
+    BuildWarning, save_classroom_to_json, load_classroom_from_json
+from .grader_assignments import GraderAssignments, GraderAssignment
+from .classroom_index import ClassroomIndex
+from .ungraded_queues import UngradedQueues
+from .settings_loader import Settings, get_settings
 from . import settings_loader
@@ -0,0 +1,239 @@
+import contextlib
+import hashlib
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from classroom_data.classroom import Classroom, GradeChange
+from classroom_data.code_store import hash_code
+from classroom_data.file_utils import atomic_write
+from classroom_data.question_data.question import Question, TestCase
+from classroom_data.student_data.student import Student
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, submissions then only get the wall clock limit
+    resource = None
+
+TestResult = namedtuple("TestResult", ["name", "passed", "points", "reason"])
+
+
+@dataclass
+class AutoGradeResult:
+    code_hash: str
+    suite_hash: str
+    test_results: list[TestResult]
+    score: float
+
+    def to_json(self):
+        return {
+            "code_hash": self.code_hash,
+            "suite_hash": self.suite_hash,
+            "test_results": [test_result._asdict() for test_result in self.test_results],
+            "score": self.score
+        }
+
+    @staticmethod
+    def from_json(data: dict) -> "AutoGradeResult":
+        return AutoGradeResult(code_hash=data["code_hash"], suite_hash=data["suite_hash"],
+                               test_results=[TestResult(**test_result) for test_result in data["test_results"]],
+                               score=data["score"])
+
+
+def get_suite_hash(question: Question) -> str:
+    # Changing a test or a limit invalidates the cached results of the question
+    suite = {"tests": [test.to_json() for test in question.tests], "grade": question.grade,
+             "time_limit": question.time_limit, "memory_limit": question.memory_limit}
+    return hashlib.sha256(json.dumps(suite, sort_keys=True).encode()).hexdigest()
+
+
+def get_test_points(question: Question, test: TestCase) -> float:
+    # Tests without points share the grade of the question equally
+    return test.points if test.points is not None else question.grade / len(question.tests)
+
+
+def get_suggested_grade(question: Question, result: AutoGradeResult) -> float:
+    # The highest possible grade the score reaches
+    return max((grade for grade in question.possible_grades if grade <= result.score + 1e-9),
+               default=min(question.possible_grades))
+
+
+def _normalize_output(output: str) -> list[str]:
+    # Trailing spaces and trailing empty lines do not fail a test
+    lines = [line.rstrip() for line in output.replace("\r\n", "\n").split("\n")]
+    while lines and lines[-1] == "":
+        lines.pop()
+    return lines
+
+
+# Sets the limits in the child and then replaces it with the submission. preexec_fn is not safe in the threads
+# AutoGrader runs the tests from, the wrapper does the same in the child after it started.
+_LIMIT_RESOURCES = """
+import os, resource, sys
+cpu_seconds, memory_bytes = int(sys.argv[1]), int(sys.argv[2])
+resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+os.execv(sys.executable, [sys.executable, "-I", sys.argv[3]])
+"""
+
+
+def _get_command(file_name: str, time_limit: float, memory_limit: int) -> list[str]:
+    if resource is None:
+        return [sys.executable, "-I", file_name]
+
+    cpu_seconds = max(1, int(time_limit + 0.999))
+    return [sys.executable, "-I", "-c", _LIMIT_RESOURCES, str(cpu_seconds), str(memory_limit * 1024 * 1024),
+            file_name]
+
+
+def run_test(file_name: str, test: TestCase, time_limit: float, memory_limit: int) -> tuple[bool, str]:
+    # Runs in a fresh isolated interpreter in its own empty directory, which is also its home and temp directory, with
+    # CPU time and memory limits and a wall clock timeout for submissions that sleep or wait for input. The
+    # submission runs in its own process group, so processes it started are killed with it.
+    with tempfile.TemporaryDirectory(prefix="auto_test_") as work_dir:
+        env = {"PATH": os.environ.get("PATH", ""), "PYTHONIOENCODING": "utf-8", "HOME": work_dir, "TMPDIR": work_dir,
+               "TEMP": work_dir, "TMP": work_dir}
+        process = subprocess.Popen(_get_command(file_name, time_limit, memory_limit), stdin=subprocess.PIPE,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=work_dir, env=env,
+                                   start_new_session=True)
+        try:
+            stdout, stderr = process.communicate(test.input.encode("utf-8"), timeout=time_limit * 2 + 1)
+        except subprocess.TimeoutExpired:
+            return False, "Wall clock time limit exceeded"
+        finally:
+            # Also ends what the submission left running in the background
+            _kill(process)
+
+    if process.returncode != 0:
+        if process.returncode in (-9, -24):
+            return False, "CPU time limit exceeded"
+        error_lines = stderr.decode("utf-8", errors="replace").strip().splitlines()
+        return False, error_lines[-1] if error_lines else f"Exited with code {process.returncode}"
+
+    if _normalize_output(stdout.decode("utf-8", errors="replace")) != _normalize_output(test.output):
+        return False, "Wrong output"
+
+    return True, ""
+
+
+def _kill(process: subprocess.Popen):
+    if hasattr(os, "killpg"):
+        with contextlib.suppress(ProcessLookupError, PermissionError):
+            os.killpg(process.pid, signal.SIGKILL)
+    else:
+        process.kill()
+    process.wait()
+
+
+def grade_code(question: Question, code: str) -> AutoGradeResult:
+    code_hash = hash_code(code)
+    suite_hash = get_suite_hash(question)
+    if code.strip() == "":
+        return AutoGradeResult(code_hash=code_hash, suite_hash=suite_hash, score=0,
+                               test_results=[TestResult(name=test.name, passed=False, points=0,
+                                                        reason="No submission") for test in question.tests])
+
+    test_results = []
+    with tempfile.TemporaryDirectory(prefix="auto_grade_") as temp_dir:
+        file_name = os.path.join(temp_dir, "submission.py")
+        with open(file_name, "w", encoding="utf-8") as f:
+            f.write(code)
+
+        for test in question.tests:
+            passed, reason = run_test(file_name, test, question.time_limit, question.memory_limit)
+            test_results.append(TestResult(name=test.name, passed=passed,
+                                           points=get_test_points(question, test) if passed else 0, reason=reason))
+
+    return AutoGradeResult(code_hash=code_hash, suite_hash=suite_hash, test_results=test_results,
+                           score=sum(test_result.points for test_result in test_results))
+
+
+# Runs the tests of a question from settings.yml against every submission. Each submission runs in its own subprocess,
+# as many at a time as there are cores, and results are cached on disk by (code hash, test suite hash), so identical
+# submissions and later runs with unchanged tests are not executed again.
+class AutoGrader:
+    cache_directory: str
+    _workers: int | None
+    # Results already read from or written to the cache directory, a result never changes once it exists
+    _results: dict[tuple[str, str], AutoGradeResult]
+
+    def __init__(self, cache_directory: str = "auto_grade_cache", workers: int | None = None):
+        self.cache_directory = cache_directory
+        self._workers = workers
+        self._results = {}
+        os.makedirs(cache_directory, exist_ok=True)
+
+    def grade_question(self, students: list[Student], question: Question) -> list[tuple[Student, AutoGradeResult]]:
+        if not question.tests:
+            raise ValueError(f"Question {question.question} has no tests in the settings")
+
+        suite_hash = get_suite_hash(question)
+        codes = {}
+        for student in students:
+            code = student.question_info[question.question_id].code
+            codes.setdefault(hash_code(code), code)
+
+        results = {}
+        missing = []
+        for code_hash, code in codes.items():
+            result = self._read_cache(code_hash, suite_hash)
+            if result is not None:
+                results[code_hash] = result
+            else:
+                missing.append(code)
+
+        # Threads only wait for the subprocesses, the submissions themselves run in parallel on all cores
+        with ThreadPoolExecutor(max_workers=self._workers or os.cpu_count() or 1) as executor:
+            for result in executor.map(lambda code: grade_code(question, code), missing):
+                self._write_cache(result)
+                results[result.code_hash] = result
+
+        return [(student, results[hash_code(student.question_info[question.question_id].code)])
+                for student in students]
+
+    def prefill_grades(self, classroom: Classroom, question: Question,
+                       results: list[tuple[Student, AutoGradeResult]]) -> int:
+        # Suggestions only go to submissions nobody graded or suggested a grade for yet, even in another grading
+        # process, and stay marked as not graded until a grader confirms. They are written at once.
+        with classroom.lock():
+            classroom.sync()
+            changes = [GradeChange(student=student, question=question.question,
+                                   grade=get_suggested_grade(question, result), is_graded=False)
+                       for student, result in results
+                       if not student.is_graded[question.question]
+                       and classroom.get_version(student, question.question) == 0]
+            return classroom.set_grade_changes(changes)
+
+    def get_cached_result(self, question: Question, code: str) -> AutoGradeResult | None:
+        return self._read_cache(hash_code(code), get_suite_hash(question))
+
+    def _read_cache(self, code_hash: str, suite_hash: str) -> AutoGradeResult | None:
+        result = self._results.get((code_hash, suite_hash))
+        if result is not None:
+            return result
+
+        path = self._cache_path(code_hash, suite_hash)
+        if not os.path.exists(path):
+            return None
+
+        with open(path, "r") as f:
+            result = AutoGradeResult.from_json(json.load(f))
+        self._results[(code_hash, suite_hash)] = result
+        return result
+
+    def _write_cache(self, result: AutoGradeResult):
+        path = self._cache_path(result.code_hash, result.suite_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with atomic_write(path, fsync=False) as f:
+            json.dump(result.to_json(), f)
+        self._results[(result.code_hash, result.suite_hash)] = result
+
+    def _cache_path(self, code_hash: str, suite_hash: str) -> str:
+        return os.path.join(self.cache_directory, suite_hash[:16], code_hash[:2], code_hash + ".json")
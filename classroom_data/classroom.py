@@ -1,21 +1,294 @@
+import contextlib
+import itertools
 import json
 import os
-import zipfile
-from collections import namedtuple
-from dataclasses import dataclass
-from typing import Callable, Self, List
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Self, TYPE_CHECKING
 
 from classroom_data import StudentQuestionInfo, Question, settings_loader
+from classroom_data.code_store import CodeStore
+from classroom_data.file_utils import atomic_write
+from classroom_data.grade_journal import GradeJournal, GradeEntry
+from classroom_data.instrumentation import count, instrumented, timed
+from classroom_data.roster import RosterMatcher, RosterReport
+from classroom_data.settings_loader import DEFAULT_SETTINGS_FILE, Settings
+from classroom_data.scanner import QuestionMatcher, ScanIssue, ScanReport, SubmissionScanner, fingerprint_files, \
+    list_student_directories, read_files, read_submission_files, scan_python_files, scan_student_directories
 from classroom_data.student_data.student import Student
+from classroom_data.ungraded_queues import UngradedQueues
+from classroom_data.unzipper import UnzipFailure, extract_archives
+
+if TYPE_CHECKING:
+    from classroom_data.grade_matrix import GradeMatrix
+
+
+# One cell for Classroom.set_grade_changes
+GradeChange = namedtuple("GradeChange", ["student", "question", "grade", "is_graded"])
+
+
+class GradeConflictError(Exception):
+    # Raised when a grade changed since the grader loaded it, entry is the change that got there first
+    student: Student
+    question_name: str
+    entry: GradeEntry
+
+    def __init__(self, student: Student, question_name: str, entry: GradeEntry):
+        super().__init__(f"Grade of {student.name} {student.surname} for {question_name} was changed to "
+                         f"{entry.grade} by {entry.grader or 'another grader'}")
+        self.student = student
+        self.question_name = question_name
+        self.entry = entry
 
 
 @dataclass
 class Classroom:
     students: list[Student]
+    grade_journal: GradeJournal | None = field(default=None, repr=False, compare=False)
+    code_store: CodeStore | None = field(default=None, repr=False, compare=False)
+    grade_matrix: "GradeMatrix | None" = field(default=None, repr=False, compare=False)
+    ungraded_queues: UngradedQueues | None = field(default=None, repr=False, compare=False)
+    settings_file_name: str = DEFAULT_SETTINGS_FILE
+    settings: Settings | None = field(default=None, repr=False, compare=False)
+    _rejected_settings: Settings | None = field(default=None, init=False, repr=False, compare=False)
+    # Latest change of every (student number, question) cell, its version is what optimistic updates compare against
+    grade_entries: dict[tuple, GradeEntry] = field(default_factory=dict, repr=False, compare=False)
+    # Journal entries of students this classroom does not have (yet), carried over into the next journal on compaction
+    _unknown_entries: dict[tuple, GradeEntry] = field(default_factory=dict, init=False, repr=False, compare=False)
+    # Increased whenever students are added or their code changes, so lookup tables know when to rebuild
+    structure_version: int = field(default=0, repr=False, compare=False)
+
+    def get_questions(self) -> list[Question]:
+        # Picks up edits of the settings file while the app runs. Grades, tests and base code can change in place,
+        # adding, removing or reordering questions needs a rebuild since student data is stored in question order.
+        settings = settings_loader.get_settings(self.settings_file_name)
+        if settings is self.settings or settings is self._rejected_settings:
+            return self.settings.questions
+
+        if self.settings is not None and \
+                [question.question for question in settings.questions] != \
+                [question.question for question in self.settings.questions]:
+            print(f"Questions in {settings.file_name} were added, removed or reordered, "
+                  f"rebuild the classroom to use them")
+            self._rejected_settings = settings
+            return self.settings.questions
+
+        for student in self.students:
+            for q_info in student.question_info:
+                q_info.question = settings.questions[q_info.question.question_id]
+        self.settings = settings
+        self.grade_matrix = None
+        return settings.questions
 
     def to_json(self):
         return [student.to_json() for student in self.students]
 
+    def to_index_json(self, code_store_path: str, generation: int = 0):
+        return {
+            "version": 2,
+            "generation": generation,
+            "code_store": code_store_path,
+            "questions": [question.to_json() for question in self.get_questions()],
+            "students": [student.to_index_json(self.code_store) for student in self.students],
+            "grade_entries": [entry._asdict() for entry in self.grade_entries.values() if entry.version > 0]
+        }
+
+    def get_version(self, student: Student, question_name: str) -> int:
+        entry = self.grade_entries.get((student.student_number, question_name))
+        return 0 if entry is None else entry.version
+
+    def set_grade(self, student: Student, question_name: str, grade: float, is_graded: bool,
+                  expected_version: int | None = None, grader: str | None = None) -> bool:
+        expected_versions = None if expected_version is None else [expected_version]
+        return self.set_grades([student], question_name, grade, is_graded, expected_versions, grader) > 0
+
+    def set_grades(self, students: list[Student], question_name: str, grade: float, is_graded: bool,
+                   expected_versions: list[int] | None = None, grader: str | None = None) -> int:
+        # Grades a group of students (e.g. a cluster of identical submissions) the same
+        changes = [GradeChange(student=student, question=question_name, grade=grade, is_graded=is_graded)
+                   for student in students]
+        return self.set_grade_changes(changes, expected_versions, grader)
+
+    def set_grade_changes(self, changes: list[GradeChange], expected_versions: list[int] | None = None,
+                          grader: str | None = None) -> int:
+        # Every grade change goes through here and is written with a single journal write, returns how many cells
+        # changed. With expected_versions nothing is written if another grader changed one of the cells since those
+        # versions were read, GradeConflictError tells which one. A cell that already holds the requested grade is not
+        # a conflict, whoever wrote it.
+        with self.lock():
+            self.sync()
+
+            if expected_versions is not None:
+                for change, expected_version in zip(changes, expected_versions):
+                    if self.get_version(change.student, change.question) != expected_version \
+                            and not self._holds(change):
+                        raise GradeConflictError(change.student, change.question,
+                                                 self.grade_entries[(change.student.student_number, change.question)])
+
+            entries = []
+            for change in changes:
+                if self._holds(change):
+                    continue
+
+                student, question_name, grade, is_graded = change
+                q_info = student.get_question_info(question_name)
+                q_info.grade = grade
+                student.is_graded[question_name] = is_graded
+                entry = GradeEntry(student_number=student.student_number, question=question_name, grade=grade,
+                                   is_graded=is_graded, version=self.get_version(student, question_name) + 1,
+                                   grader=grader)
+                self.grade_entries[(student.student_number, question_name)] = entry
+                entries.append(entry)
+
+                if self.grade_matrix is not None:
+                    self.grade_matrix.set(student, q_info.question.question_id, grade, is_graded)
+                if self.ungraded_queues is not None:
+                    self.ungraded_queues.mark(student, question_name, is_graded)
+
+            if self.grade_journal is not None and entries:
+                self.grade_journal.append_many(entries)
+                if self.grade_journal.needs_compaction():
+                    save_classroom_to_json(self, self.grade_journal.snapshot_file_name)
+
+        return len(entries)
+
+    @staticmethod
+    def _holds(change: GradeChange) -> bool:
+        return change.student.get_question_info(change.question).grade == change.grade \
+            and change.student.is_graded[change.question] == change.is_graded
+
+    def sync(self) -> bool:
+        # Applies the changes other grading processes journaled since the last sync, without reading the snapshot
+        # again unless the journal was compacted in the meantime. Returns whether anything was applied.
+        if self.grade_journal is None:
+            return False
+
+        entries = self.grade_journal.read_new()
+        count("classroom.sync")
+        if entries is None:
+            count("classroom.sync.snapshot_reloads")
+            with self.grade_journal.lock():
+                with open(self.grade_journal.snapshot_file_name, "r") as f:
+                    data = json.load(f)
+                self._merge_snapshot_students(data)
+                self.apply_grade_entries(get_snapshot_grade_entries(data) + self.grade_journal.read())
+            return True
+
+        if entries:
+            self.apply_grade_entries(entries)
+        return bool(entries)
+
+    def lock(self):
+        # Keeps other grading processes from writing grades or compacting, reentrant
+        return self.grade_journal.lock() if self.grade_journal is not None else contextlib.nullcontext()
+
+    def _merge_snapshot_students(self, data: dict | list):
+        # Another grading process compacted, possibly after a rescan. Its new students and changed code are taken over
+        # before its grades are applied, so a later compaction by this process does not write them away again.
+        snapshot_file_name = self.grade_journal.snapshot_file_name
+        code_store = None if isinstance(data, list) else _get_code_store(snapshot_file_name, data, self.code_store)
+        snapshot_students = _load_students(data if isinstance(data, list) else data["students"],
+                                           self.get_questions(), code_store)
+
+        students_by_number = {student.student_number: student for student in self.students}
+        added = changed = False
+        for snapshot_student in snapshot_students:
+            student = students_by_number.get(snapshot_student.student_number)
+            if student is None:
+                self.students.append(snapshot_student)
+                added = True
+                continue
+
+            for question_id, (q_info, snapshot_q_info) in enumerate(zip(student.question_info,
+                                                                        snapshot_student.question_info)):
+                is_same_code = snapshot_q_info.code_hash == q_info.code_hash if snapshot_q_info.code_hash is not None \
+                    else snapshot_q_info.code == q_info.code
+                if not is_same_code:
+                    student.question_info[question_id] = snapshot_q_info
+                    changed = True
+            student.fingerprint = snapshot_student.fingerprint
+
+        if added:
+            self.grade_matrix = None
+            self.ungraded_queues = None
+        if added or changed:
+            self.structure_version += 1
+
+    def apply_grade_entries(self, entries: list[GradeEntry]):
+        students_by_number = {student.student_number: student for student in self.students}
+        for entry in entries:
+            student = students_by_number.get(entry.student_number)
+            q_info = None if student is None else student.get_question_info(entry.question)
+            if q_info is None:
+                if (entry.student_number, entry.question) not in self._unknown_entries:
+                    print(f"Keeping journal entry for unknown student {entry.student_number} / question "
+                          f"{entry.question} aside")
+                self._unknown_entries[(entry.student_number, entry.question)] = entry
+                continue
+
+            self._unknown_entries.pop((entry.student_number, entry.question), None)
+
+            q_info.grade = entry.grade
+            student.is_graded[entry.question] = entry.is_graded
+            self.grade_entries[(entry.student_number, entry.question)] = entry
+            # Only the changed cells are updated, syncing a few remote grades does not rebuild the matrix
+            if self.grade_matrix is not None:
+                self.grade_matrix.set(student, q_info.question.question_id, entry.grade, entry.is_graded)
+            if self.ungraded_queues is not None:
+                self.ungraded_queues.mark(student, entry.question, entry.is_graded)
+
+    def get_ungraded_queues(self) -> UngradedQueues:
+        # Built on first use, grade changes keep it up to date afterwards
+        if self.ungraded_queues is None:
+            self.ungraded_queues = UngradedQueues(self.students,
+                                                  [question.question for question in self.get_questions()])
+        return self.ungraded_queues
+
+    def get_grade_matrix(self) -> "GradeMatrix":
+        # Imported here so numpy is only needed once statistics are asked for
+        from classroom_data.grade_matrix import GradeMatrix
+
+        if self.grade_matrix is None:
+            self.grade_matrix = GradeMatrix(self.students, self.get_questions())
+        return self.grade_matrix
+
+
+@dataclass
+class RefreshReport:
+    added: list[Student] = field(default_factory=list)
+    regrade: list[tuple[Student, str]] = field(default_factory=list)
+    missing: list[Student] = field(default_factory=list)
+
+    def has_changes(self) -> bool:
+        return bool(self.added or self.regrade)
+
+
+# kind is "missing_submission", "unreadable_archive", a ScanIssue kind ("unmatched", "multiple_questions",
+# "multiple_files") or "roster_unmatched" / "roster_ambiguous"
+BuildWarning = namedtuple("BuildWarning", ["kind", "student", "questions", "file_paths", "message"])
+# What ClassroomBuilder.iter_students() yields for every submission directory
+BuildEvent = namedtuple("BuildEvent", ["student", "warnings"])
+
+# Warnings build() prints, scan issues and unreadable archives are only collected in scan_report and unzip_failures
+_PRINTED_WARNING_KINDS = ("missing_submission", "roster_unmatched", "roster_ambiguous")
+# How many submissions iter_students() scans and reads ahead of the student it yields
+_PARSE_AHEAD = 64
+
+_ParsedSubmission = namedtuple("_ParsedSubmission", ["submission_directory", "assignment", "codes", "fingerprint",
+                                                     "scan_issues", "unzip_failures"])
+
+
+def _describe_scan_issue(student: Student, issue: ScanIssue) -> str:
+    if issue.kind == "unmatched":
+        problem = f"{issue.file_paths[0]} matches no question"
+    elif issue.kind == "multiple_questions":
+        problem = f"{issue.file_paths[0]} matches questions {', '.join(issue.questions)}"
+    else:
+        problem = f"several files match {issue.questions[0]}, using {issue.file_paths[0]}"
+
+    return f"Student {student.name} {student.surname}: {problem}"
+
 
 StudentInformation = namedtuple("StudentInformation", ["name", "surname", "student_number", "submission_directory"])
 NameFormatter = Callable[[str], StudentInformation]
@@ -32,90 +305,306 @@ def _default_name_formatter(path: str) -> StudentInformation:
 class ClassroomBuilder:
     directory: str
     _name_formatter: NameFormatter
+    _settings_file_name: str
+    _settings: Settings | None
     _questions: list[Question]
+    _question_ids: dict[str, int]
+    _code_store: CodeStore | None
+    _unzip_workers: int | None
+    _read_workers: int | None
+    _read_archives: bool
+    _roster: RosterMatcher | None
+    unzip_failures: list[UnzipFailure]
+    scan_report: ScanReport
+    refresh_report: RefreshReport
+    roster_report: RosterReport
 
     def __init__(self, directory: str):
         self.directory = directory
         self._name_formatter = _default_name_formatter
-        self._questions = settings_loader.questions
+        self._settings_file_name = DEFAULT_SETTINGS_FILE
+        self._settings = None
+        self._code_store = None
+        self._unzip_workers = None
+        self._read_workers = None
+        self._read_archives = False
+        self._roster = None
+        self.unzip_failures = []
+        self.scan_report = ScanReport()
+        self.refresh_report = RefreshReport()
+        self.roster_report = RosterReport()
 
     def set_name_formatter(self, name_formatter: NameFormatter) -> Self:
         self._name_formatter = name_formatter
         return self
 
-    def unzip(self) -> Self:
-        for root, dirs, files in os.walk(self.directory):
-            for file in files:
-                if file.endswith(".zip"):
-                    zip_path = os.path.join(root, file)
-                    extract_dir = os.path.join(root, f"extracted_{file[:-4]}")
-                    try:
-                        os.makedirs(extract_dir, exist_ok=True)
-                        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                            zip_ref.extractall(extract_dir)
-                    except Exception as e:
-                        print(f"Failed to unzip {file}. Reason: {e}")
+    def set_settings_file(self, settings_file_name: str) -> Self:
+        self._settings_file_name = settings_file_name
+        self._settings = None
         return self
 
-    def build(self) -> Classroom:
-        def get_all_student_submission_paths() -> list[str]:
-            student_submission_paths = []
-            for name in os.listdir(self.directory):
-                full_path = os.path.join(self.directory, name)
-                if os.path.isdir(full_path):
-                    student_submission_paths.append(full_path)
+    def set_code_store(self, code_store: CodeStore) -> Self:
+        self._code_store = code_store
+        return self
+
+    def set_unzip_workers(self, workers: int | None) -> Self:
+        # None uses one worker process per CPU
+        self._unzip_workers = workers
+        return self
 
-            return student_submission_paths
+    def set_read_workers(self, workers: int | None) -> Self:
+        # None lets the thread pool pick its default size
+        self._read_workers = workers
+        return self
 
-        student_submission_dirs = get_all_student_submission_paths()
+    def set_read_archives(self, read_archives: bool) -> Self:
+        # Reads the .py files of submitted zip archives straight from the archives instead of the folders unzip()
+        # extracts, archives that cannot be read end up in unzip_failures
+        self._read_archives = read_archives
+        return self
 
-        students = []
-        for student_submission_dir in student_submission_dirs:
-            student_information = self._name_formatter(student_submission_dir)
-
-            q_info = self._get_student_question_info_list(student_submission_dir)
-            students.append(Student(
-                name=student_information.name,
-                surname=student_information.surname,
-                student_number=student_information.student_number,
-                submission_directory=student_information.submission_directory,
-                question_info=q_info,
-                is_graded={q_info.question.question: False for q_info in q_info}
-            ))
-
-        for student in students:
-            for q_info in student.question_info:
-                if q_info.code == "":
-                    print(f"Student {student.name} {student.surname} did not submit a file for question {q_info.question.question}")
+    def set_roster(self, roster: RosterMatcher | None) -> Self:
+        # Names and student numbers of matched students are taken from the roster instead of the folder name
+        self._roster = roster
+        return self
 
-        return Classroom(students=students)
+    @instrumented("builder.unzip")
+    def unzip(self) -> Self:
+        # Archives listed as unchanged in the manifest are skipped, nested archives are extracted as well
+        self.unzip_failures = extract_archives(self.directory, self._unzip_workers)
+        count("builder.unzip_failures", len(self.unzip_failures))
+        return self
 
-    def _get_student_question_info_list(self, submission_directory: str) -> list[StudentQuestionInfo]:
-        def get_submission_files() -> List[str]:
-            submission_files = []
-            for root, dirs, files in os.walk(submission_directory):
-                for file in files:
+    @instrumented("builder.build")
+    def build(self) -> Classroom:
+        students = []
+        for event in self.iter_students():
+            students.append(event.student)
+            for warning in event.warnings:
+                if warning.kind in _PRINTED_WARNING_KINDS:
+                    print(warning.message)
+
+        return Classroom(students=students, code_store=self._code_store,
+                         settings_file_name=self._settings_file_name, settings=self._settings)
+
+    def iter_students(self) -> Iterator[BuildEvent]:
+        # Yields the students one by one in submission directory order, each as soon as its submission is parsed, while
+        # a thread pool scans and reads the next submissions. scan_report, roster_report and (with set_read_archives)
+        # unzip_failures fill up as the students are yielded.
+        self._load_settings()
+        self.scan_report = ScanReport()
+        self.roster_report = RosterReport()
+        if self._read_archives:
+            self.unzip_failures = []
+        matcher = QuestionMatcher(self._questions)
+        submission_dirs = iter(list_student_directories(self.directory))
+
+        executor = ThreadPoolExecutor(max_workers=self._read_workers)
+        try:
+            pending = deque(executor.submit(self._parse_submission, student_submission_dir, matcher)
+                            for student_submission_dir in itertools.islice(submission_dirs, _PARSE_AHEAD))
+            while pending:
+                parsed = pending.popleft().result()
+                for student_submission_dir in itertools.islice(submission_dirs, 1):
+                    pending.append(executor.submit(self._parse_submission, student_submission_dir, matcher))
+
+                yield self._create_build_event(parsed)
+        finally:
+            # A consumer that stops early does not wait for submissions nobody will look at
+            executor.shutdown(cancel_futures=True)
+
+    @instrumented("builder.refresh")
+    def refresh(self, classroom: Classroom) -> Classroom:
+        # New and changed submissions are matched against the questions the classroom currently uses
+        classroom.get_questions()
+        self._settings_file_name = classroom.settings_file_name
+        self._settings = classroom.settings
+        self._load_settings()
+
+        # Only students whose submission files changed since the last build or refresh are matched and read again
+        submission_files = self._scan_student_directories()
+        fingerprints = {student_submission_dir: fingerprint_files(student_submission_dir, files)
+                        for student_submission_dir, files in submission_files.items()}
+
+        students_by_dir = {student.submission_directory: student for student in classroom.students}
+        changed_dirs = [student_submission_dir for student_submission_dir, fingerprint in fingerprints.items()
+                        if student_submission_dir not in students_by_dir
+                        or students_by_dir[student_submission_dir].fingerprint != fingerprint]
+
+        scanner = SubmissionScanner(self._questions)
+        assignments = {student_submission_dir: scanner.assign(student_submission_dir,
+                                                              submission_files[student_submission_dir])
+                       for student_submission_dir in changed_dirs}
+        self.scan_report = scanner.report
+
+        matched_files = {file for assignment in assignments.values()
+                         for file in assignment.values() if file is not None}
+        codes = read_files(sorted(matched_files), self._read_workers)
+
+        report = RefreshReport()
+        regrade_changes = []
+        for student_submission_dir, assignment in assignments.items():
+            student = students_by_dir.get(student_submission_dir)
+            if student is None:
+                student = self._create_student(student_submission_dir, assignment, codes,
+                                               fingerprints[student_submission_dir])
+                classroom.students.append(student)
+                report.added.append(student)
+                continue
+
+            # Grades are kept, but code that changed has to be looked at again
+            for q_info in self._create_question_info_list(assignment, codes):
+                old_q_info = student.question_info[q_info.question.question_id]
+                if old_q_info.code == q_info.code:
+                    continue
+
+                old_q_info.code = q_info.code
+                old_q_info.file_path = q_info.file_path
+                regrade_changes.append(GradeChange(student=student, question=q_info.question.question,
+                                                   grade=old_q_info.grade, is_graded=False))
+
+                report.regrade.append((student, q_info.question.question))
+                print(f"Submission of {student.name} {student.surname} for question {q_info.question.question} "
+                      f"changed, marked as not graded")
+
+            student.fingerprint = fingerprints[student_submission_dir]
+
+        # Journaled like any other grade change, so the flag survives a restart and reaches the other graders
+        classroom.set_grade_changes(regrade_changes)
+
+        self.roster_report = RosterReport()
+        for warning in self._apply_roster(report.added):
+            print(warning.message)
+        if report.added:
+            # Journal entries parked for students this classroom did not have yet, e.g. graded by another process or
+            # left in an older journal. The lookup structures do not know the new students, they are rebuilt later.
+            classroom.grade_matrix = None
+            classroom.ungraded_queues = None
+            classroom.apply_grade_entries(list(classroom._unknown_entries.values()))
+        report.missing = [student for student in classroom.students if student.submission_directory not in fingerprints]
+        if report.has_changes():
+            classroom.grade_matrix = None
+            classroom.ungraded_queues = None
+            classroom.structure_version += 1
+
+        self.refresh_report = report
+        return classroom
+
+    def _apply_roster(self, students: list[Student]) -> list[BuildWarning]:
+        if self._roster is None:
+            return []
+
+        report = self._roster.match_students(students)
+        self.roster_report.matches.extend(report.matches)
+        self.roster_report.issues.extend(report.issues)
+        for student, entry in report.matches:
+            student.name = entry.name
+            student.surname = entry.surname
+            student.student_number = entry.student_number
+
+        warnings = []
+        for issue in report.issues:
+            candidates = ", ".join(f"{c.entry.name} {c.entry.surname} ({c.entry.student_number})"
+                                   for c in issue.candidates)
+            message = f"Student {issue.student.name} {issue.student.surname} is {issue.kind} in the roster" \
+                + (f": {candidates}" if candidates else "")
+            warnings.append(BuildWarning(kind=f"roster_{issue.kind}", student=issue.student, questions=[],
+                                         file_paths=[], message=message))
+        return warnings
+
+    def _parse_submission(self, submission_directory: str, matcher: QuestionMatcher) -> _ParsedSubmission:
+        # Runs on the iter_students() thread pool, everything shared with other submissions is only read
+        unzip_failures = []
+        with timed("builder.scan"):
+            file_paths = scan_python_files(submission_directory, self._read_archives, unzip_failures)
+
+        with timed("builder.match"):
+            scanner = SubmissionScanner(self._questions, matcher)
+            assignment = scanner.assign(submission_directory, file_paths)
+
+        with timed("builder.read"):
+            codes = read_submission_files(sorted({file for file in assignment.values() if file is not None}))
+        count("builder.files_read", len(codes))
+
+        return _ParsedSubmission(submission_directory=submission_directory, assignment=assignment, codes=codes,
+                                 fingerprint=fingerprint_files(submission_directory, file_paths),
+                                 scan_issues=scanner.report.issues, unzip_failures=unzip_failures)
+
+    def _create_build_event(self, parsed: _ParsedSubmission) -> BuildEvent:
+        student = self._create_student(parsed.submission_directory, parsed.assignment, parsed.codes,
+                                       parsed.fingerprint)
+        self.scan_report.issues.extend(parsed.scan_issues)
+        self.unzip_failures.extend(parsed.unzip_failures)
+        count("builder.students")
+        count("builder.unzip_failures", len(parsed.unzip_failures))
+
+        warnings = [BuildWarning(kind="unreadable_archive", student=student, questions=[],
+                                 file_paths=[failure.zip_path],
+                                 message=f"Could not read {failure.zip_path}. Reason: {failure.reason}")
+                    for failure in parsed.unzip_failures]
+        warnings.extend(BuildWarning(kind=issue.kind, student=student, questions=issue.questions,
+                                     file_paths=issue.file_paths, message=_describe_scan_issue(student, issue))
+                        for issue in parsed.scan_issues)
+        # The roster may rename the student, so it is applied before the remaining warnings are worded
+        warnings.extend(self._apply_roster([student]))
+        warnings.extend(BuildWarning(kind="missing_submission", student=student, questions=[q_info.question.question],
+                                     file_paths=[],
+                                     message=f"Student {student.name} {student.surname} did not submit a file for "
+                                             f"question {q_info.question.question}")
+                        for q_info in student.question_info if q_info.code == "")
+
+        return BuildEvent(student=student, warnings=warnings)
+
+    def _create_student(self, student_submission_dir: str, assignment: dict[str, str | None], codes: dict[str, str],
+                        fingerprint: str) -> Student:
+        student_information = self._name_formatter(student_submission_dir)
+
+        q_info = self._create_question_info_list(assignment, codes)
+        return Student(
+            name=student_information.name,
+            surname=student_information.surname,
+            student_number=student_information.student_number,
+            submission_directory=student_information.submission_directory,
+            question_info=q_info,
+            is_graded={q_info.question.question: False for q_info in q_info},
+            fingerprint=fingerprint,
+            question_ids=self._question_ids
+        )
 
-                    if "macos" in root.lower():
-                        continue
+    def _load_settings(self):
+        # Settings are read when the first classroom is built, all students of a build share one question id table
+        if self._settings is None:
+            self._settings = settings_loader.get_settings(self._settings_file_name)
+        self._questions = self._settings.questions
+        self._question_ids = {question.question: question.question_id for question in self._questions}
 
-                    if file.endswith(".py"):
-                        submission_files.append(os.path.join(root, file))
+    def _scan_student_directories(self) -> dict[str, list[str]]:
+        if not self._read_archives:
+            return scan_student_directories(self.directory)
 
-            return submission_files
+        self.unzip_failures = []
+        submission_files = scan_student_directories(self.directory, True, self.unzip_failures)
+        count("builder.unzip_failures", len(self.unzip_failures))
+        return submission_files
 
-        submission_files = get_submission_files()
+    def _get_student_question_info_list(self, submission_directory: str) -> list[StudentQuestionInfo]:
+        self._load_settings()
+        parsed = self._parse_submission(submission_directory, QuestionMatcher(self._questions))
+        self.scan_report.issues.extend(parsed.scan_issues)
+        self.unzip_failures.extend(parsed.unzip_failures)
+        return self._create_question_info_list(parsed.assignment, parsed.codes)
+
+    def _create_question_info_list(self, assignment: dict[str, str | None],
+                                   codes: dict[str, str]) -> list[StudentQuestionInfo]:
         question_info_list = []
 
         for question in self._questions:
-            respective_submission_file = next((file for file in submission_files
-                                               if any(key in file.lower() for key in question.keys)), None)
+            respective_submission_file = assignment[question.question]
 
             if respective_submission_file is None:
                 code = ""
             else:
-                with open(respective_submission_file, "r", encoding="utf-8") as f:
-                    code = f.read()
+                code = codes[respective_submission_file]
 
             question_info = StudentQuestionInfo(
                 question=question,
@@ -128,33 +617,104 @@ class ClassroomBuilder:
         return question_info_list
 
 
-def save_classroom_to_json(classroom: Classroom, file_name: str):
-    data = [student.to_json() for student in classroom.students]
-    with open(file_name, "w") as f:
-        # noinspection PyTypeChecker
-        json.dump(data, f, indent=4)
-
-
-def load_classroom_from_json(file_name: str) -> Classroom:
-    def get_student_q_info_json(student_json: dict, question: Question) -> dict:
-        return next(
-            (info for info in student_json["question_info"] if info["question"]["question"] == question.question), None)
-
-    with open(file_name, "r") as f:
-        data = json.load(f)
+@instrumented("classroom.save")
+def save_classroom_to_json(classroom: Classroom, file_name: str, inline_code: bool = False):
+    # Saving over the snapshot of the journal folds every journaled change into it, including the ones other grading
+    # processes made, and starts the journal of the next generation. The journal lock keeps other processes from
+    # writing or loading in between, and syncing first takes over students and code another process saved.
+    journal = classroom.grade_journal
+    is_snapshot = journal is not None and os.path.abspath(journal.snapshot_file_name) == os.path.abspath(file_name)
+
+    with journal.lock() if is_snapshot else contextlib.nullcontext():
+        if is_snapshot:
+            classroom.sync()
+        generation = journal.generation + 1 if is_snapshot else 0
+
+        # With a code store the file is a small index that refers to code blobs by hash, otherwise code is inlined.
+        # inline_code writes the self-contained legacy format even with a code store, e.g. to hand the classroom to
+        # tools that do not know the code store.
+        if classroom.code_store is not None and not inline_code:
+            code_store_path = os.path.relpath(classroom.code_store.directory,
+                                              os.path.dirname(os.path.abspath(file_name)))
+            data = classroom.to_index_json(code_store_path, generation)
+            indent = None
+        else:
+            data = classroom.to_json()
+            indent = 4
+
+        # A crash mid-write never leaves a truncated classroom.json behind
+        with timed("classroom.save.write"), atomic_write(file_name) as f:
+            # noinspection PyTypeChecker
+            json.dump(data, f, indent=indent)
+
+        if is_snapshot:
+            journal.reset(generation)
+            # Entries of students that are in neither this classroom nor the snapshot are not dropped
+            if classroom._unknown_entries:
+                journal.append_many(list(classroom._unknown_entries.values()))
+
+
+def get_snapshot_grade_entries(data: dict | list) -> list[GradeEntry]:
+    # The grades of every cell of a loaded classroom.json, with the versions of the cells that were changed
+    student_jsons = data if isinstance(data, list) else data["students"]
+    entries = {}
+    for student_json in student_jsons:
+        for info in student_json["question_info"]:
+            question_name = info["question"]["question"] if isinstance(info["question"], dict) else info["question"]
+            entries[(student_json["student_number"], question_name)] = GradeEntry(
+                student_number=student_json["student_number"], question=question_name, grade=info["grade"],
+                is_graded=student_json["is_graded"][question_name])
+
+    if isinstance(data, dict):
+        for entry_json in data.get("grade_entries", []):
+            entry = GradeEntry(**entry_json)
+            if (entry.student_number, entry.question) in entries:
+                entries[(entry.student_number, entry.question)] = entry
+
+    return list(entries.values())
+
+
+def _get_code_store(file_name: str, data: dict, code_store: CodeStore | None = None) -> CodeStore:
+    # The code store of an index file, code_store is reused if it is the same one
+    directory = os.path.join(os.path.dirname(os.path.abspath(file_name)), data["code_store"])
+    if code_store is not None and os.path.abspath(code_store.directory) == os.path.abspath(directory):
+        return code_store
+    return CodeStore(directory)
+
+
+def _load_students(student_jsons: list[dict], questions: list[Question],
+                   code_store: CodeStore | None) -> list[Student]:
+    def get_q_info_jsons_by_question(student_json: dict) -> dict[str, dict]:
+        # Legacy files embed the whole question, index files only its name
+        return {info["question"]["question"] if isinstance(info["question"], dict) else info["question"]: info
+                for info in student_json["question_info"]}
+
+    question_ids = {question.question: question.question_id for question in questions}
 
     students = []
-    for student_json in data:
+    for student_json in student_jsons:
+        q_info_jsons = get_q_info_jsons_by_question(student_json)
         question_info = []
-        for question in settings_loader.questions:
-            q_info_json = get_student_q_info_json(student_json, question)
+        for question in questions:
+            q_info_json = q_info_jsons[question.question]
+            if code_store is None:
+                q_info = StudentQuestionInfo(
+                    question=question,
+                    code=q_info_json["code"],
+                    grade=q_info_json["grade"],
+                    file_path=q_info_json["file_path"]
+                )
+            else:
+                q_info = StudentQuestionInfo(
+                    question=question,
+                    code=None,
+                    grade=q_info_json["grade"],
+                    file_path=q_info_json["file_path"],
+                    code_hash=q_info_json["code_hash"],
+                    code_store=code_store
+                )
 
-            question_info.append(StudentQuestionInfo(
-                question=question,
-                code=q_info_json["code"],
-                grade=q_info_json["grade"],
-                file_path=q_info_json["file_path"]
-            ))
+            question_info.append(q_info)
 
         student = Student(
             name=student_json["name"],
@@ -162,27 +722,46 @@ def load_classroom_from_json(file_name: str) -> Classroom:
             student_number=student_json["student_number"],
             submission_directory=student_json["submission_directory"],
             question_info=question_info,
-            is_graded=student_json["is_graded"]
+            is_graded=student_json["is_graded"],
+            fingerprint=student_json.get("fingerprint", ""),
+            question_ids=question_ids
         )
         students.append(student)
 
-    return Classroom(students=students)
+    return students
 
-def write_grades_to_excel(classroom: Classroom, file_name: str):
-    import pandas as pd
 
-    datas = {
-    }
-    for question in settings_loader.questions:
-        data = []
-        for student in classroom.students:
-            q_info = next(info for info in student.question_info if info.question.question == question.question)
-            data.append([student.name, student.surname, student.student_number, q_info.grade, student.is_graded[question.question]])
+@instrumented("classroom.load")
+def load_classroom_from_json(file_name: str, settings_file_name: str = DEFAULT_SETTINGS_FILE) -> Classroom:
+    # The snapshot and the journal are read under the journal lock, so a compaction by another grading process
+    # cannot happen in between
+    grade_journal = GradeJournal(file_name)
+    with grade_journal.lock():
+        with timed("classroom.load.read"), open(file_name, "r") as f:
+            data = json.load(f)
+
+        if isinstance(data, dict):
+            grade_journal.generation = data.get("generation", 0)
+        snapshot_entries = [entry for entry in get_snapshot_grade_entries(data) if entry.version > 0]
+        journal_entries = grade_journal.read()
+
+    # classroom.json is either a list of students with inlined code or an index referring to a code store
+    if isinstance(data, list):
+        student_jsons = data
+        code_store = None
+    else:
+        student_jsons = data["students"]
+        code_store = _get_code_store(file_name, data)
 
-        df = pd.DataFrame(data, columns=["Name", "Surname", "Student Number", "Grade", "Is Graded"])
-        datas[question.question] = df
+    settings = settings_loader.get_settings(settings_file_name)
+    students = _load_students(student_jsons, settings.questions, code_store)
 
-    with pd.ExcelWriter(file_name) as writer:
-        for key in datas:
-            datas[key].to_excel(writer, sheet_name=key, index=False)
+    classroom = Classroom(students=students, grade_journal=grade_journal, code_store=code_store,
+                          settings_file_name=settings_file_name, settings=settings)
+    classroom.apply_grade_entries(snapshot_entries + journal_entries)
+    return classroom
+
+def write_grades_to_excel(classroom: Classroom, file_name: str):
+    from classroom_data.grade_export import export_grades
 
+    export_grades(classroom, file_name, "xlsx")
@@ -0,0 +1,54 @@
+from classroom_data.classroom import Classroom
+from classroom_data.student_data.student import Student
+from classroom_data.student_data.student_question_info import StudentQuestionInfo
+
+
+def get_display_name(student: Student) -> str:
+    return f"{student.name} {student.surname}"
+
+
+# Lookup tables over a classroom so the grader does not scan the student list on every rerun. Call rebuild() after
+# students are added to the classroom.
+class ClassroomIndex:
+    classroom: Classroom
+    display_names: list[str]
+    _students_by_display_name: dict[str, Student]
+    _display_names_by_student: dict[int, str]
+    _question_info: dict[tuple[int, str], StudentQuestionInfo]
+    _students_by_question: dict[str, list[Student]]
+
+    def __init__(self, classroom: Classroom):
+        self.classroom = classroom
+        self.rebuild()
+
+    def rebuild(self):
+        self._students_by_display_name = {}
+        for student in self.classroom.students:
+            display_name = get_display_name(student)
+            # Two students with the same name are told apart by their student numbers
+            if display_name in self._students_by_display_name:
+                display_name = f"{display_name} ({student.student_number})"
+            self._students_by_display_name[display_name] = student
+
+        self.display_names = list(self._students_by_display_name)
+        self._display_names_by_student = {id(student): display_name
+                                          for display_name, student in self._students_by_display_name.items()}
+
+        self._question_info = {}
+        self._students_by_question = {}
+        for student in self.classroom.students:
+            for info in student.question_info:
+                self._question_info[(id(student), info.question.question)] = info
+                self._students_by_question.setdefault(info.question.question, []).append(student)
+
+    def get_student(self, display_name: str) -> Student:
+        return self._students_by_display_name[display_name]
+
+    def get_display_name(self, student: Student) -> str:
+        return self._display_names_by_student[id(student)]
+
+    def get_question_info(self, student: Student, question_name: str) -> StudentQuestionInfo:
+        return self._question_info[(id(student), question_name)]
+
+    def get_students(self, question_name: str) -> list[Student]:
+        return self._students_by_question.get(question_name, [])
@@ -0,0 +1,103 @@
+import io
+import tokenize
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+from classroom_data.code_store import hash_code
+from classroom_data.question_data.question import Question
+from classroom_data.student_data.student import Student
+
+_SKIPPED_TOKENS = {tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT,
+                   tokenize.ENCODING, tokenize.ENDMARKER}
+
+
+@dataclass
+class SubmissionCluster:
+    question: Question
+    representative: Student
+    # Includes the representative, members are in the order of the students passed to cluster_submissions
+    members: list[Student] = field(default_factory=list)
+    # Similarity of every member to the representative, 1.0 for code that only differs in comments and layout
+    similarities: dict[int, float] = field(default_factory=dict)
+
+    def is_exact(self) -> bool:
+        return all(similarity == 1.0 for similarity in self.similarities.values())
+
+    def similarity(self, student: Student) -> float:
+        return self.similarities[id(student)]
+
+
+def normalize_tokens(code: str) -> tuple[str, ...]:
+    # Comments, blank lines and indentation width do not change what a submission does, identifiers and literals do,
+    # so they are kept as they are
+    tokens = []
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(code).readline):
+            if token.type not in _SKIPPED_TOKENS:
+                tokens.append(token.string)
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        # Broken code is compared as its raw lines
+        return tuple(line.strip() for line in code.splitlines() if line.strip())
+
+    return tuple(tokens)
+
+
+def get_shingles(tokens: tuple[str, ...], shingle_size: int) -> set[int]:
+    if len(tokens) <= shingle_size:
+        return {hash(tokens)}
+    return {hash(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)}
+
+
+def cluster_submissions(students: list[Student], question: Question, threshold: float = 0.9,
+                        shingle_size: int = 4) -> list[SubmissionCluster]:
+    # Submissions are grouped by exact hash first, then by normalized tokens. The largest groups become cluster
+    # representatives and every other group joins the representative it shares the most token shingles with, if the
+    # Jaccard similarity reaches threshold. Only representatives sharing a shingle are compared, through an inverted
+    # index, and every member is similar to its representative rather than just to some other member.
+    by_hash = defaultdict(list)
+    for student in students:
+        q_info = student.question_info[question.question_id]
+        by_hash[q_info.code_hash or hash_code(q_info.code)].append(student)
+
+    by_tokens = defaultdict(list)
+    for hash_students in by_hash.values():
+        tokens = normalize_tokens(hash_students[0].question_info[question.question_id].code)
+        by_tokens[tokens].extend(hash_students)
+
+    groups = sorted(by_tokens.items(), key=lambda item: len(item[1]), reverse=True)
+
+    clusters = []
+    cluster_shingles = []
+    shingle_index = defaultdict(list)
+    for tokens, group_students in groups:
+        shingles = get_shingles(tokens, shingle_size)
+
+        shared_counts = Counter()
+        for shingle in shingles:
+            shared_counts.update(shingle_index.get(shingle, ()))
+
+        best_cluster, best_similarity = None, 0.0
+        for cluster_id, shared_count in shared_counts.items():
+            similarity = shared_count / (len(shingles) + len(cluster_shingles[cluster_id]) - shared_count)
+            if similarity > best_similarity:
+                best_cluster, best_similarity = cluster_id, similarity
+
+        if best_cluster is not None and best_similarity >= threshold:
+            cluster = clusters[best_cluster]
+            cluster.members.extend(group_students)
+            cluster.similarities.update({id(student): best_similarity for student in group_students})
+            continue
+
+        clusters.append(SubmissionCluster(question=question, representative=group_students[0],
+                                          members=list(group_students),
+                                          similarities={id(student): 1.0 for student in group_students}))
+        cluster_shingles.append(shingles)
+        for shingle in shingles:
+            shingle_index[shingle].append(len(clusters) - 1)
+
+    order = {id(student): i for i, student in enumerate(students)}
+    for cluster in clusters:
+        cluster.members.sort(key=lambda student: order[id(student)])
+
+    clusters.sort(key=lambda cluster: len(cluster.members), reverse=True)
+    return clusters
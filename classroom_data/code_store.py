@@ -0,0 +1,49 @@
+import functools
+import hashlib
+import os
+
+from classroom_data.file_utils import atomic_write
+from classroom_data.instrumentation import count
+
+
+def hash_code(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+# Content addressed storage for submission code. Identical submissions (e.g. untouched base code) share one blob and
+# reads go through a bounded LRU cache, so only the code that is actually looked at is kept in memory.
+class CodeStore:
+    directory: str
+    cache_size: int
+
+    def __init__(self, directory: str, cache_size: int = 256):
+        self.directory = directory
+        self.cache_size = cache_size
+        os.makedirs(directory, exist_ok=True)
+        self.get = functools.lru_cache(maxsize=cache_size)(self._read)
+
+    def __getstate__(self):
+        return {"directory": self.directory, "cache_size": self.cache_size}
+
+    def __setstate__(self, state):
+        self.__init__(state["directory"], state["cache_size"])
+
+    def put(self, code: str) -> str:
+        code_hash = hash_code(code)
+        path = self._blob_path(code_hash)
+        if not os.path.exists(path):
+            count("code_store.writes")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with atomic_write(path, encoding="utf-8", newline="") as f:
+                f.write(code)
+
+        return code_hash
+
+    def _read(self, code_hash: str) -> str:
+        # Only cache misses get here
+        count("code_store.reads")
+        with open(self._blob_path(code_hash), "r", encoding="utf-8", newline="") as f:
+            return f.read()
+
+    def _blob_path(self, code_hash: str) -> str:
+        return os.path.join(self.directory, code_hash[:2], code_hash)
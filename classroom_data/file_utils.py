@@ -0,0 +1,24 @@
+import contextlib
+import os
+import threading
+
+
+@contextlib.contextmanager
+def atomic_write(file_name: str, mode: str = "w", encoding: str | None = None, newline: str | None = None,
+                 fsync: bool = True):
+    # Writes to a temporary file next to file_name and moves it over file_name once the block finishes, so readers
+    # (and a crash) only ever see the old or the new content. Every process and thread gets its own temporary file,
+    # several of them can write the same file at once and the last one wins. fsync=False is for caches that can be
+    # recomputed.
+    temp_file_name = f"{file_name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_file_name, mode, encoding=encoding, newline=newline) as f:
+            yield f
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        os.replace(temp_file_name, file_name)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp_file_name)
+        raise
@@ -0,0 +1,132 @@
+import csv
+import os
+from typing import Iterator
+
+from classroom_data.classroom import Classroom
+from classroom_data.question_data.question import Question
+
+QUESTION_COLUMNS = ["Name", "Surname", "Student Number", "Grade", "Is Graded"]
+PARQUET_BATCH_SIZE = 10_000
+
+# A single classroom is exported as is, several sections are passed as {section name: classroom} and get a Section
+# column. Rows are produced one at a time straight from the students, so memory use does not grow with the cohort.
+Sections = Classroom | dict[str, Classroom]
+
+
+def _get_sections(sections: Sections) -> dict[str | None, Classroom]:
+    return sections if isinstance(sections, dict) else {None: sections}
+
+
+def iter_question_rows(sections: Sections, question: Question) -> Iterator[list]:
+    for section_name, classroom in _get_sections(sections).items():
+        for student in classroom.students:
+            q_info = student.question_info[question.question_id]
+            row = [student.name, student.surname, student.student_number, q_info.grade,
+                   student.is_graded[question.question]]
+            yield row if section_name is None else [section_name] + row
+
+
+def iter_total_rows(sections: Sections, questions: list[Question]) -> Iterator[list]:
+    for section_name, classroom in _get_sections(sections).items():
+        for student in classroom.students:
+            grades = [student.question_info[question.question_id].grade for question in questions]
+            row = [student.name, student.surname, student.student_number] + grades + [sum(grades)]
+            yield row if section_name is None else [section_name] + row
+
+
+def get_question_columns(sections: Sections) -> list[str]:
+    return QUESTION_COLUMNS if not isinstance(sections, dict) else ["Section"] + QUESTION_COLUMNS
+
+
+def get_total_columns(sections: Sections, questions: list[Question]) -> list[str]:
+    columns = ["Name", "Surname", "Student Number"] + [question.question for question in questions] + ["Total"]
+    return columns if not isinstance(sections, dict) else ["Section"] + columns
+
+
+def export_grades(sections: Sections, file_name: str, file_format: str | None = None):
+    # The format defaults to the file extension: xlsx, csv or parquet
+    file_format = file_format or os.path.splitext(file_name)[1].lstrip(".").lower()
+    # Sections of one export share their questions
+    questions = next(iter(_get_sections(sections).values())).get_questions()
+
+    if file_format == "xlsx":
+        _export_excel(sections, questions, file_name)
+    elif file_format == "csv":
+        _export_csv(sections, questions, file_name)
+    elif file_format == "parquet":
+        _export_parquet(sections, questions, file_name)
+    else:
+        raise ValueError(f"Unknown export format {file_format}, expected xlsx, csv or parquet")
+
+
+def _get_table_file_names(questions: list[Question], file_name: str) -> dict[str, str]:
+    # Formats without sheets write one file per question plus one for the totals, next to file_name
+    stem, extension = os.path.splitext(file_name)
+    file_names = {question.question: f"{stem}_{question.question}{extension}" for question in questions}
+    file_names["Totals"] = f"{stem}_totals{extension}"
+    return file_names
+
+
+def _iter_tables(sections: Sections, questions: list[Question]) -> Iterator[tuple[str, list[str], Iterator[list]]]:
+    for question in questions:
+        yield question.question, get_question_columns(sections), iter_question_rows(sections, question)
+    yield "Totals", get_total_columns(sections, questions), iter_total_rows(sections, questions)
+
+
+def _export_excel(sections: Sections, questions: list[Question], file_name: str):
+    from openpyxl import Workbook
+
+    # Write-only workbooks flush rows as they are appended instead of keeping every cell in memory
+    workbook = Workbook(write_only=True)
+    for table_name, columns, rows in _iter_tables(sections, questions):
+        worksheet = workbook.create_sheet(title=table_name[:31])
+        worksheet.append(columns)
+        for row in rows:
+            worksheet.append(row)
+
+    workbook.save(file_name)
+
+
+def _export_csv(sections: Sections, questions: list[Question], file_name: str):
+    table_file_names = _get_table_file_names(questions, file_name)
+    for table_name, columns, rows in _iter_tables(sections, questions):
+        with open(table_file_names[table_name], "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(rows)
+
+
+def _export_parquet(sections: Sections, questions: list[Question], file_name: str):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    def get_type(column: str) -> pa.DataType:
+        if column == "Is Graded":
+            return pa.bool_()
+        if column in ("Section", "Name", "Surname", "Student Number"):
+            return pa.string()
+        return pa.float64()
+
+    def write_batch(writer: pq.ParquetWriter, columns: list[str], batch: list[list]):
+        arrays = []
+        for i, column in enumerate(columns):
+            values = [row[i] for row in batch]
+            if get_type(column) == pa.string():
+                values = [None if value is None else str(value) for value in values]
+            arrays.append(pa.array(values, type=get_type(column)))
+        writer.write_table(pa.Table.from_arrays(arrays, schema=writer.schema))
+
+    table_file_names = _get_table_file_names(questions, file_name)
+    for table_name, columns, rows in _iter_tables(sections, questions):
+        schema = pa.schema([(column, get_type(column)) for column in columns])
+        with pq.ParquetWriter(table_file_names[table_name], schema) as writer:
+            # Rows are written in fixed size batches, only one batch is held in memory at a time
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) == PARQUET_BATCH_SIZE:
+                    write_batch(writer, columns, batch)
+                    batch = []
+
+            if batch:
+                write_batch(writer, columns, batch)
@@ -0,0 +1,171 @@
+import contextlib
+import json
+import os
+import threading
+from collections import namedtuple
+
+from classroom_data.file_utils import atomic_write
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, the journal is then only safe for a single grading process
+    fcntl = None
+
+# version counts the changes of one (student, question) cell, grader is the name of whoever made the change
+GradeEntry = namedtuple("GradeEntry", ["student_number", "question", "grade", "is_graded", "version", "grader"],
+                        defaults=[0, None])
+
+
+# Append-only log of grade changes made on top of a classroom.json snapshot. Every change is a single fsync'ed line,
+# so a crash loses at most the line being written. Entries hold absolute values, which makes replaying an entry that
+# is already part of the snapshot harmless.
+#
+# Several grading processes can share one journal. Writers hold an exclusive flock on a lock file next to the snapshot,
+# readers follow the journal from the byte offset they have read up to. The first line holds a generation number that
+# compaction increases, which tells readers that the journal was folded into a new snapshot.
+class GradeJournal:
+    file_name: str
+    snapshot_file_name: str
+    lock_file_name: str
+    compact_every: int
+    entry_count: int
+    generation: int
+    offset: int
+    _thread_lock: threading.RLock
+    _lock_depth: int
+    _lock_file: object | None
+
+    def __init__(self, snapshot_file_name: str, compact_every: int = 500):
+        self.snapshot_file_name = snapshot_file_name
+        self.file_name = snapshot_file_name + ".journal"
+        self.lock_file_name = snapshot_file_name + ".lock"
+        self.compact_every = compact_every
+        self.entry_count = 0
+        self.generation = 0
+        self.offset = 0
+        self._thread_lock = threading.RLock()
+        self._lock_depth = 0
+        self._lock_file = None
+
+    @contextlib.contextmanager
+    def lock(self):
+        # Reentrant, so compaction can run while a grade change holds the lock
+        with self._thread_lock:
+            if self._lock_depth == 0 and fcntl is not None:
+                self._lock_file = open(self.lock_file_name, "a")
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and self._lock_file is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                    self._lock_file.close()
+                    self._lock_file = None
+
+    def append(self, entry: GradeEntry):
+        self.append_many([entry])
+
+    def append_many(self, entries: list[GradeEntry]):
+        # All entries go out in one write and one fsync. Callers read the entries of other graders first (read_new),
+        # so the offset stays at the end of everything this process has seen.
+        with self.lock():
+            lines = "".join(json.dumps(entry._asdict()) + "\n" for entry in entries)
+            if not os.path.exists(self.file_name):
+                lines = self._header() + lines
+
+            with open(self.file_name, "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+                self.offset = f.tell()
+            self.entry_count += len(entries)
+
+    def read(self) -> list[GradeEntry]:
+        with self.lock():
+            if not os.path.exists(self.file_name):
+                self.entry_count = 0
+                self.offset = 0
+                return []
+
+            with open(self.file_name, "rb") as f:
+                data = f.read()
+
+            # A crash can leave a partially written last line behind. Drop it so the next append starts on a fresh
+            # line.
+            valid_length = data.rfind(b"\n") + 1
+            if valid_length != len(data):
+                with open(self.file_name, "r+b") as f:
+                    f.truncate(valid_length)
+
+            lines = data[:valid_length].splitlines()
+            generation = self._parse_header(lines[0]) if lines else None
+            if generation is not None:
+                self.generation = generation
+                lines = lines[1:]
+
+            entries = self._parse_entries(lines)
+            self.entry_count = len(entries)
+            self.offset = valid_length
+            return entries
+
+    def read_new(self) -> list[GradeEntry] | None:
+        # Entries appended by other processes since the last read, or None once the journal was compacted into a new
+        # snapshot, in which case the snapshot has to be read again
+        with self._thread_lock:
+            if not os.path.exists(self.file_name):
+                return [] if self.offset == 0 else None
+
+            with open(self.file_name, "rb") as f:
+                generation = self._parse_header(f.readline())
+                if (generation if generation is not None else 0) != self.generation:
+                    return None
+
+                # The journal may have been created by another process since this one last looked at it
+                self.offset = max(self.offset, f.tell() if generation is not None else 0)
+                f.seek(self.offset)
+                data = f.read()
+
+            # A line that is still being written is picked up by the next read
+            valid_length = data.rfind(b"\n") + 1
+            entries = self._parse_entries(data[:valid_length].splitlines())
+            self.entry_count += len(entries)
+            self.offset += valid_length
+            return entries
+
+    def needs_compaction(self) -> bool:
+        return self.entry_count >= self.compact_every
+
+    def reset(self, generation: int):
+        # Starts an empty journal for the snapshot of the given generation
+        with self.lock():
+            self.generation = generation
+            with atomic_write(self.file_name, encoding="utf-8") as f:
+                f.write(self._header())
+                self.offset = f.tell()
+            self.entry_count = 0
+
+    def clear(self):
+        self.reset(self.generation + 1)
+
+    def _header(self) -> str:
+        return json.dumps({"generation": self.generation}) + "\n"
+
+    def _parse_header(self, line: bytes) -> int | None:
+        try:
+            data = json.loads(line)
+        except ValueError:
+            return None
+        return data["generation"] if isinstance(data, dict) and "generation" in data else None
+
+    def _parse_entries(self, lines: list[bytes]) -> list[GradeEntry]:
+        entries = []
+        for line in lines:
+            try:
+                entries.append(GradeEntry(**json.loads(line)))
+            except (ValueError, TypeError) as e:
+                print(f"Skipping corrupt journal entry {line!r}. Reason: {e}")
+
+        return entries
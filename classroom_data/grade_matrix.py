@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from classroom_data.question_data.question import Question
+from classroom_data.student_data.student import Student
+
+
+@dataclass
+class QuestionStatistics:
+    question_names: list[str]
+    graded_count: np.ndarray
+    mean: np.ndarray
+    std: np.ndarray
+    min: np.ndarray
+    max: np.ndarray
+
+
+# Students x questions view of the grades of a classroom. Rows follow classroom.students, columns follow question ids.
+# Classroom.set_grade keeps an attached matrix up to date, so statistics never walk the student objects again.
+class GradeMatrix:
+    questions: list[Question]
+    grades: np.ndarray
+    graded: np.ndarray
+    _rows: dict[int, int]
+
+    def __init__(self, students: list[Student], questions: list[Question]):
+        self.questions = questions
+        self.grades = np.array([[info.grade for info in student.question_info] for student in students],
+                               dtype=float).reshape(len(students), len(questions))
+        self.graded = np.array([[student.is_graded[question.question] for question in questions]
+                                for student in students], dtype=bool).reshape(len(students), len(questions))
+        self._rows = {id(student): row for row, student in enumerate(students)}
+
+    def set(self, student: Student, question_id: int, grade: float, is_graded: bool):
+        row = self._rows[id(student)]
+        self.grades[row, question_id] = grade
+        self.graded[row, question_id] = is_graded
+
+    def totals(self) -> np.ndarray:
+        return self.grades.sum(axis=1)
+
+    def progress(self) -> np.ndarray:
+        # Fraction of graded students per question
+        if len(self.graded) == 0:
+            return np.zeros(len(self.questions))
+        return self.graded.mean(axis=0)
+
+    def statistics(self) -> QuestionStatistics:
+        # Only graded cells count, ungraded ones still hold their default grade
+        graded_count = self.graded.sum(axis=0)
+        has_grades = graded_count > 0
+        graded_grades = np.where(self.graded, self.grades, 0.0)
+
+        mean = np.divide(graded_grades.sum(axis=0), graded_count, out=np.full(len(self.questions), np.nan),
+                         where=has_grades)
+        mean_of_squares = np.divide((graded_grades ** 2).sum(axis=0), graded_count,
+                                    out=np.full(len(self.questions), np.nan), where=has_grades)
+        std = np.sqrt(np.maximum(mean_of_squares - mean ** 2, 0.0))
+
+        minimum = np.where(has_grades, np.where(self.graded, self.grades, np.inf).min(axis=0, initial=np.inf), np.nan)
+        maximum = np.where(has_grades, np.where(self.graded, self.grades, -np.inf).max(axis=0, initial=-np.inf),
+                           np.nan)
+
+        return QuestionStatistics(question_names=[question.question for question in self.questions],
+                                  graded_count=graded_count, mean=mean, std=std, min=minimum, max=maximum)
+
+    def distribution(self, question_id: int) -> tuple[np.ndarray, np.ndarray]:
+        # Number of graded students per possible grade of the question
+        possible_grades = np.asarray(self.questions[question_id].possible_grades, dtype=float)
+        column = self.grades[self.graded[:, question_id], question_id]
+        counts = (column[:, None] == possible_grades[None, :]).sum(axis=0)
+        return possible_grades, counts
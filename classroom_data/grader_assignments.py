@@ -0,0 +1,67 @@
+import json
+import os
+from dataclasses import dataclass, field
+
+from classroom_data.file_utils import atomic_write
+from classroom_data.student_data.student import Student
+
+
+@dataclass
+class GraderAssignment:
+    # Empty sets assign every question / every student
+    questions: set[str] = field(default_factory=set)
+    student_numbers: set = field(default_factory=set)
+
+    def to_json(self):
+        return {
+            "questions": sorted(self.questions),
+            "student_numbers": sorted(self.student_numbers, key=str)
+        }
+
+    @staticmethod
+    def from_json(data: dict) -> "GraderAssignment":
+        return GraderAssignment(questions=set(data["questions"]), student_numbers=set(data["student_numbers"]))
+
+
+# Which grader works on which students and questions, so several graders can work through one classroom without
+# stepping on each other. Graders without an assignment see everything.
+@dataclass
+class GraderAssignments:
+    assignments: dict[str, GraderAssignment] = field(default_factory=dict)
+
+    def assign(self, grader: str, questions: list[str] | None = None, student_numbers: list | None = None):
+        self.assignments[grader] = GraderAssignment(questions=set(questions or []),
+                                                    student_numbers=set(student_numbers or []))
+
+    def is_assigned(self, grader: str, student: Student, question_name: str) -> bool:
+        assignment = self.assignments.get(grader)
+        if assignment is None:
+            return True
+
+        return (not assignment.questions or question_name in assignment.questions) and \
+            (not assignment.student_numbers or student.student_number in assignment.student_numbers)
+
+    def get_students(self, grader: str, question_name: str, students: list[Student]) -> list[Student]:
+        return [student for student in students if self.is_assigned(grader, student, question_name)]
+
+    def split_students(self, graders: list[str], students: list[Student], questions: list[str] | None = None):
+        # Deals the students out to the graders in turn, every grader gets the same number of students give or take one
+        for i, grader in enumerate(graders):
+            self.assign(grader, questions, [student.student_number for student in students[i::len(graders)]])
+
+    def to_json(self):
+        return {grader: assignment.to_json() for grader, assignment in self.assignments.items()}
+
+    def save(self, file_name: str):
+        with atomic_write(file_name) as f:
+            json.dump(self.to_json(), f, indent=4)
+
+    @staticmethod
+    def load(file_name: str) -> "GraderAssignments":
+        if not os.path.exists(file_name):
+            return GraderAssignments()
+
+        with open(file_name, "r") as f:
+            data = json.load(f)
+        return GraderAssignments({grader: GraderAssignment.from_json(assignment)
+                                  for grader, assignment in data.items()})
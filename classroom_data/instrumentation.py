@@ -0,0 +1,144 @@
+import atexit
+import contextlib
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, asdict
+
+from classroom_data.file_utils import atomic_write
+
+# Instrumentation is off unless GRADING_INSTRUMENTATION is set. While off, timed() hands out one shared no-op context
+# manager, count() returns right away and instrumented() leaves functions undecorated, so the hooks cost next to nothing.
+ENABLED = os.getenv("GRADING_INSTRUMENTATION", "") not in ("", "0")
+# Where the metrics are written at exit (and after every grading page rerun), .prom files in the Prometheus textfile
+# format, anything else as JSON
+METRICS_FILE = os.getenv("GRADING_METRICS_FILE", "grading_metrics.json")
+
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+@dataclass
+class TimerStats:
+    count: int = 0
+    total_seconds: float = 0.0
+    min_seconds: float = float("inf")
+    max_seconds: float = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total_seconds += seconds
+        self.min_seconds = min(self.min_seconds, seconds)
+        self.max_seconds = max(self.max_seconds, seconds)
+
+
+class Metrics:
+    timers: dict[str, TimerStats]
+    counters: dict[str, int]
+    _lock: threading.Lock
+
+    def __init__(self):
+        self.timers = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add_time(self, name: str, seconds: float):
+        with self._lock:
+            self.timers.setdefault(name, TimerStats()).add(seconds)
+
+    def add_count(self, name: str, value: int):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_json(self):
+        with self._lock:
+            return {
+                "timers": {name: asdict(stats) for name, stats in sorted(self.timers.items())},
+                "counters": dict(sorted(self.counters.items()))
+            }
+
+    def to_prometheus(self) -> str:
+        data = self.to_json()
+        lines = ["# TYPE grading_timer_seconds summary"]
+        for name, stats in data["timers"].items():
+            lines.append(f'grading_timer_seconds_count{{name="{name}"}} {stats["count"]}')
+            lines.append(f'grading_timer_seconds_sum{{name="{name}"}} {stats["total_seconds"]:.6f}')
+        lines.append("# TYPE grading_timer_max_seconds gauge")
+        for name, stats in data["timers"].items():
+            lines.append(f'grading_timer_max_seconds{{name="{name}"}} {stats["max_seconds"]:.6f}')
+        lines.append("# TYPE grading_counter_total counter")
+        for name, value in data["counters"].items():
+            lines.append(f'grading_counter_total{{name="{name}"}} {value}')
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self.timers.clear()
+            self.counters.clear()
+
+
+metrics = Metrics()
+
+
+@contextlib.contextmanager
+def _timer(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_time(name, time.perf_counter() - start)
+
+
+def timed(name: str):
+    return _timer(name) if ENABLED else _NULL_CONTEXT
+
+
+def count(name: str, value: int = 1):
+    if ENABLED:
+        metrics.add_count(name, value)
+
+
+def instrumented(name: str):
+    def decorator(function):
+        if not ENABLED:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with _timer(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextlib.contextmanager
+def profile(file_name: str):
+    # Dumps a cProfile of the block, open it with python -m pstats or snakeviz
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(os.path.dirname(os.path.abspath(file_name)), exist_ok=True)
+        profiler.dump_stats(file_name)
+
+
+def write_metrics(file_name: str = METRICS_FILE):
+    if file_name.endswith(".prom"):
+        data = metrics.to_prometheus()
+    else:
+        data = json.dumps(metrics.to_json(), indent=4)
+
+    # node_exporter may read the textfile at any time, so it is replaced atomically
+    with atomic_write(file_name, fsync=False) as f:
+        f.write(data)
+
+
+if ENABLED:
+    atexit.register(write_metrics)
@@ -1 +1 @@
-from .question import Question
+from .question import Question, TestCase
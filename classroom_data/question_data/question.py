@@ -1,13 +1,35 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
-@dataclass
+@dataclass(slots=True)
+class TestCase:
+    name: str
+    input: str
+    output: str
+    points: float | None = None
+
+    def to_json(self):
+        return {
+            "name": self.name,
+            "input": self.input,
+            "output": self.output,
+            "points": self.points
+        }
+
+
+@dataclass(slots=True)
 class Question:
     question: str
     keys: list[str]
     possible_grades: list[float]
     grade: float
     base_code: str
+    # Position of the question in the settings, per-student question info is stored in this order
+    question_id: int = 0
+    # Auto-grading tests, each run gets time_limit seconds of CPU time and memory_limit megabytes of memory
+    tests: list[TestCase] = field(default_factory=list)
+    time_limit: float = 2
+    memory_limit: int = 256
 
     def __post_init__(self):
         if self.grade not in self.possible_grades:
@@ -19,5 +41,8 @@ class Question:
             "keys": self.keys,
             "grade": self.grade,
             "possible_grades": self.possible_grades,
-            "base_code": self.base_code
+            "base_code": self.base_code,
+            "tests": [test.to_json() for test in self.tests],
+            "time_limit": self.time_limit,
+            "memory_limit": self.memory_limit
         }
@@ -0,0 +1,142 @@
+import csv
+import re
+from collections import Counter, defaultdict, namedtuple
+from dataclasses import dataclass, field
+
+from unidecode import unidecode
+
+from classroom_data.student_data.student import Student
+
+RosterEntry = namedtuple("RosterEntry", ["student_number", "name", "surname"])
+RosterCandidate = namedtuple("RosterCandidate", ["entry", "score"])
+
+# kind is one of "unmatched" (no roster entry is similar enough) or "ambiguous" (several entries score about the same,
+# candidates holds them best first)
+RosterIssue = namedtuple("RosterIssue", ["kind", "student", "candidates"])
+
+
+@dataclass
+class RosterReport:
+    matches: list[tuple[Student, RosterEntry]] = field(default_factory=list)
+    issues: list[RosterIssue] = field(default_factory=list)
+
+    def of_kind(self, kind: str) -> list[RosterIssue]:
+        return [issue for issue in self.issues if issue.kind == kind]
+
+
+def normalize_tokens(text: str) -> list[str]:
+    return [token for token in re.split(r"[^a-z0-9]+", unidecode(text).lower()) if token]
+
+
+def get_trigrams(token: str) -> set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _token_similarity(first: str, second: str) -> float:
+    if first == second:
+        return 1.0
+    # A name written shorter in the folder ("muhammed" / "muhammet", "ali" / "alican") is still close
+    if len(first) >= 3 and len(second) >= 3 and (first.startswith(second) or second.startswith(first)):
+        return 0.9
+
+    first_trigrams, second_trigrams = get_trigrams(first), get_trigrams(second)
+    return 2 * len(first_trigrams & second_trigrams) / (len(first_trigrams) + len(second_trigrams))
+
+
+# Matches submission folder names against the roster in student_list.csv. The roster is normalized once and indexed by
+# its tokens and their trigrams, so every lookup only scores the few entries sharing something with the name instead
+# of walking the whole roster.
+class RosterMatcher:
+    entries: list[RosterEntry]
+    _entry_tokens: list[list[str]]
+    _token_index: dict[str, set[int]]
+    _trigram_index: dict[str, set[int]]
+    _min_score: float
+    _margin: float
+    _max_candidates: int
+
+    def __init__(self, entries: list[RosterEntry], min_score: float = 0.75, margin: float = 0.05,
+                 max_candidates: int = 20):
+        self.entries = entries
+        self._min_score = min_score
+        self._margin = margin
+        self._max_candidates = max_candidates
+
+        self._entry_tokens = [normalize_tokens(f"{entry.name} {entry.surname}") for entry in entries]
+        self._token_index = defaultdict(set)
+        self._trigram_index = defaultdict(set)
+        for i, tokens in enumerate(self._entry_tokens):
+            for token in tokens:
+                self._token_index[token].add(i)
+                for trigram in get_trigrams(token):
+                    self._trigram_index[trigram].add(i)
+
+    @classmethod
+    def from_csv(cls, file_name: str = "student_list.csv", number_column: str = "STD NO", name_column: str = "NAME",
+                 surname_column: str = "SURNAME", **kwargs) -> "RosterMatcher":
+        with open(file_name, "r", newline="", encoding="utf-8-sig") as f:
+            entries = [RosterEntry(student_number=int(row[number_column]) if row[number_column].isdigit()
+                                   else row[number_column],
+                                   name=row[name_column], surname=row[surname_column])
+                       for row in csv.DictReader(f)]
+
+        return cls(entries, **kwargs)
+
+    def rank(self, name: str, surname: str) -> list[RosterCandidate]:
+        tokens = normalize_tokens(f"{name} {surname}")
+        if not tokens:
+            return []
+
+        # Entries sharing a whole token are always scored, entries sharing only trigrams are limited to the ones
+        # sharing the most of them
+        candidate_ids = set()
+        trigram_hits = Counter()
+        for token in tokens:
+            candidate_ids |= self._token_index.get(token, set())
+            for trigram in get_trigrams(token):
+                trigram_hits.update(self._trigram_index.get(trigram, ()))
+        candidate_ids |= {i for i, _ in trigram_hits.most_common(self._max_candidates)}
+
+        candidates = [RosterCandidate(entry=self.entries[i], score=self._score(tokens, self._entry_tokens[i]))
+                      for i in candidate_ids]
+        candidates.sort(key=lambda candidate: candidate.score, reverse=True)
+        return candidates
+
+    def resolve(self, name: str, surname: str) -> tuple[RosterEntry | None, list[RosterCandidate]]:
+        # Returns the matched entry, or None and the candidates that made the name unmatched or ambiguous
+        candidates = [candidate for candidate in self.rank(name, surname) if candidate.score >= self._min_score]
+        if not candidates:
+            return None, []
+
+        # A name written exactly as in the roster wins over entries it is only a shorter form of ("Ali Can Veli" /
+        # "Ali Can Velioglu"), unless it is written exactly the same in another entry too
+        if candidates[0].score >= 1.0:
+            close_candidates = [candidate for candidate in candidates if candidate.score >= 1.0]
+        else:
+            close_candidates = [candidate for candidate in candidates
+                                if candidates[0].score - candidate.score <= self._margin]
+        if len(close_candidates) > 1:
+            return None, close_candidates
+
+        return candidates[0].entry, candidates
+
+    def match_students(self, students: list[Student]) -> RosterReport:
+        # Every student is tried, failures are collected in the report instead of stopping at the first one
+        report = RosterReport()
+        for student in students:
+            entry, candidates = self.resolve(student.name, student.surname)
+            if entry is not None:
+                report.matches.append((student, entry))
+            else:
+                report.issues.append(RosterIssue(kind="ambiguous" if candidates else "unmatched", student=student,
+                                                 candidates=candidates))
+
+        return report
+
+    def _score(self, tokens: list[str], entry_tokens: list[str]) -> float:
+        # Every token of the folder name has to be found in the roster entry, extra roster tokens (a second name)
+        # only cost a little
+        score = sum(max(_token_similarity(token, entry_token) for entry_token in entry_tokens)
+                    for token in tokens) / len(tokens)
+        return score - 0.01 * max(0, len(entry_tokens) - len(tokens))
@@ -0,0 +1,157 @@
+import hashlib
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from classroom_data.question_data.question import Question
+from classroom_data.submission_fs import group_by_archive, get_archive_file, is_archive_path, list_archive, \
+    read_archive_members
+from classroom_data.unzipper import UnzipFailure, get_extract_dir
+
+# kind is one of "multiple_questions" (the file matches the keys of several questions), "multiple_files" (several
+# files match one question, the first one in path order is used) or "unmatched" (the file matches no question)
+ScanIssue = namedtuple("ScanIssue", ["kind", "submission_directory", "file_paths", "questions"])
+
+
+@dataclass
+class ScanReport:
+    issues: list[ScanIssue] = field(default_factory=list)
+
+    def of_kind(self, kind: str) -> list[ScanIssue]:
+        return [issue for issue in self.issues if issue.kind == kind]
+
+
+class QuestionMatcher:
+    _pattern: re.Pattern | None
+    _questions_by_key: dict[str, list[Question]]
+
+    def __init__(self, questions: list[Question]):
+        # A key matches every question that has a key contained in it ("q10" also contains "q1"), so matching the
+        # longest key starting at each position finds the same questions as testing every key on its own. Empty keys
+        # would match every path and are ignored.
+        keys_by_question = {question.question: {key.lower() for key in question.keys if key} for question in questions}
+        keys = sorted(set().union(*keys_by_question.values()), key=len, reverse=True)
+        self._questions_by_key = {
+            key: [question for question in questions if any(k in key for k in keys_by_question[question.question])]
+            for key in keys
+        }
+        self._pattern = re.compile("(?=(" + "|".join(re.escape(key) for key in keys) + "))") if keys else None
+
+    def match(self, path: str) -> list[Question]:
+        if self._pattern is None:
+            return []
+
+        matched = {}
+        for m in self._pattern.finditer(path.lower()):
+            for question in self._questions_by_key[m.group(1)]:
+                matched[question.question] = question
+
+        return list(matched.values())
+
+
+def scan_python_files(directory: str, read_archives: bool = False,
+                      failures: list[UnzipFailure] | None = None) -> list[str]:
+    # With read_archives the .py members of zip archives are listed as archive paths (see submission_fs) instead of
+    # expecting ClassroomBuilder.unzip() to have extracted them, and folders left behind by an earlier unzip are ignored
+    failures = failures if failures is not None else []
+    python_files = []
+    stack = [directory]
+    while stack:
+        with os.scandir(stack.pop()) as iterator:
+            entries = list(iterator)
+
+        archives = {entry.path for entry in entries if read_archives and entry.name.endswith(".zip")}
+        extract_dirs = {get_extract_dir(zip_path) for zip_path in archives}
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if "macos" not in entry.name.lower() and entry.path not in extract_dirs:
+                    stack.append(entry.path)
+            elif entry.name.endswith(".py"):
+                python_files.append(entry.path)
+            elif entry.path in archives:
+                python_files.extend(list_archive(entry.path, failures))
+
+    return sorted(python_files)
+
+
+def list_student_directories(directory: str) -> list[str]:
+    with os.scandir(directory) as entries:
+        return sorted(entry.path for entry in entries if entry.is_dir())
+
+
+def scan_student_directories(directory: str, read_archives: bool = False,
+                             failures: list[UnzipFailure] | None = None) -> dict[str, list[str]]:
+    return {student_directory: scan_python_files(student_directory, read_archives, failures)
+            for student_directory in list_student_directories(directory)}
+
+
+def fingerprint_files(submission_directory: str, file_paths: list[str]) -> str:
+    # Archive members are fingerprinted by the archive they are in
+    sha = hashlib.sha256()
+    for file_path in file_paths:
+        stat = os.stat(get_archive_file(file_path))
+        relative_path = os.path.relpath(file_path, submission_directory)
+        sha.update(f"{relative_path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+
+    return sha.hexdigest()
+
+
+def _read_file(file_path: str) -> str:
+    with open(file_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def read_submission_files(file_paths: list[str]) -> dict[str, str]:
+    # Reads the files of one submission in the calling thread, for callers that already parallelize over submissions
+    codes = {file_path: _read_file(file_path) for file_path in file_paths if not is_archive_path(file_path)}
+    for archive_paths in group_by_archive([file_path for file_path in file_paths if is_archive_path(file_path)]) \
+            .values():
+        codes.update(read_archive_members(archive_paths))
+
+    return codes
+
+
+def read_files(file_paths: list[str], workers: int | None = None) -> dict[str, str]:
+    # Archive members are read one archive at a time, so every archive is opened only once
+    plain_files = [file_path for file_path in file_paths if not is_archive_path(file_path)]
+    archive_groups = group_by_archive([file_path for file_path in file_paths if is_archive_path(file_path)])
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        codes = dict(zip(plain_files, executor.map(_read_file, plain_files)))
+        for archive_codes in executor.map(read_archive_members, archive_groups.values()):
+            codes.update(archive_codes)
+
+    return codes
+
+
+class SubmissionScanner:
+    _questions: list[Question]
+    _matcher: QuestionMatcher
+    report: ScanReport
+
+    def __init__(self, questions: list[Question], matcher: QuestionMatcher | None = None):
+        # Scanners working on different submissions in parallel can share one matcher
+        self._questions = questions
+        self._matcher = matcher if matcher is not None else QuestionMatcher(questions)
+        self.report = ScanReport()
+
+    def assign(self, submission_directory: str, file_paths: list[str]) -> dict[str, str | None]:
+        files_by_question = {question.question: [] for question in self._questions}
+        for file_path in file_paths:
+            matched_questions = self._matcher.match(os.path.relpath(file_path, submission_directory))
+            if not matched_questions:
+                self.report.issues.append(ScanIssue("unmatched", submission_directory, [file_path], []))
+            elif len(matched_questions) > 1:
+                self.report.issues.append(ScanIssue("multiple_questions", submission_directory, [file_path],
+                                                    [question.question for question in matched_questions]))
+
+            for question in matched_questions:
+                files_by_question[question.question].append(file_path)
+
+        for question_name, files in files_by_question.items():
+            if len(files) > 1:
+                self.report.issues.append(ScanIssue("multiple_files", submission_directory, files, [question_name]))
+
+        return {question_name: files[0] if files else None for question_name, files in files_by_question.items()}
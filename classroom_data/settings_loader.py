@@ -1,24 +1,85 @@
+import os
+import threading
+from dataclasses import dataclass
+
 import yaml
 
-from classroom_data.question_data.question import Question
+from classroom_data.question_data.question import Question, TestCase
+
+DEFAULT_SETTINGS_FILE = "settings.yml"
+
+
+@dataclass
+class Settings:
+    file_name: str
+    questions: list[Question]
+    # (mtime, size) of the settings file when it was read, a different value means the file changed
+    version: tuple[float, int]
+
+    def get_question(self, question_name: str) -> Question | None:
+        return next((question for question in self.questions if question.question == question_name), None)
+
+
+_settings_cache: dict[str, Settings] = {}
+_settings_lock = threading.Lock()
+
+
+def _get_version(file_name: str) -> tuple[float, int]:
+    stat = os.stat(file_name)
+    return stat.st_mtime, stat.st_size
 
-with open("settings.yml") as f:
-    data = yaml.safe_load(f)
 
-questions = []
-for question_data in data["Questions"]:
+def load_settings(file_name: str = DEFAULT_SETTINGS_FILE) -> Settings:
+    version = _get_version(file_name)
+    with open(file_name, "r") as f:
+        data = yaml.safe_load(f)
 
-    if "base_code_file" in question_data:
-        base_code_file = open(question_data["base_code_file"], "r").read()
-    else:
-        base_code_file = ""
+    # Base code files are relative to the settings file, so several courses can live in their own directories
+    settings_directory = os.path.dirname(file_name)
 
-    questions.append(
-        Question(
-            question=question_data["question"],
-            keys=question_data["keys"],
-            grade=int(question_data["grade"]),
-            possible_grades=[int(grade) for grade in question_data["possible_grades"]],
-            base_code=base_code_file
+    questions = []
+    for question_id, question_data in enumerate(data["Questions"]):
+
+        if "base_code_file" in question_data:
+            with open(os.path.join(settings_directory, question_data["base_code_file"]), "r") as f:
+                base_code_file = f.read()
+        else:
+            base_code_file = ""
+
+        questions.append(
+            Question(
+                question=question_data["question"],
+                keys=question_data["keys"],
+                grade=int(question_data["grade"]),
+                possible_grades=[int(grade) for grade in question_data["possible_grades"]],
+                base_code=base_code_file,
+                question_id=question_id,
+                tests=[TestCase(name=test.get("name", f"Test {i + 1}"), input=test.get("input", ""),
+                                output=test["output"], points=test.get("points"))
+                       for i, test in enumerate(question_data.get("tests", []))],
+                time_limit=float(question_data.get("time_limit", 2)),
+                memory_limit=int(question_data.get("memory_limit", 256))
+            )
         )
-    )
+
+    return Settings(file_name=file_name, questions=questions, version=version)
+
+
+def get_settings(file_name: str = DEFAULT_SETTINGS_FILE) -> Settings:
+    # Settings are read on first use and cached per file. Every call checks the file, so an edited settings.yml is
+    # picked up by a running app, and the same Settings object is returned as long as the file is unchanged.
+    key = os.path.abspath(file_name)
+    with _settings_lock:
+        settings = _settings_cache.get(key)
+        if settings is None or settings.version != _get_version(file_name):
+            settings = load_settings(file_name)
+            _settings_cache[key] = settings
+
+        return settings
+
+
+def __getattr__(name: str):
+    # settings_loader.questions used to be loaded at import time, it now reads the default settings on first access
+    if name == "questions":
+        return get_settings().questions
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
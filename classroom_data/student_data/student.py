@@ -1,9 +1,10 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from .student_question_info import StudentQuestionInfo
+from classroom_data.code_store import CodeStore
 
 
-@dataclass
+@dataclass(slots=True)
 class Student:
     name: str
     surname: str
@@ -11,6 +12,13 @@ class Student:
     submission_directory: str
     question_info: list[StudentQuestionInfo]
     is_graded: dict[str, bool]
+    fingerprint: str = ""
+    # Question name -> position in question_info. Builders share one dict between all students of a classroom.
+    question_ids: dict[str, int] | None = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.question_ids is None:
+            self.question_ids = {info.question.question: i for i, info in enumerate(self.question_info)}
 
     def to_json(self):
         return {
@@ -19,11 +27,24 @@ class Student:
             "student_number": self.student_number,
             "submission_directory": self.submission_directory,
             "question_info": [info.to_json() for info in self.question_info],
-            "is_graded": self.is_graded
+            "is_graded": self.is_graded,
+            "fingerprint": self.fingerprint
+        }
+
+    def to_index_json(self, code_store: CodeStore):
+        return {
+            "name": self.name,
+            "surname": self.surname,
+            "student_number": self.student_number,
+            "submission_directory": self.submission_directory,
+            "question_info": [info.to_index_json(code_store) for info in self.question_info],
+            "is_graded": self.is_graded,
+            "fingerprint": self.fingerprint
         }
 
     def get_question_info(self, question_name):
-        return next((info for info in self.question_info if info.question.question == question_name), None)
+        question_id = self.question_ids.get(question_name)
+        return None if question_id is None else self.question_info[question_id]
 
     def __hash__(self):
         return hash(self.name + self.surname)
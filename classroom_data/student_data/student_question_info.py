@@ -1,14 +1,34 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
+from classroom_data.code_store import CodeStore
 from classroom_data.question_data.question import Question
 
 
-@dataclass
+@dataclass(slots=True)
 class StudentQuestionInfo:
     question: Question
-    code: str
+    code: str | None
     file_path: str
     grade: float
+    code_hash: str | None = None
+    code_store: CodeStore | None = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Code kept in a code store is not held on the instance, __getattr__ reads it from the store on access
+        if self.code is None and self.code_hash is not None and self.code_store is not None:
+            del self.code
+
+    def __getattr__(self, name):
+        # Only reached while the code slot is empty, i.e. for code that __post_init__ left in the code store
+        if name == "code":
+            return self.code_store.get(self.code_hash)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def __setattr__(self, name, value):
+        # New code no longer matches the stored blob, it is hashed again on the next save
+        if name == "code":
+            object.__setattr__(self, "code_hash", None)
+        object.__setattr__(self, name, value)
 
     def to_json(self):
         return {
@@ -16,4 +36,16 @@ class StudentQuestionInfo:
             "code": self.code,
             "file_path": self.file_path,
             "grade": self.grade
-        }
\ No newline at end of file
+        }
+
+    def to_index_json(self, code_store: CodeStore):
+        if self.code_hash is None or self.code_store is not code_store:
+            self.code_hash = code_store.put(self.code)
+            self.code_store = code_store
+
+        return {
+            "question": self.question.question,
+            "code_hash": self.code_hash,
+            "file_path": self.file_path,
+            "grade": self.grade
+        }
@@ -0,0 +1,91 @@
+import io
+import os
+import zipfile
+from collections import defaultdict
+
+from classroom_data.unzipper import UnzipFailure
+
+# Members of zip archives are addressed like files inside a directory named after the archive, with "!/" after every
+# archive name: "submissions/Ali/homework.zip!/homework/q1.py", or "homework.zip!/homework/inner.zip!/q1.py" for an
+# archive inside another one. Plain paths and archive paths can be mixed everywhere the scanner expects file paths.
+ARCHIVE_SEPARATOR = "!/"
+
+
+def is_archive_path(path: str) -> bool:
+    return ARCHIVE_SEPARATOR in path
+
+
+def get_archive_file(path: str) -> str:
+    # The archive on disk that holds the member
+    return path.split(ARCHIVE_SEPARATOR, 1)[0]
+
+
+def _is_skipped(member_name: str) -> bool:
+    # Same rule as for directories on disk, __MACOSX folders only hold resource forks
+    return any("macos" in part.lower() for part in member_name.split("/")[:-1])
+
+
+def _list_members(zip_file: zipfile.ZipFile, archive_path: str, failures: list[UnzipFailure]) -> list[str]:
+    python_files = []
+    for info in zip_file.infolist():
+        if info.is_dir() or _is_skipped(info.filename):
+            continue
+
+        path = archive_path + ARCHIVE_SEPARATOR + info.filename
+        if info.filename.endswith(".py"):
+            python_files.append(path)
+        elif info.filename.endswith(".zip"):
+            # Nested archives have to be read into memory, there is no central directory to seek to otherwise
+            try:
+                with zipfile.ZipFile(io.BytesIO(zip_file.read(info))) as nested_zip_file:
+                    python_files.extend(_list_members(nested_zip_file, path, failures))
+            except (zipfile.BadZipFile, OSError, RuntimeError) as e:
+                failures.append(UnzipFailure(zip_path=path, reason=str(e)))
+
+    return python_files
+
+
+def list_archive(zip_path: str, failures: list[UnzipFailure]) -> list[str]:
+    # Only the central directory is read, archives that cannot be opened are added to failures
+    try:
+        with zipfile.ZipFile(zip_path, "r") as zip_file:
+            return _list_members(zip_file, zip_path, failures)
+    except (zipfile.BadZipFile, OSError, RuntimeError) as e:
+        failures.append(UnzipFailure(zip_path=zip_path, reason=str(e)))
+        return []
+
+
+def read_archive_members(paths: list[str]) -> dict[str, str]:
+    # Every path has to be in the same archive on disk, which is opened once. Nested archives are decompressed once
+    # for all of their members.
+    codes = {}
+    archives = {}
+    try:
+        for path in paths:
+            parts = path.split(ARCHIVE_SEPARATOR)
+            prefix = parts[0]
+            if prefix not in archives:
+                archives[prefix] = zipfile.ZipFile(prefix, "r")
+            archive = archives[prefix]
+
+            for part in parts[1:-1]:
+                parent = archive
+                prefix += ARCHIVE_SEPARATOR + part
+                if prefix not in archives:
+                    archives[prefix] = zipfile.ZipFile(io.BytesIO(parent.read(part)))
+                archive = archives[prefix]
+
+            codes[path] = archive.read(parts[-1]).decode("utf-8")
+    finally:
+        for archive in archives.values():
+            archive.close()
+
+    return codes
+
+
+def group_by_archive(paths: list[str]) -> dict[str, list[str]]:
+    groups = defaultdict(list)
+    for path in paths:
+        groups[get_archive_file(path)].append(path)
+
+    return groups
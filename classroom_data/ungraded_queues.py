@@ -0,0 +1,93 @@
+from typing import Iterator
+
+from classroom_data.student_data.student import Student
+
+
+# Fenwick tree over the positions of one question's students, 1 for ungraded. Marking a student, counting the
+# ungraded students before a position and finding the k-th ungraded student are all O(log n).
+class _UngradedPositions:
+    flags: bytearray
+    count: int
+    _tree: list[int]
+
+    def __init__(self, flags: bytearray):
+        self.flags = flags
+        self.count = sum(flags)
+        self._tree = [0] * (len(flags) + 1)
+        # Built in O(n) by handing every node's sum on to its parent
+        for i, flag in enumerate(flags, 1):
+            self._tree[i] += flag
+            parent = i + (i & -i)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[i]
+
+    def set(self, position: int, is_ungraded: bool):
+        if self.flags[position] == is_ungraded:
+            return
+
+        self.flags[position] = is_ungraded
+        delta = 1 if is_ungraded else -1
+        self.count += delta
+        i = position + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def count_before(self, position: int) -> int:
+        total = 0
+        i = position
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, k: int) -> int:
+        # Position of the k-th (from 0) ungraded student
+        position = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step > 0:
+            if position + step < len(self._tree) and self._tree[position + step] <= k:
+                position += step
+                k -= self._tree[position]
+            step >>= 1
+        return position
+
+
+# Ungraded students of every question in classroom order, kept up to date by Classroom whenever a grade changes
+# (including changes of other graders applied by sync()), so counts are O(1) and marking a student or finding the next
+# ungraded one is O(log n) instead of a scan over the whole classroom.
+class UngradedQueues:
+    students: list[Student]
+    _positions: dict[int, int]
+    _queues: dict[str, _UngradedPositions]
+
+    def __init__(self, students: list[Student], question_names: list[str]):
+        self.students = list(students)
+        self._positions = {id(student): position for position, student in enumerate(self.students)}
+        self._queues = {question_name: _UngradedPositions(bytearray(not student.is_graded[question_name]
+                                                                    for student in self.students))
+                        for question_name in question_names}
+
+    def mark(self, student: Student, question_name: str, is_graded: bool):
+        self._queues[question_name].set(self._positions[id(student)], not is_graded)
+
+    def ungraded_count(self, question_name: str) -> int:
+        return self._queues[question_name].count
+
+    def graded_count(self, question_name: str) -> int:
+        return len(self.students) - self._queues[question_name].count
+
+    def get_ungraded(self, question_name: str) -> list[Student]:
+        flags = self._queues[question_name].flags
+        return [student for student, flag in zip(self.students, flags) if flag]
+
+    def iter_ungraded(self, question_name: str, after: Student | None = None) -> Iterator[Student]:
+        # Ungraded students following after in classroom order, wrapping around to the start of the classroom. The
+        # queue must not change while iterating.
+        queue = self._queues[question_name]
+        start = 0 if after is None else queue.count_before(self._positions[id(after)] + 1)
+        for i in range(queue.count):
+            yield self.students[queue.find((start + i) % queue.count)]
+
+    def next_ungraded(self, question_name: str, after: Student | None = None) -> Student | None:
+        return next(self.iter_ungraded(question_name, after), None)
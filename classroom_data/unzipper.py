@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import shutil
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from classroom_data.file_utils import atomic_write
+
+UnzipFailure = namedtuple("UnzipFailure", ["zip_path", "reason"])
+
+MANIFEST_FILE_NAME = ".unzip_manifest.json"
+
+
+def get_extract_dir(zip_path: str) -> str:
+    root, file = os.path.split(zip_path)
+    return os.path.join(root, f"extracted_{file[:-4]}")
+
+
+def find_archives(directory: str) -> list[str]:
+    archives = []
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            if file.endswith(".zip"):
+                archives.append(os.path.join(root, file))
+
+    return sorted(archives)
+
+
+def _hash_file(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _extract_archive(zip_path: str) -> str:
+    # The folder is only created once the archive opens, and removed again if extracting fails before it existed,
+    # so a corrupt archive does not leave an empty folder behind on every run
+    extract_dir = get_extract_dir(zip_path)
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        is_new_dir = not os.path.isdir(extract_dir)
+        os.makedirs(extract_dir, exist_ok=True)
+        try:
+            zip_ref.extractall(extract_dir)
+        except BaseException:
+            if is_new_dir:
+                shutil.rmtree(extract_dir, ignore_errors=True)
+            raise
+
+    return _hash_file(zip_path)
+
+
+class ArchiveManifest:
+    directory: str
+    file_name: str
+    _entries: dict[str, dict]
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.file_name = os.path.join(directory, MANIFEST_FILE_NAME)
+        self._entries = {}
+        if os.path.exists(self.file_name):
+            with open(self.file_name, "r") as f:
+                self._entries = json.load(f)
+
+    def is_unchanged(self, zip_path: str) -> bool:
+        entry = self._entries.get(os.path.relpath(zip_path, self.directory))
+        if entry is None or not os.path.isdir(get_extract_dir(zip_path)):
+            return False
+
+        stat = os.stat(zip_path)
+        if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return True
+
+        # Same size but a new mtime is usually a re-extracted nested archive, only the content hash can tell
+        if entry["size"] == stat.st_size and entry["sha256"] == _hash_file(zip_path):
+            entry["mtime_ns"] = stat.st_mtime_ns
+            return True
+
+        return False
+
+    def record(self, zip_path: str, sha256: str):
+        stat = os.stat(zip_path)
+        self._entries[os.path.relpath(zip_path, self.directory)] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256
+        }
+
+    def save(self):
+        with atomic_write(self.file_name, fsync=False) as f:
+            json.dump(self._entries, f, indent=4)
+
+
+def extract_archives(directory: str, workers: int | None = None) -> list[UnzipFailure]:
+    manifest = ArchiveManifest(directory)
+    failures = []
+
+    pending = [zip_path for zip_path in find_archives(directory) if not manifest.is_unchanged(zip_path)]
+    if not pending:
+        manifest.save()
+        return failures
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Archives found inside freshly extracted folders are handled in the next round
+        while pending:
+            futures = {executor.submit(_extract_archive, zip_path): zip_path for zip_path in pending}
+            pending = []
+            for future in as_completed(futures):
+                zip_path = futures[future]
+                try:
+                    sha256 = future.result()
+                except Exception as e:
+                    failures.append(UnzipFailure(zip_path=zip_path, reason=str(e)))
+                    continue
+
+                manifest.record(zip_path, sha256)
+                pending.extend(nested_path for nested_path in find_archives(get_extract_dir(zip_path))
+                               if nested_path not in futures and not manifest.is_unchanged(nested_path))
+
+    manifest.save()
+    return failures
@@ -1,37 +1,52 @@
 import contextlib
 import io
-import os.path
 import sys
-from time import sleep
+import time
 
 import streamlit as st
 
 print(st.__file__)
 
 from classroom_data import *
+from classroom_data import instrumentation
+from classroom_data.auto_grader import get_suggested_grade
+from streamlit_grading_ui.code_view import render_submission, show_code
+from streamlit_grading_ui.grade_widgets import forget_grade_widgets, get_grade_widget_keys
+from streamlit_grading_ui.grading_session import get_grading_session
 
-if not os.path.exists("classroom.json"):
-    classroom = ClassroomBuilder("submissions").unzip().build()
-    save_classroom_to_json(classroom, "classroom.json")
-else:
-    classroom = load_classroom_from_json("classroom.json")
+# Loaded once per server process, reruns and other browser sessions reuse the same classroom and indexes
+grading_session = get_grading_session()
+classroom = grading_session.classroom
+classroom_index = grading_session.index
 
 _students = classroom.students
-questions = settings_loader.questions
+# Edits of settings.yml are picked up on the next rerun without restarting the server, grades other graders
+# journaled since the last rerun are applied
+with grading_session.lock:
+    questions = classroom.get_questions()
+grading_session.sync()
+auto_grader = grading_session.auto_grader
+# How many of the students after the selected one are prepared in the background
+PREFETCH_COUNT = 3
 
 if "selected_question" not in st.session_state:
     st.session_state["selected_question"] = questions[0].question
 
 if "selected_student_name" not in st.session_state:
-    student = next((student for student in _students), None)
-    st.session_state.selected_student_name = f"{student.name} {student.surname}"
+    st.session_state.selected_student_name = classroom_index.display_names[0]
 
 if "student_names" not in st.session_state:
-    st.session_state["student_names"] = [f"{student.name} {student.surname}" for student in _students]
+    st.session_state["student_names"] = classroom_index.display_names
 
 if "show_only_ungraded_students" not in st.session_state:
     st.session_state["show_only_ungraded_students"] = False
 
+if "group_similar_submissions" not in st.session_state:
+    st.session_state["group_similar_submissions"] = False
+
+if "grader_name" not in st.session_state:
+    st.session_state["grader_name"] = ""
+
 
 @contextlib.contextmanager
 def capture_stdout():
@@ -45,6 +60,15 @@ def capture_stdout():
 
 
 def reload_page():
+    # The scroll script is sent by the next rerun, which is not cut short like this one
+    st.session_state["scroll_to_top"] = True
+    st.rerun()
+
+
+def scroll_to_top():
+    if not st.session_state.pop("scroll_to_top", False):
+        return
+
     js = '''
         <script>
             var body = window.parent.document.querySelector(".main");
@@ -53,11 +77,88 @@ def reload_page():
         </script>
         '''
 
-    st.components.v1.html(js)
-    sleep(0.1)
-    st.rerun()
+    st.components.v1.html(js, height=0)
+
+
+def prepare_question_info(question_info: StudentQuestionInfo):
+    # Fills the caches show_code and show_auto_grade_result read from
+    if question_info.code == "":
+        return
+
+    render_submission(question_info)
+    if question_info.question.tests:
+        auto_grader.get_cached_result(question_info.question, question_info.code)
+
+
+def prefetch_next_students(listed_students: list[Student], selected_student: Student, question_name: str):
+    selected_index = next((i for i, student in enumerate(listed_students) if student is selected_student), -1)
+    for student in listed_students[selected_index + 1:selected_index + 1 + PREFETCH_COUNT]:
+        question_info = classroom_index.get_question_info(student, question_name)
+        grading_session.prefetcher.prefetch((question_name, id(student)),
+                                            lambda question_info=question_info: prepare_question_info(question_info))
+
+def show_question_statistics(question: Question):
+    with grading_session.lock:
+        graded_count = classroom.get_ungraded_queues().graded_count(question.question)
+        grade_matrix = classroom.get_grade_matrix()
+        statistics = grade_matrix.statistics()
+        possible_grades, counts = grade_matrix.distribution(question.question_id)
+
+    st.sidebar.progress(graded_count / max(len(classroom.students), 1),
+                        text=f"Graded {graded_count} / {len(classroom.students)}")
+    if graded_count > 0:
+        st.sidebar.write(f"**Average:** {statistics.mean[question.question_id]:.2f} "
+                         f"(std {statistics.std[question.question_id]:.2f})")
+    st.sidebar.bar_chart({"Students": dict(zip([str(grade) for grade in possible_grades], counts.tolist()))})
+
+
+def auto_grade_question(question: Question):
+    if not question.tests or not st.sidebar.button(f"Auto-grade {question.question}"):
+        return
+
+    # The tests run without the lock, only writing the suggested grades blocks other graders
+    with st.spinner(f"Running the tests of {question.question}"):
+        results = auto_grader.grade_question(list(classroom.students), question)
+    with grading_session.lock:
+        prefilled = auto_grader.prefill_grades(classroom, question, results)
+    forget_grade_widgets(st.session_state, question.question, [student for student, _ in results])
+    st.sidebar.write(f"Suggested grades for {prefilled} ungraded submissions")
+
+
+def show_auto_grade_result(question_info: StudentQuestionInfo):
+    question = question_info.question
+    result = auto_grader.get_cached_result(question, question_info.code) if question.tests else None
+    if result is None:
+        return
+
+    passed_count = sum(test_result.passed for test_result in result.test_results)
+    st.write(f"**Tests:** {passed_count} / {len(result.test_results)} passed, "
+             f"suggested grade {get_suggested_grade(question, result)}")
+    for test_result in result.test_results:
+        if not test_result.passed:
+            st.write(f"- {test_result.name}: {test_result.reason}")
+
 
 def grader_page():
+    scroll_to_top()
+
+    if st.sidebar.button("Rescan Submissions"):
+        builder = grading_session.refresh()
+        st.sidebar.write(f"{len(builder.refresh_report.added)} new students, "
+                         f"{len(builder.refresh_report.regrade)} changed submissions")
+
+    # Changes are journaled under the grader's name, graders listed in the assignments file only see their students
+    st.session_state["grader_name"] = st.sidebar.text_input("Grader", value=st.session_state["grader_name"],
+                                                            key="grader_name_text_input")
+    grader_name = st.session_state["grader_name"] or None
+    grader_assignments = grading_session.get_assignments()
+
+    if instrumentation.ENABLED and st.sidebar.button("Profile Next Rerun"):
+        st.session_state["profile_rerun"] = True
+
+    if "grade_conflict" in st.session_state:
+        st.warning(st.session_state.pop("grade_conflict"))
+
     question_names = [question.question for question in questions]
 
     info_col, student_select_col = st.columns(2)
@@ -68,26 +169,59 @@ def grader_page():
                                                                           "show_only_ungraded_students"],
                                                                       key="show_only_ungraded_students_check_box")
 
+        # One representative per cluster of identical or nearly identical submissions is listed, its grade can be
+        # applied to the whole cluster at once
+        st.session_state["group_similar_submissions"] = st.checkbox("Group Similar Submissions",
+                                                                    value=st.session_state[
+                                                                        "group_similar_submissions"],
+                                                                    key="group_similar_submissions_check_box")
+
         selected_question_name = st.selectbox(label="Questions", options=question_names)
         selected_question = questions[question_names.index(selected_question_name)]
         st.session_state["selected_question_name"] = selected_question.question
-
-        if not st.session_state["show_only_ungraded_students"]:
-            student_names = [f"{student.name} {student.surname}" for student in _students]
+        show_question_statistics(selected_question)
+        auto_grade_question(selected_question)
+
+        clusters_by_representative = {}
+        if st.session_state["group_similar_submissions"]:
+            clusters_by_representative = {id(cluster.representative): cluster
+                                          for cluster in grading_session.get_clusters(selected_question)}
+            listed_students = [cluster.representative for cluster in clusters_by_representative.values()
+                               if not st.session_state["show_only_ungraded_students"]
+                               or not all(student.is_graded[selected_question_name] for student in cluster.members)]
+        elif not st.session_state["show_only_ungraded_students"]:
+            listed_students = classroom_index.get_students(selected_question_name)
         else:
-            student_names = [f"{student.name} {student.surname}" for student in _students if
-                             not student.is_graded[selected_question_name]]
-
-        students = [student for student in _students if f"{student.name} {student.surname}" in student_names]
-
-        st.session_state.selected_student_name = st.selectbox(label="Students", options=student_names, index=0)
-        selected_student = students[student_names.index(st.session_state.selected_student_name)]
-
-        question_info = next((info for info in selected_student.question_info if
-                              info.question.question == st.session_state["selected_question_name"]),
-                             None)
+            with grading_session.lock:
+                listed_students = classroom.get_ungraded_queues().get_ungraded(selected_question_name)
+        if grader_name is not None:
+            listed_students = grader_assignments.get_students(grader_name, selected_question_name, listed_students)
+        student_names = [classroom_index.get_display_name(student) for student in listed_students]
+        if not student_names:
+            st.write(f"Nothing left to grade for {selected_question_name}"
+                     if st.session_state["show_only_ungraded_students"] else
+                     f"No students to grade for {selected_question_name}")
+            st.stop()
+
+        def format_student_name(student_name: str) -> str:
+            cluster = clusters_by_representative.get(id(classroom_index.get_student(student_name)))
+            if cluster is None or len(cluster.members) == 1:
+                return student_name
+            return f"{student_name} (+{len(cluster.members) - 1} similar)"
+
+        # Stays on the selected student while it is listed, "Next Student" selects the one after it
+        selected_index = student_names.index(st.session_state.selected_student_name) \
+            if st.session_state.selected_student_name in student_names else 0
+        st.session_state.selected_student_name = st.selectbox(label="Students", options=student_names,
+                                                              index=selected_index,
+                                                              format_func=format_student_name)
+        selected_student = classroom_index.get_student(st.session_state.selected_student_name)
+        selected_cluster = clusters_by_representative.get(id(selected_student))
+
+        question_info = classroom_index.get_question_info(selected_student, st.session_state["selected_question_name"])
 
         question = question_info.question
+        prefetch_next_students(listed_students, selected_student, selected_question_name)
 
     with info_col:
         st.write(f"**Name:** {selected_student.name} {selected_student.surname}")
@@ -96,17 +230,18 @@ def grader_page():
             st.write(f"**Graded**")
         else:
             st.write(f"**Not Graded**")
+        show_auto_grade_result(question_info)
 
         full_grade_button = st.button("Full Grade")
         if full_grade_button:
-            question_info.grade = question.possible_grades[-1]
-            selected_student.is_graded[selected_question_name] = True
-            save_classroom_to_json(classroom, "classroom.json")
+            with grading_session.lock:
+                classroom.set_grade(selected_student, selected_question_name, question.possible_grades[-1], True,
+                                    grader=grader_name)
+            forget_grade_widgets(st.session_state, selected_question_name, [selected_student])
             reload_page()
 
-    with open("dummy.py", "w", encoding="utf-8") as f:
-        f.write(question_info.code)
-
+    st.divider()
+    show_code(question_info)
     st.divider()
 
     # st.write(f"**{partial_question.partial_question}**")
@@ -114,25 +249,92 @@ def grader_page():
 
     init_index = question.possible_grades.index(question_info.grade)
 
-    chosen_grade = st.radio("Grade", options=question.possible_grades, index=init_index,
-                            key=f"Grade {selected_question.question} {selected_student.name} {selected_student.surname}")
+    # A write fails if another grader changed the grade since this session first showed it
+    grade_key, is_graded_key, version_key = get_grade_widget_keys(selected_question_name, selected_student)
+    if version_key not in st.session_state:
+        st.session_state[version_key] = classroom.get_version(selected_student, selected_question_name)
 
-    question_info.grade = chosen_grade
+    chosen_grade = st.radio("Grade", options=question.possible_grades, index=init_index, key=grade_key)
 
     is_graded_init_index = 0 if selected_student.is_graded[selected_question_name] else 1
-    is_graded = st.radio("Is Graded", options=["Yes", "No"], index=is_graded_init_index,
-                         key=f"is_graded {selected_question.question} {selected_student.name} {selected_student.surname}")
+    is_graded = st.radio("Is Graded", options=["Yes", "No"], index=is_graded_init_index, key=is_graded_key)
 
-    if is_graded == "Yes":
-        selected_student.is_graded[selected_question_name] = True
-    else:
-        selected_student.is_graded[selected_question_name] = False
-    save_classroom_to_json(classroom, "classroom.json")
+    try:
+        with grading_session.lock:
+            classroom.set_grade(selected_student, selected_question_name, chosen_grade, is_graded == "Yes",
+                                expected_version=st.session_state[version_key], grader=grader_name)
+            st.session_state[version_key] = classroom.get_version(selected_student, selected_question_name)
+    except GradeConflictError as e:
+        # Show the other grader's grade instead of overwriting it
+        st.session_state["grade_conflict"] = str(e)
+        forget_grade_widgets(st.session_state, selected_question_name, [selected_student])
+        st.rerun()
+
+    # Only the members assigned to this grader are graded along, and only if nobody changed them since they were shown
+    cluster_members = [] if selected_cluster is None else selected_cluster.members if grader_name is None \
+        else grader_assignments.get_students(grader_name, selected_question_name, selected_cluster.members)
+    if len(cluster_members) > 1:
+        member_version_keys = [get_grade_widget_keys(selected_question_name, student)[2] for student in cluster_members]
+        for student, member_version_key in zip(cluster_members, member_version_keys):
+            if member_version_key not in st.session_state:
+                st.session_state[member_version_key] = classroom.get_version(student, selected_question_name)
+
+        kind = "identical" if selected_cluster.is_exact() else "similar"
+        with st.expander(f"{len(cluster_members) - 1} {kind} submissions"):
+            for student in cluster_members:
+                if student is not selected_student:
+                    graded = "graded" if student.is_graded[selected_question_name] else "not graded"
+                    st.write(f"{classroom_index.get_display_name(student)} "
+                             f"({100 * selected_cluster.similarity(student):.0f}% similar, "
+                             f"{student.get_question_info(selected_question_name).grade}, {graded})")
+
+        if st.button(f"Apply to all {len(cluster_members)} submissions in this cluster"):
+            try:
+                with grading_session.lock:
+                    changed = classroom.set_grades(cluster_members, selected_question_name, chosen_grade,
+                                                   is_graded == "Yes",
+                                                   expected_versions=[st.session_state[member_version_key]
+                                                                      for member_version_key in member_version_keys],
+                                                   grader=grader_name)
+                st.write(f"Updated {changed} submissions")
+            except GradeConflictError as e:
+                st.warning(f"Nothing was applied. {e}")
+            forget_grade_widgets(st.session_state, selected_question_name,
+                                 [student for student in cluster_members if student is not selected_student])
 
     next_student_button = st.button("Next Student")
     if next_student_button:
+        # Already prepared by prefetch_next_students
+        selected_index = student_names.index(st.session_state.selected_student_name)
+        if selected_index + 1 < len(student_names):
+            st.session_state.selected_student_name = student_names[selected_index + 1]
         reload_page()
 
+    if st.button("Next Ungraded Student"):
+        listed_ids = {id(student) for student in listed_students}
+        with grading_session.lock:
+            ungraded_students = classroom.get_ungraded_queues().iter_ungraded(selected_question_name,
+                                                                              after=selected_student)
+            next_student = next((student for student in ungraded_students
+                                 if student is not selected_student and id(student) in listed_ids), None)
+        if next_student is None:
+            st.write("Every listed student is graded")
+        else:
+            st.session_state.selected_student_name = classroom_index.get_display_name(next_student)
+            reload_page()
+
 
 if __name__ == "__main__":
-    grader_page()
+    # With GRADING_INSTRUMENTATION set every rerun is timed and the metrics file is rewritten after it
+    if instrumentation.ENABLED and st.session_state.pop("profile_rerun", False):
+        rerun_context = instrumentation.profile(f"profiles/rerun_{int(time.time())}.prof")
+    else:
+        rerun_context = contextlib.nullcontext()
+
+    try:
+        with rerun_context, instrumentation.timed("grader_page.rerun"):
+            grader_page()
+    finally:
+        instrumentation.count("grader_page.reruns")
+        if instrumentation.ENABLED:
+            instrumentation.write_metrics()
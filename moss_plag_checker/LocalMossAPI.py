@@ -0,0 +1,113 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import List
+
+from classroom_data import Classroom, hash_code
+from moss_plag_checker.ast_normalizer import fingerprint_ast
+from moss_plag_checker.fingerprint_cache import FingerprintCache
+from moss_plag_checker.similarity_report import SimilarityMatch, get_submission_display_name, write_similarity_report
+from moss_plag_checker.submissions import StudentSubmission, get_student_submissions
+from moss_plag_checker.winnowing import Fingerprint, count_shared_fingerprints, fingerprint_code
+
+
+FINGERPRINT_FUNCTIONS = {
+    "tokens": fingerprint_code,
+    "ast": fingerprint_ast
+}
+
+
+# Offline stand-in for MossAPI that compares winnowing fingerprints of the submissions on this machine.
+# In "tokens" mode fingerprints come from the token stream, in "ast" mode from a normalized syntax tree that is
+# immune to renamed identifiers, changed literals and reordered functions.
+class LocalMossAPI:
+    _classroom: Classroom
+    _mode: str
+    _cache: FingerprintCache | None
+    _workers: int | None
+    _k: int
+    _window_size: int
+    _max_share: float
+    _min_shared: int
+
+    def __init__(self, classroom: Classroom, mode: str = "tokens", cache: FingerprintCache | None = None,
+                 workers: int | None = None, k: int | None = None, window_size: int | None = None,
+                 max_share: float = 0.5, min_shared: int = 3):
+        if mode not in FINGERPRINT_FUNCTIONS:
+            raise ValueError(f"Unknown similarity mode {mode}, expected one of {list(FINGERPRINT_FUNCTIONS)}")
+
+        self._classroom = classroom
+        self._mode = mode
+        self._cache = cache
+        self._workers = workers
+        # Syntax trees have more nodes than the code has tokens, so ast mode uses longer k-grams by default
+        self._k = k if k is not None else (8 if mode == "ast" else 5)
+        self._window_size = window_size if window_size is not None else (6 if mode == "ast" else 4)
+        self._max_share = max_share
+        self._min_shared = min_shared
+
+    def run_moss(self, question_name: str, save_dir: str) -> list[SimilarityMatch]:
+        question = next((q for q in self._classroom.get_questions() if q.question == question_name), None)
+        if question is None:
+            raise ValueError(f"Cannot find question {question_name}")
+
+        student_submissions = self._get_student_submissions(question_name)
+        fingerprints = self._fingerprint([submission.submission_code for submission in student_submissions])
+        base_hashes = {fingerprint.hash for fingerprint in self._fingerprint([question.base_code])[0]}
+
+        matches = self._find_matches(student_submissions, fingerprints, base_hashes)
+        write_similarity_report(matches, question_name, save_dir)
+        print(f"Report saved to {save_dir}/report.html")
+
+        return matches
+
+    def _fingerprint(self, codes: list[str]) -> list[list[Fingerprint]]:
+        keys = [f"{hash_code(code)}-{self._mode}-{self._k}-{self._window_size}" for code in codes]
+        fingerprints = [self._cache.get(key) if self._cache is not None else None for key in keys]
+
+        # Only code that is not in the cache yet is fingerprinted
+        missing = [i for i, cached in enumerate(fingerprints) if cached is None]
+        if len(missing) == 1:
+            fingerprints[missing[0]] = FINGERPRINT_FUNCTIONS[self._mode](codes[missing[0]], self._k,
+                                                                         self._window_size)
+        elif missing:
+            with ProcessPoolExecutor(max_workers=self._workers) as executor:
+                computed = executor.map(FINGERPRINT_FUNCTIONS[self._mode], [codes[i] for i in missing],
+                                        repeat(self._k), repeat(self._window_size),
+                                        chunksize=max(1, len(missing) // 64))
+                for i, submission_fingerprints in zip(missing, computed):
+                    fingerprints[i] = submission_fingerprints
+
+        if self._cache is not None:
+            for i in missing:
+                self._cache.put(keys[i], fingerprints[i])
+
+        return fingerprints
+
+    def _find_matches(self, student_submissions: List[StudentSubmission], fingerprints: list[list[Fingerprint]],
+                      base_hashes: set[int]) -> list[SimilarityMatch]:
+        fingerprint_sets = [{fingerprint.hash for fingerprint in submission_fingerprints} - base_hashes
+                            for submission_fingerprints in fingerprints]
+        max_occurrences = max(2, int(self._max_share * len(student_submissions)))
+        shared_counts = count_shared_fingerprints(fingerprint_sets, base_hashes, max_occurrences)
+
+        matches = []
+        for (first, second), shared_count in shared_counts.items():
+            if shared_count < self._min_shared:
+                continue
+
+            shared_hashes = fingerprint_sets[first] & fingerprint_sets[second]
+            matches.append(SimilarityMatch(
+                first=get_submission_display_name(student_submissions[first]),
+                second=get_submission_display_name(student_submissions[second]),
+                first_percent=100 * shared_count / len(fingerprint_sets[first]),
+                second_percent=100 * shared_count / len(fingerprint_sets[second]),
+                shared_fingerprints=shared_count,
+                first_lines=sorted({f.line for f in fingerprints[first] if f.hash in shared_hashes}),
+                second_lines=sorted({f.line for f in fingerprints[second] if f.hash in shared_hashes})
+            ))
+
+        matches.sort(key=lambda match: match.score, reverse=True)
+        return matches
+
+    def _get_student_submissions(self, question_name: str) -> List[StudentSubmission]:
+        return get_student_submissions(self._classroom, question_name)
@@ -1,114 +1,186 @@
 import logging
 import os
+import re
 import shutil
-from dataclasses import dataclass
-from typing import List
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, TypeVar
 
 import mosspy
 
-from classroom_data import Classroom, settings_loader
+from classroom_data import Classroom
+from classroom_data.instrumentation import count, instrumented, timed
+from moss_plag_checker.run_cache import MossRunCache, get_run_key
+from moss_plag_checker.submissions import StudentSubmission, get_student_submissions
 
+T = TypeVar("T")
 
-@dataclass
-class StudentSubmission:
-    name: str
-    surname: str
-    student_number: str
-    submission_code: str
+# Links mosspy.download_report follows and rewrites to the downloaded file, see get_missing_report_pages
+_MATCH_LINK = re.compile(r"""(?:href|src)\s*=\s*["']?([^"'#\s>]*match[^"'#\s>]*)""", re.IGNORECASE)
 
-    def get_temp_submission_file_name(self) -> str:
-        return f"{self.name}_{self.surname}_{self.student_number}.py"
+
+def get_missing_report_pages(report_dir: str) -> list[str]:
+    # mosspy.download_report fetches the pages of a report on threads and only logs the ones that fail, so a report
+    # can come back with pages missing. Every match page linked from a downloaded page has to be there too.
+    missing = []
+    pages = ["index.html"]
+    seen = set(pages)
+    while pages:
+        page = pages.pop()
+        path = os.path.join(report_dir, page)
+        if not os.path.exists(path):
+            missing.append(page)
+            continue
+
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for link in _MATCH_LINK.findall(f.read()):
+                linked_page = os.path.basename(link)
+                if linked_page not in seen:
+                    seen.add(linked_page)
+                    pages.append(linked_page)
+
+    return sorted(missing)
 
 
 class MossAPI:
     _api_key: str
     _classroom: Classroom
-    _moss: mosspy.Moss
-    _temp_dir: str = "temp/"
-
-    def __init__(self, classroom: Classroom):
-        self._api_key = os.getenv("MOSS_API_KEY")
+    _server: str
+    _port: int
+    _retries: int
+    _backoff: float
+    _report_connections: int
+    _run_cache: MossRunCache | None
+
+    def __init__(self, classroom: Classroom, api_key: str | None = None, server: str = mosspy.Moss.server,
+                 port: int = mosspy.Moss.port, retries: int = 3, backoff: float = 2.0, report_connections: int = 8,
+                 run_cache: MossRunCache | None = None):
+        self._api_key = api_key if api_key is not None else os.getenv("MOSS_API_KEY")
         if self._api_key is None:
             raise ValueError("MOSS_API_KEY environment variable is not set")
 
         self._classroom = classroom
-
-        if not os.path.exists(self._temp_dir):
-            os.makedirs(self._temp_dir)
-
-    def run_moss(self, question_name: str, save_dir: str):
+        self._server = server
+        self._port = port
+        self._retries = retries
+        self._backoff = backoff
+        self._report_connections = report_connections
+        self._run_cache = run_cache
+
+    @instrumented("moss.run")
+    def run_moss(self, question_name: str, save_dir: str, download_full_report: bool = False) -> str:
         if not os.path.exists(save_dir):
             os.makedirs(save_dir)
 
-        self._moss = mosspy.Moss(self._api_key, "python")
-        logging.basicConfig(level=logging.ERROR)
-
         student_submissions = self._get_student_submissions(question_name)
-        question = next((q for q in settings_loader.questions if q.question == question_name), None)
+        question = next((q for q in self._classroom.get_questions() if q.question == question_name), None)
         if question is None:
             raise ValueError(f"Cannot find question {question_name}")
 
-        if question.base_code != "":
-            self._add_base_code(question.base_code)
-
-        for submission in student_submissions:
-            self._add_submission(submission)
-
-        url = self._moss.send(lambda file_path, display_name: print('*', end='', flush=True))
-
-        print()
-        print("Report Url: " + url)
-
-        dest_dir = f"submission/{question_name}"
-        os.makedirs(dest_dir, exist_ok=True)
-
-        # Save report file
-        self._moss.saveWebPage(url, f"{save_dir}/report.html")
-
-        # Download whole report locally including code diff links
-        # mosspy.download_report(url, f"{save_dir}/report/", connections=8, log_level=10,
-        #                        on_read=lambda url: print('*', end='', flush=True))
-
-        shutil.rmtree(self._temp_dir)
-
-    def _add_submission(self, submission: StudentSubmission):
+        # An unchanged set of submissions gets the report of the previous run without uploading anything
+        run_key = get_run_key(question, student_submissions)
+        if self._run_cache is not None:
+            record = self._run_cache.lookup(question_name, run_key, needs_full_report=download_full_report)
+            if record is not None:
+                self._run_cache.restore(question_name, record, save_dir)
+                count("moss.run_cache_hits")
+                print(f"Submissions for {question_name} are unchanged, reusing report {record.url}")
+                return record.url
+
+        # Every run gets its own workspace, so runs for several questions can overlap
+        temp_dir = tempfile.mkdtemp(prefix=f"moss_{question_name}_")
+        try:
+            moss = mosspy.Moss(self._api_key, "python")
+            moss.server = self._server
+            moss.port = self._port
+            logging.basicConfig(level=logging.ERROR)
+
+            if question.base_code != "":
+                self._add_base_code(moss, temp_dir, question.base_code)
+
+            with timed("moss.prepare_files"):
+                for submission in student_submissions:
+                    self._add_submission(moss, temp_dir, submission)
+            count("moss.submissions", len(student_submissions))
+
+            url = self._with_retries(lambda: self._send(moss), f"Sending {question_name} to MOSS")
+            print(f"Report Url for {question_name}: {url}")
+
+            # Save report file
+            self._with_retries(lambda: moss.saveWebPage(url, f"{save_dir}/report.html"),
+                               f"Saving the MOSS report of {question_name}")
+
+            # Download whole report locally including code diff links, the match pages are fetched in parallel
+            if download_full_report:
+                self._with_retries(lambda: self._download_report(url, f"{save_dir}/report/"),
+                                   f"Downloading the full MOSS report of {question_name}")
+
+            if self._run_cache is not None:
+                self._run_cache.store(question_name, run_key, url, len(student_submissions), save_dir)
+
+            return url
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def run_moss_concurrently(self, question_names: list[str], save_dir_format: str = "plag_report/{question}",
+                              workers: int | None = None,
+                              download_full_report: bool = False) -> dict[str, str | Exception]:
+        # Results are the report url of each question, or the exception its run failed with
+        def run(question_name: str) -> str | Exception:
+            try:
+                return self.run_moss(question_name, save_dir_format.format(question=question_name),
+                                     download_full_report)
+            except Exception as e:
+                print(f"MOSS run for {question_name} failed. Reason: {e}")
+                return e
+
+        with ThreadPoolExecutor(max_workers=workers or len(question_names) or 1) as executor:
+            return dict(zip(question_names, executor.map(run, question_names)))
+
+    @instrumented("moss.send")
+    def _send(self, moss: mosspy.Moss) -> str:
+        url = moss.send()
+        if not url.startswith("http"):
+            raise ConnectionError(f"MOSS server did not return a report url, got {url!r}")
+        return url
+
+    def _download_report(self, url: str, report_dir: str):
+        mosspy.download_report(url, report_dir, connections=self._report_connections, log_level=logging.ERROR)
+        missing = get_missing_report_pages(report_dir)
+        if missing:
+            raise ConnectionError(f"{len(missing)} pages of the MOSS report were not downloaded, "
+                                  f"e.g. {missing[0]}")
+
+    def _with_retries(self, action: Callable[[], T], description: str) -> T:
+        for attempt in range(self._retries + 1):
+            try:
+                return action()
+            except Exception as e:
+                if attempt == self._retries:
+                    raise
+
+                delay = self._backoff * 2 ** attempt
+                count("moss.retries")
+                print(f"{description} failed, retrying in {delay:.0f}s. Reason: {e}")
+                time.sleep(delay)
+
+    def _add_submission(self, moss: mosspy.Moss, temp_dir: str, submission: StudentSubmission):
         code = submission.submission_code
-        temp_file_name = self._temp_dir + submission.get_temp_submission_file_name()
+        temp_file_name = os.path.join(temp_dir, submission.get_temp_submission_file_name())
 
         with open(temp_file_name, "w") as f:
             f.write(code)
 
-        self._moss.addFile(temp_file_name)
+        # The MOSS protocol separates fields by spaces, so the display name must not contain any
+        moss.addFile(temp_file_name, submission.get_temp_submission_file_name().replace(" ", "_"))
 
-    def _add_base_code(self, base_code: str):
-        base_code_file = self._temp_dir + "base_code.py"
+    def _add_base_code(self, moss: mosspy.Moss, temp_dir: str, base_code: str):
+        base_code_file = os.path.join(temp_dir, "base_code.py")
         with open(base_code_file, "w") as f:
             f.write(base_code)
-        self._moss.addBaseFile(base_code_file)
+        moss.addBaseFile(base_code_file)
 
+    @instrumented("moss.get_student_submissions")
     def _get_student_submissions(self, question_name: str) -> List[StudentSubmission]:
-        submissions = []
-        for student in self._classroom.students:
-            question_info = student.get_question_info(question_name)
-
-            if question_info is None:
-                student_submission = None
-            else:
-                student_submission = StudentSubmission(name=student.name,
-                                                       surname=student.surname,
-                                                       student_number=student.student_number,
-                                                       submission_code=question_info.code)
-
-            if student_submission is None:
-                print(
-                    f"Cannot find submission for student {student.name} {student.surname} "
-                    f"for questions {question_name}")
-                continue
-
-            if student_submission.submission_code == "":
-                print(f"Submission for student {student.name} {student.surname} is empty")
-                continue
-
-            submissions.append(student_submission)
-
-        return submissions
+        return get_student_submissions(self._classroom, question_name)
@@ -1 +1,2 @@
-from .MossAPI import MossAPI
\ No newline at end of file
+from .MossAPI import MossAPI
+from .LocalMossAPI import LocalMossAPI
@@ -0,0 +1,154 @@
+import ast
+import builtins
+
+from moss_plag_checker.winnowing import Fingerprint, hash_k_grams, tokenize_python, winnow
+
+_BUILTIN_NAMES = set(dir(builtins))
+
+
+def _get_defined_names(tree: ast.AST) -> set[str]:
+    # Names the code itself introduces. Attributes and keyword arguments are only renamed when they use one of them,
+    # so self.total and f(total=...) follow a rename while list.append or print(end=...) keep their names.
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            names.add(node.id)
+        elif isinstance(node, ast.Attribute) and isinstance(node.ctx, ast.Store):
+            names.add(node.attr)
+        elif isinstance(node, ast.alias) and node.asname is not None:
+            names.add(node.asname)
+        elif isinstance(node, ast.ExceptHandler) and node.name is not None:
+            names.add(node.name)
+
+    return names - _BUILTIN_NAMES
+
+
+class _IdentifierCanonicalizer(ast.NodeTransformer):
+    # Renames every user defined identifier to v0, v1, ... in order of appearance and abstracts literal values. The
+    # same spelling gets the same name everywhere, as a variable, an attribute, a keyword argument or an import alias.
+    # Builtins keep their names since calling print or range is part of the structure of the code.
+    _names: dict[str, str]
+    _defined_names: set[str]
+
+    def __init__(self, defined_names: set[str]):
+        self._names = {}
+        self._defined_names = defined_names
+
+    def _canonical(self, name: str) -> str:
+        if name in _BUILTIN_NAMES:
+            return name
+        return self._names.setdefault(name, f"v{len(self._names)}")
+
+    def visit_Name(self, node: ast.Name):
+        node.id = self._canonical(node.id)
+        return node
+
+    def visit_arg(self, node: ast.arg):
+        node.arg = self._canonical(node.arg)
+        node.annotation = None
+        return self.generic_visit(node)
+
+    def visit_FunctionDef(self, node):
+        node.name = self._canonical(node.name)
+        node.returns = None
+        return self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node: ast.ClassDef):
+        node.name = self._canonical(node.name)
+        return self.generic_visit(node)
+
+    def visit_Attribute(self, node: ast.Attribute):
+        if node.attr in self._defined_names:
+            node.attr = self._canonical(node.attr)
+        return self.generic_visit(node)
+
+    def visit_keyword(self, node: ast.keyword):
+        if node.arg in self._defined_names:
+            node.arg = self._canonical(node.arg)
+        return self.generic_visit(node)
+
+    def visit_alias(self, node: ast.alias):
+        if node.asname is not None:
+            node.asname = self._canonical(node.asname)
+        return node
+
+    def visit_ExceptHandler(self, node: ast.ExceptHandler):
+        if node.name is not None:
+            node.name = self._canonical(node.name)
+        return self.generic_visit(node)
+
+    def visit_Constant(self, node: ast.Constant):
+        if not isinstance(node.value, (bool, type(None))):
+            node.value = type(node.value).__name__
+        return node
+
+
+def _iter_nodes(node: ast.AST, line: int = 0):
+    # Depth first, so the node order follows the order of the code. Nodes without a position (operators, contexts)
+    # take the line of their parent.
+    line = getattr(node, "lineno", line)
+    yield node, line
+    for child in ast.iter_child_nodes(node):
+        yield from _iter_nodes(child, line)
+
+
+def _shape(node: ast.AST) -> str:
+    return " ".join(type(child).__name__ for child, _ in _iter_nodes(node))
+
+
+def _is_docstring(statement: ast.stmt) -> bool:
+    return isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Constant) \
+        and isinstance(statement.value.value, str)
+
+
+def _normalize_body(body: list[ast.stmt]) -> list[ast.stmt]:
+    # Docstrings are dropped and function / class definitions are sorted by their structure, so reordering
+    # definitions does not change the result
+    body = [statement for statement in body if not _is_docstring(statement)]
+    for statement in body:
+        if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            statement.body = _normalize_body(statement.body) or [ast.Pass(lineno=statement.lineno)]
+
+    definitions = [statement for statement in body
+                   if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))]
+    others = [statement for statement in body if statement not in definitions]
+    return sorted(definitions, key=_shape) + others
+
+
+def normalize_ast(code: str) -> ast.Module:
+    tree = ast.parse(code)
+    tree.body = _normalize_body(tree.body)
+    return _IdentifierCanonicalizer(_get_defined_names(tree)).visit(tree)
+
+
+def tokenize_ast(code: str) -> list[tuple[str, int]]:
+    try:
+        tree = normalize_ast(code)
+    except (SyntaxError, ValueError):
+        # Code that does not parse falls back to plain tokens
+        return tokenize_python(code)
+
+    tokens = []
+    for node, line in _iter_nodes(tree):
+        if isinstance(node, ast.Name):
+            tokens.append((node.id, line))
+        elif isinstance(node, ast.Constant):
+            tokens.append((repr(node.value), line))
+        elif isinstance(node, ast.Attribute):
+            tokens.append((f"Attribute.{node.attr}", line))
+        elif isinstance(node, ast.keyword):
+            tokens.append((f"keyword.{node.arg}", line))
+        elif not isinstance(node, (ast.Module, ast.expr_context)):
+            tokens.append((type(node).__name__, line))
+
+    return tokens
+
+
+def fingerprint_ast(code: str, k: int = 8, window_size: int = 6) -> list[Fingerprint]:
+    return winnow(hash_k_grams(tokenize_ast(code), k), window_size)
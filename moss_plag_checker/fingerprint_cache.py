@@ -0,0 +1,32 @@
+import json
+import os
+
+from classroom_data.file_utils import atomic_write
+from moss_plag_checker.winnowing import Fingerprint
+
+
+# Fingerprints of submissions keyed by code hash, so re-runs only fingerprint code that was not seen before.
+# The key also holds the fingerprinting settings since different settings give different fingerprints.
+class FingerprintCache:
+    directory: str
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str) -> list[Fingerprint] | None:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+
+        with open(path, "r") as f:
+            return [Fingerprint(hash=fingerprint_hash, line=line) for fingerprint_hash, line in json.load(f)]
+
+    def put(self, key: str, fingerprints: list[Fingerprint]):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with atomic_write(path, fsync=False) as f:
+            json.dump([list(fingerprint) for fingerprint in fingerprints], f)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".json")
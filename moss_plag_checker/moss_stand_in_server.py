@@ -0,0 +1,131 @@
+import html
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from moss_plag_checker.winnowing import count_shared_fingerprints, fingerprint_code
+
+
+# Local server that speaks the MOSS submission protocol and serves the resulting report over HTTP. It lets MossAPI
+# be exercised without network access, point MossAPI at it with server="127.0.0.1" and port=server.port.
+# Reports are computed with the local winnowing fingerprints, so they look like MOSS reports but are not identical.
+class MossStandInServer:
+    host: str
+    reports: dict[str, bytes]
+    _submission_server: socketserver.ThreadingTCPServer
+    _http_server: ThreadingHTTPServer
+    _lock: threading.Lock
+    _report_count: int
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, http_port: int = 0):
+        self.host = host
+        self.reports = {}
+        self._lock = threading.Lock()
+        self._report_count = 0
+
+        stand_in = self
+
+        class SubmissionHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                stand_in._handle_submission(self.rfile, self.wfile)
+
+        class ReportHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                page = stand_in.reports.get(self.path.rstrip("/"))
+                if page is None:
+                    self.send_error(404)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(page)))
+                self.end_headers()
+                self.wfile.write(page)
+
+            def log_message(self, format, *args):
+                pass
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._submission_server = socketserver.ThreadingTCPServer((host, port), SubmissionHandler)
+        self._submission_server.daemon_threads = True
+        self._http_server = ThreadingHTTPServer((host, http_port), ReportHandler)
+        self._http_server.daemon_threads = True
+
+    @property
+    def port(self) -> int:
+        return self._submission_server.server_address[1]
+
+    @property
+    def http_port(self) -> int:
+        return self._http_server.server_address[1]
+
+    def start(self) -> "MossStandInServer":
+        threading.Thread(target=self._submission_server.serve_forever, daemon=True).start()
+        threading.Thread(target=self._http_server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._submission_server.shutdown()
+        self._submission_server.server_close()
+        self._http_server.shutdown()
+        self._http_server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _handle_submission(self, rfile, wfile):
+        base_files = []
+        files = []
+        while True:
+            line = rfile.readline().decode()
+            if not line:
+                return
+
+            command, _, arguments = line.strip().partition(" ")
+            if command == "language":
+                wfile.write(b"yes\n" if arguments == "python" else b"no\n")
+            elif command == "file":
+                file_id, language, size, display_name = arguments.split(" ", 3)
+                code = rfile.read(int(size)).decode("utf-8", errors="replace")
+                (base_files if file_id == "0" else files).append((display_name, code))
+            elif command == "query":
+                wfile.write(f"{self._create_report(base_files, files)}\n".encode())
+            elif command == "end":
+                return
+
+    def _create_report(self, base_files: list[tuple[str, str]], files: list[tuple[str, str]]) -> str:
+        base_hashes = {fingerprint.hash for _, code in base_files for fingerprint in fingerprint_code(code)}
+        fingerprint_sets = [{fingerprint.hash for fingerprint in fingerprint_code(code)} - base_hashes
+                            for _, code in files]
+        shared_counts = count_shared_fingerprints(fingerprint_sets, base_hashes, max(2, len(files) // 2))
+
+        with self._lock:
+            self._report_count += 1
+            report_path = f"/results/{self._report_count}"
+        report_url = f"http://{self.host}:{self.http_port}{report_path}"
+
+        rows = []
+        ranked = sorted(shared_counts.items(), key=lambda item: item[1], reverse=True)
+        for match_id, ((first, second), shared_count) in enumerate(ranked):
+            first_percent = 100 * shared_count // max(1, len(fingerprint_sets[first]))
+            second_percent = 100 * shared_count // max(1, len(fingerprint_sets[second]))
+            first_name = html.escape(files[first][0])
+            second_name = html.escape(files[second][0])
+
+            rows.append(f'<TR><TD><A HREF="{report_url}/match{match_id}.html">{first_name} ({first_percent}%)</A>'
+                        f'<TD><A HREF="{report_url}/match{match_id}.html">{second_name} ({second_percent}%)</A>'
+                        f'<TD>{shared_count}')
+            self.reports[f"{report_path}/match{match_id}.html"] = (
+                f"<HTML><BODY><H3>{first_name} - {second_name}</H3>"
+                f"<PRE>{html.escape(files[first][1])}</PRE><HR><PRE>{html.escape(files[second][1])}</PRE>"
+                f"</BODY></HTML>").encode()
+
+        self.reports[report_path] = (
+            "<HTML><HEAD><TITLE>Moss Results</TITLE></HEAD><BODY><TABLE>"
+            "<TR><TH>File 1<TH>File 2<TH>Lines Matched"
+            f"{''.join(rows)}</TABLE></BODY></HTML>").encode()
+
+        return report_url
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from dataclasses import dataclass, asdict
+
+from classroom_data import Question, hash_code
+from classroom_data.file_utils import atomic_write
+from moss_plag_checker.submissions import StudentSubmission
+
+
+@dataclass
+class MossRunRecord:
+    key: str
+    url: str
+    created: float
+    submission_count: int
+    has_full_report: bool
+
+
+def get_run_key(question: Question, submissions: list[StudentSubmission]) -> str:
+    sha = hashlib.sha256()
+    sha.update(question.question.encode())
+    sha.update(hash_code(question.base_code).encode())
+    entries = sorted((submission.get_temp_submission_file_name(), hash_code(submission.submission_code))
+                     for submission in submissions)
+    for file_name, code_hash in entries:
+        sha.update(f"{file_name}\0{code_hash}\n".encode())
+
+    return sha.hexdigest()
+
+
+# Reports of earlier MOSS runs keyed by the submission set they were made for. A question keeps the history of all its
+# runs, so an unchanged set of submissions is answered from disk instead of being uploaded and queued again.
+class MossRunCache:
+    directory: str
+
+    def __init__(self, directory: str = "moss_run_cache"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def get_history(self, question_name: str) -> list[MossRunRecord]:
+        history_file = self._history_file(question_name)
+        if not os.path.exists(history_file):
+            return []
+
+        with open(history_file, "r") as f:
+            return [MossRunRecord(**record) for record in json.load(f)]
+
+    def lookup(self, question_name: str, key: str, needs_full_report: bool = False) -> MossRunRecord | None:
+        return next((record for record in reversed(self.get_history(question_name))
+                     if record.key == key and (record.has_full_report or not needs_full_report)), None)
+
+    def restore(self, question_name: str, record: MossRunRecord, save_dir: str):
+        os.makedirs(save_dir, exist_ok=True)
+        shutil.copyfile(os.path.join(self._run_dir(question_name, record.key), "report.html"),
+                        os.path.join(save_dir, "report.html"))
+        if record.has_full_report:
+            shutil.copytree(os.path.join(self._run_dir(question_name, record.key), "report"),
+                            os.path.join(save_dir, "report"), dirs_exist_ok=True)
+
+    def store(self, question_name: str, key: str, url: str, submission_count: int, save_dir: str) -> MossRunRecord:
+        run_dir = self._run_dir(question_name, key)
+        os.makedirs(run_dir, exist_ok=True)
+        shutil.copyfile(os.path.join(save_dir, "report.html"), os.path.join(run_dir, "report.html"))
+
+        has_full_report = os.path.isdir(os.path.join(save_dir, "report"))
+        if has_full_report:
+            shutil.copytree(os.path.join(save_dir, "report"), os.path.join(run_dir, "report"), dirs_exist_ok=True)
+
+        record = MossRunRecord(key=key, url=url, created=time.time(), submission_count=submission_count,
+                               has_full_report=has_full_report)
+        history = self.get_history(question_name) + [record]
+
+        with atomic_write(self._history_file(question_name), fsync=False) as f:
+            json.dump([asdict(history_record) for history_record in history], f, indent=4)
+
+        return record
+
+    def _run_dir(self, question_name: str, key: str) -> str:
+        return os.path.join(self.directory, question_name, key)
+
+    def _history_file(self, question_name: str) -> str:
+        return os.path.join(self.directory, question_name, "history.json")
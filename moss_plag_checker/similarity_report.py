@@ -0,0 +1,64 @@
+import html
+import json
+import os
+from dataclasses import dataclass, asdict
+
+from moss_plag_checker.submissions import StudentSubmission
+
+
+@dataclass
+class SimilarityMatch:
+    first: str
+    second: str
+    first_percent: float
+    second_percent: float
+    shared_fingerprints: int
+    first_lines: list[int]
+    second_lines: list[int]
+
+    @property
+    def score(self) -> float:
+        return max(self.first_percent, self.second_percent)
+
+
+def get_submission_display_name(submission: StudentSubmission) -> str:
+    return f"{submission.name} {submission.surname} ({submission.student_number})"
+
+
+def write_similarity_report(matches: list[SimilarityMatch], question_name: str, save_dir: str):
+    os.makedirs(save_dir, exist_ok=True)
+
+    with open(os.path.join(save_dir, "report.json"), "w") as f:
+        json.dump({"question": question_name, "matches": [asdict(match) for match in matches]}, f, indent=4)
+
+    rows = "\n".join(
+        f"<tr><td>{html.escape(match.first)} ({match.first_percent:.0f}%)</td>"
+        f"<td>{html.escape(match.second)} ({match.second_percent:.0f}%)</td>"
+        f"<td>{match.shared_fingerprints}</td>"
+        f"<td>{_format_lines(match.first_lines)}</td><td>{_format_lines(match.second_lines)}</td></tr>"
+        for match in matches)
+
+    with open(os.path.join(save_dir, "report.html"), "w") as f:
+        f.write(f"""<html>
+<head><title>Similarity report for {html.escape(question_name)}</title></head>
+<body>
+<h1>Similarity report for {html.escape(question_name)}</h1>
+<table border="1">
+<tr><th>File 1</th><th>File 2</th><th>Shared fingerprints</th><th>Lines in file 1</th><th>Lines in file 2</th></tr>
+{rows}
+</table>
+</body>
+</html>
+""")
+
+
+def _format_lines(lines: list[int]) -> str:
+    # Collapses consecutive line numbers into ranges, e.g. 1-4, 7
+    ranges = []
+    for line in lines:
+        if ranges and line == ranges[-1][1] + 1:
+            ranges[-1][1] = line
+        else:
+            ranges.append([line, line])
+
+    return ", ".join(str(start) if start == end else f"{start}-{end}" for start, end in ranges)
@@ -0,0 +1,43 @@
+from dataclasses import dataclass
+from typing import List
+
+from classroom_data import Classroom
+
+
+@dataclass
+class StudentSubmission:
+    name: str
+    surname: str
+    student_number: str
+    submission_code: str
+
+    def get_temp_submission_file_name(self) -> str:
+        return f"{self.name}_{self.surname}_{self.student_number}.py"
+
+
+def get_student_submissions(classroom: Classroom, question_name: str) -> List[StudentSubmission]:
+    submissions = []
+    for student in classroom.students:
+        question_info = student.get_question_info(question_name)
+
+        if question_info is None:
+            student_submission = None
+        else:
+            student_submission = StudentSubmission(name=student.name,
+                                                   surname=student.surname,
+                                                   student_number=student.student_number,
+                                                   submission_code=question_info.code)
+
+        if student_submission is None:
+            print(
+                f"Cannot find submission for student {student.name} {student.surname} "
+                f"for questions {question_name}")
+            continue
+
+        if student_submission.submission_code == "":
+            print(f"Submission for student {student.name} {student.surname} is empty")
+            continue
+
+        submissions.append(student_submission)
+
+    return submissions
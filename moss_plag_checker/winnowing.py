@@ -0,0 +1,89 @@
+import io
+import keyword
+import tokenize
+import zlib
+from collections import namedtuple
+
+# A fingerprint is the hash of a k-gram of tokens together with the source line the k-gram starts on
+Fingerprint = namedtuple("Fingerprint", ["hash", "line"])
+
+_SKIPPED_TOKENS = {tokenize.COMMENT, tokenize.NL, tokenize.ENCODING, tokenize.ENDMARKER, tokenize.TYPE_COMMENT}
+
+
+def tokenize_python(code: str) -> list[tuple[str, int]]:
+    # Identifiers and literals are abstracted so renaming variables or changing constants does not hide a match
+    tokens = []
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(code).readline):
+            if token.type in _SKIPPED_TOKENS:
+                continue
+
+            if token.type == tokenize.NAME:
+                text = token.string if keyword.iskeyword(token.string) else "V"
+            elif token.type == tokenize.NUMBER:
+                text = "N"
+            elif token.type == tokenize.STRING:
+                text = "S"
+            else:
+                text = token.string if token.type == tokenize.OP else tokenize.tok_name[token.type]
+
+            tokens.append((text, token.start[0]))
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        # Broken submissions are still compared up to the point where they stop being valid Python
+        pass
+
+    return tokens
+
+
+def hash_k_grams(tokens: list[tuple[str, int]], k: int) -> list[Fingerprint]:
+    return [Fingerprint(hash=zlib.crc32("\0".join(text for text, _ in tokens[i:i + k]).encode()), line=tokens[i][1])
+            for i in range(len(tokens) - k + 1)]
+
+
+def winnow(k_gram_hashes: list[Fingerprint], window_size: int) -> list[Fingerprint]:
+    # Keeps the rightmost minimum hash of every window, which guarantees that any match of at least
+    # window_size + k - 1 tokens shares a fingerprint
+    if len(k_gram_hashes) <= window_size:
+        return [min(reversed(k_gram_hashes), key=lambda fingerprint: fingerprint.hash)] if k_gram_hashes else []
+
+    fingerprints = []
+    selected = -1
+    for start in range(len(k_gram_hashes) - window_size + 1):
+        window_end = start + window_size
+        if selected < start:
+            selected = min(range(start, window_end), key=lambda i: (k_gram_hashes[i].hash, -i))
+        elif k_gram_hashes[window_end - 1].hash <= k_gram_hashes[selected].hash:
+            selected = window_end - 1
+        else:
+            continue
+
+        if not fingerprints or fingerprints[-1] is not k_gram_hashes[selected]:
+            fingerprints.append(k_gram_hashes[selected])
+
+    return fingerprints
+
+
+def fingerprint_code(code: str, k: int = 5, window_size: int = 4) -> list[Fingerprint]:
+    return winnow(hash_k_grams(tokenize_python(code), k), window_size)
+
+
+def count_shared_fingerprints(fingerprint_sets: list[set[int]], ignored_hashes: set[int],
+                              max_occurrences: int) -> dict[tuple[int, int], int]:
+    # Candidate pairs come from an inverted index, so only submissions that share a fingerprint are ever compared.
+    # Fingerprints found in more than max_occurrences submissions are treated as boilerplate and skipped.
+    index = {}
+    for submission_id, fingerprints in enumerate(fingerprint_sets):
+        for fingerprint_hash in fingerprints:
+            if fingerprint_hash not in ignored_hashes:
+                index.setdefault(fingerprint_hash, []).append(submission_id)
+
+    shared_counts = {}
+    for submission_ids in index.values():
+        if len(submission_ids) < 2 or len(submission_ids) > max_occurrences:
+            continue
+
+        for i, first in enumerate(submission_ids):
+            for second in submission_ids[i + 1:]:
+                shared_counts[(first, second)] = shared_counts.get((first, second), 0) + 1
+
+    return shared_counts
@@ -1,5 +1,10 @@
+import sys
+
 from classroom_data import *
-from moss_plag_checker import MossAPI
+from moss_plag_checker import MossAPI, LocalMossAPI
+from moss_plag_checker.fingerprint_cache import FingerprintCache
+from moss_plag_checker.moss_stand_in_server import MossStandInServer
+from moss_plag_checker.run_cache import MossRunCache
 
 
 QUESTION_NAMES = [
@@ -16,6 +21,22 @@ def load_classroom() -> Classroom:
 if __name__ == "__main__":
     classroom = load_classroom()
 
-    for question_name in QUESTION_NAMES:
-        moss_api = MossAPI(classroom)
-        moss_api.run_moss(question_name, f"plag_report/{question_name}")
+    # --local compares the submissions on this machine instead of uploading them to the MOSS service,
+    # --ast additionally compares normalized syntax trees so renaming and reordering do not hide copied code
+    use_local_checker = "--local" in sys.argv[1:] or "--ast" in sys.argv[1:]
+    similarity_mode = "ast" if "--ast" in sys.argv[1:] else "tokens"
+
+    if use_local_checker:
+        for question_name in QUESTION_NAMES:
+            moss_api = LocalMossAPI(classroom, mode=similarity_mode, cache=FingerprintCache("fingerprint_cache"))
+            moss_api.run_moss(question_name, f"plag_report/{question_name}")
+    elif "--stand-in" in sys.argv[1:]:
+        # Exercises the whole MOSS client against a local server speaking the MOSS protocol
+        with MossStandInServer() as server:
+            moss_api = MossAPI(classroom, api_key="stand-in", server="127.0.0.1", port=server.port,
+                               run_cache=MossRunCache("moss_run_cache/stand_in"))
+            moss_api.run_moss_concurrently(QUESTION_NAMES, download_full_report="--full-report" in sys.argv[1:])
+    else:
+        # All questions are submitted at once, each run in its own temporary workspace
+        moss_api = MossAPI(classroom, run_cache=MossRunCache("moss_run_cache"))
+        moss_api.run_moss_concurrently(QUESTION_NAMES, download_full_report="--full-report" in sys.argv[1:])
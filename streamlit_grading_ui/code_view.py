@@ -0,0 +1,105 @@
+import difflib
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Callable
+
+import streamlit as st
+
+from classroom_data import StudentQuestionInfo, hash_code
+
+try:
+    from pygments import highlight
+    from pygments.formatters import HtmlFormatter
+    from pygments.lexers import DiffLexer, PythonLexer
+except ImportError:
+    # Without pygments code and diffs are shown with st.code, which highlights them in the browser on every rerun
+    highlight = None
+
+
+class RenderCache:
+    # Bounded LRU of rendered output keyed by code hashes, shared by every rerun and browser session of the server
+    max_size: int
+    _entries: OrderedDict
+    _lock: threading.Lock
+
+    def __init__(self, max_size: int = 512):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, render: Callable[[], object]) -> object:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        # Rendering happens outside the lock, two sessions opening the same new submission may both render it
+        value = render()
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+        return value
+
+
+render_cache = RenderCache()
+
+# code_html and diff_html are None without pygments, diff is None for questions without base code
+RenderedSubmission = namedtuple("RenderedSubmission", ["code_html", "diff", "diff_html"])
+
+
+def get_code_hash(question_info: StudentQuestionInfo) -> str:
+    # Code kept in a code store already knows its hash
+    return question_info.code_hash if question_info.code_hash is not None else hash_code(question_info.code)
+
+
+def get_base_code_diff(base_code: str, code: str) -> str:
+    return "\n".join(difflib.unified_diff(base_code.splitlines(), code.splitlines(), "base code", "submission",
+                                          lineterm=""))
+
+
+def _to_html(text: str, lexer) -> str:
+    html = highlight(text, lexer, HtmlFormatter(noclasses=True, linenos="inline"))
+    return f'<div style="overflow-x: auto; font-size: 0.85em">{html}</div>'
+
+
+def render_submission(question_info: StudentQuestionInfo) -> RenderedSubmission:
+    # Highlighting and diffing cost something once per distinct submission, reruns and the prefetcher reuse the
+    # cached output
+    code = question_info.code
+    base_code = question_info.question.base_code
+
+    def render() -> RenderedSubmission:
+        diff = get_base_code_diff(base_code, code) if base_code != "" else None
+        if highlight is None:
+            return RenderedSubmission(code_html=None, diff=diff, diff_html=None)
+
+        return RenderedSubmission(code_html=_to_html(code, PythonLexer()), diff=diff,
+                                  diff_html=_to_html(diff, DiffLexer()) if diff else None)
+
+    return render_cache.get((get_code_hash(question_info), hash_code(base_code)), render)
+
+
+def show_code(question_info: StudentQuestionInfo):
+    if question_info.code == "":
+        st.write("No submission")
+        return
+
+    rendered = render_submission(question_info)
+    code_tab, diff_tab = st.tabs(["Code", "Changes to Base Code"])
+    with code_tab:
+        if rendered.code_html is None:
+            st.code(question_info.code, language="python")
+        else:
+            st.markdown(rendered.code_html, unsafe_allow_html=True)
+
+    with diff_tab:
+        if rendered.diff is None:
+            st.write("The question has no base code")
+        elif rendered.diff == "":
+            st.write("Same as the base code")
+        elif rendered.diff_html is None:
+            st.code(rendered.diff, language="diff")
+        else:
+            st.markdown(rendered.diff_html, unsafe_allow_html=True)
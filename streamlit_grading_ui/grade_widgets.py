@@ -0,0 +1,18 @@
+from typing import MutableMapping
+
+from classroom_data import Student
+
+
+def get_grade_widget_keys(question_name: str, student: Student) -> tuple[str, str, str]:
+    # Session state of the grade radios and of the version of the grade they were first shown with. Keyed on the
+    # student number like the journal, two students with the same name must not share a radio or a version.
+    cell = f"{question_name} {student.student_number}"
+    return f"Grade {cell}", f"is_graded {cell}", f"version {cell}"
+
+
+def forget_grade_widgets(session_state: MutableMapping, question_name: str, students: list[Student]):
+    # After a write that did not come from the radios they show the stored grade again and its version is read again,
+    # otherwise the next rerun would write the old radio values back over it
+    for student in students:
+        for key in get_grade_widget_keys(question_name, student):
+            session_state.pop(key, None)
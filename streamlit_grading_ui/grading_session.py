@@ -0,0 +1,122 @@
+import os
+import threading
+from dataclasses import dataclass, field
+
+import streamlit as st
+
+from classroom_data import ClassroomBuilder, Classroom, CodeStore, Question, RosterMatcher, save_classroom_to_json, \
+    load_classroom_from_json
+from classroom_data.auto_grader import AutoGrader
+from classroom_data.classroom_index import ClassroomIndex
+from classroom_data.clustering import SubmissionCluster, cluster_submissions
+from classroom_data.grader_assignments import GraderAssignments
+from classroom_data.settings_loader import DEFAULT_SETTINGS_FILE
+from streamlit_grading_ui.prefetcher import Prefetcher
+
+
+@dataclass
+class GradingSession:
+    classroom: Classroom
+    index: ClassroomIndex
+    classroom_file_name: str
+    submissions_directory: str
+    # Names and student numbers of new students are taken from this student list if it exists
+    roster_file_name: str | None = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    # Kept with the session so cached auto-grade results and prefetch work outlive a rerun
+    auto_grader: AutoGrader = field(default_factory=AutoGrader)
+    prefetcher: Prefetcher = field(default_factory=Prefetcher)
+    _clusters: dict[str, list[SubmissionCluster]] = field(default_factory=dict)
+    # Classroom.structure_version the index and the clusters were built for
+    _structure_version: int = 0
+    # Read again only when the assignments file changes, None is the modification time of a missing file
+    _assignments: GraderAssignments = field(default_factory=GraderAssignments)
+    _assignments_mtime: int | None = None
+
+    @property
+    def assignments_file_name(self) -> str:
+        # classroom.json -> classroom_assignments.json, see GraderAssignments
+        return os.path.splitext(self.classroom_file_name)[0] + "_assignments.json"
+
+    def get_assignments(self) -> GraderAssignments:
+        with self.lock:
+            try:
+                mtime = os.stat(self.assignments_file_name).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime != self._assignments_mtime:
+                self._assignments = GraderAssignments.load(self.assignments_file_name)
+                self._assignments_mtime = mtime
+            return self._assignments
+
+    def get_clusters(self, question: Question) -> list[SubmissionCluster]:
+        # Code only changes on refresh, so the clusters of a question are computed once per refresh
+        with self.lock:
+            if question.question not in self._clusters:
+                self._clusters[question.question] = cluster_submissions(self.classroom.students, question)
+            return self._clusters[question.question]
+
+    def sync(self):
+        # Applies what other grading processes journaled, and rebuilds the lookup tables when a compaction of theirs
+        # brought in new students or changed code
+        with self.lock:
+            self.classroom.sync()
+            self._update_structure()
+
+    def refresh(self) -> ClassroomBuilder:
+        # The classroom lock keeps other grading processes from compacting between taking over their students and
+        # saving the rescanned classroom
+        with self.lock, self.classroom.lock():
+            self.classroom.sync()
+            builder = ClassroomBuilder(self.submissions_directory).set_roster(get_roster(self.roster_file_name)) \
+                .unzip()
+            builder.refresh(self.classroom)
+            if builder.refresh_report.has_changes():
+                save_classroom_to_json(self.classroom, self.classroom_file_name)
+            self._update_structure()
+
+        return builder
+
+    def _update_structure(self):
+        if self._structure_version != self.classroom.structure_version:
+            self._structure_version = self.classroom.structure_version
+            self.index.rebuild()
+            self._clusters.clear()
+
+
+def get_roster(roster_file_name: str | None) -> RosterMatcher | None:
+    if roster_file_name is None or not os.path.exists(roster_file_name):
+        return None
+    return RosterMatcher.from_csv(roster_file_name)
+
+
+def load_grading_session(classroom_file_name: str, submissions_directory: str, code_store_directory: str,
+                         settings_file_name: str = DEFAULT_SETTINGS_FILE,
+                         roster_file_name: str | None = "student_list.csv") -> GradingSession:
+    if not os.path.exists(classroom_file_name):
+        classroom = ClassroomBuilder(submissions_directory).set_settings_file(settings_file_name) \
+            .set_roster(get_roster(roster_file_name)).unzip().set_code_store(CodeStore(code_store_directory)).build()
+        save_classroom_to_json(classroom, classroom_file_name)
+
+    # Grade changes are appended to the journal next to the classroom file and folded back into it on compaction
+    classroom = load_classroom_from_json(classroom_file_name, settings_file_name)
+
+    # Move classroom files that still inline every submission over to the code store index
+    if classroom.code_store is None:
+        classroom.code_store = CodeStore(code_store_directory)
+        save_classroom_to_json(classroom, classroom_file_name)
+
+    return GradingSession(classroom=classroom, index=ClassroomIndex(classroom),
+                          classroom_file_name=classroom_file_name, submissions_directory=submissions_directory,
+                          roster_file_name=roster_file_name)
+
+
+# One classroom per server process and set of files, shared by every rerun and every browser session. Several courses
+# can be served from one process by passing their own files.
+@st.cache_resource
+def get_grading_session(classroom_file_name: str = "classroom.json", submissions_directory: str = "submissions",
+                        code_store_directory: str = "classroom_code",
+                        settings_file_name: str = DEFAULT_SETTINGS_FILE,
+                        roster_file_name: str | None = "student_list.csv") -> GradingSession:
+    return load_grading_session(classroom_file_name, submissions_directory, code_store_directory, settings_file_name,
+                                roster_file_name)
@@ -0,0 +1,31 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+
+# Prepares the students the grader is likely to open next on background threads while the current one is being read.
+# The work only fills caches (code store, rendered code, auto-grade results), so a rerun that gets there first simply
+# does the same work itself.
+class Prefetcher:
+    _executor: ThreadPoolExecutor
+    _pending: dict[tuple, Future]
+    _lock: threading.Lock
+
+    def __init__(self, workers: int = 2):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, key: tuple, work: Callable[[], object]):
+        # Work for a key that is still queued or running is not submitted again
+        with self._lock:
+            self._pending = {pending_key: future for pending_key, future in self._pending.items()
+                             if not future.done()}
+            if key not in self._pending:
+                self._pending[key] = self._executor.submit(self._run, key, work)
+
+    def _run(self, key: tuple, work: Callable[[], object]):
+        try:
+            work()
+        except Exception as e:
+            print(f"Prefetching {key} failed. Reason: {e}")
@@ -0,0 +1,41 @@
+import os
+from collections import namedtuple
+
+import pytest
+import yaml
+
+from classroom_data import ClassroomBuilder, CodeStore, save_classroom_to_json
+
+ClassroomFiles = namedtuple("ClassroomFiles", ["classroom_file_name", "settings_file_name", "submissions_directory"])
+
+
+def add_submission(submissions_directory: str, name: str, student_number: int, files: dict[str, str]) -> str:
+    submission_directory = os.path.join(submissions_directory, f"{name}_{student_number}_assignsubmission_file")
+    os.makedirs(submission_directory, exist_ok=True)
+    for file_name, code in files.items():
+        with open(os.path.join(submission_directory, file_name), "w", encoding="utf-8") as f:
+            f.write(code)
+
+    return submission_directory
+
+
+@pytest.fixture
+def classroom_files(tmp_path) -> ClassroomFiles:
+    # Three students with two questions, built and saved with a code store like the grading app does
+    settings_file_name = str(tmp_path / "settings.yml")
+    with open(settings_file_name, "w", encoding="utf-8") as f:
+        yaml.safe_dump({"Questions": [{"question": f"Question{i}", "keys": [f"q{i}"], "grade": 10,
+                                       "possible_grades": [0, 5, 10]} for i in (1, 2)]}, f)
+
+    submissions_directory = str(tmp_path / "submissions")
+    for student_number, name in enumerate(["Ali Kaya", "Ayse Demir", "Can Celik"], 100):
+        add_submission(submissions_directory, name, student_number,
+                       {"q1.py": f"print({student_number})\n", "q2.py": f"print({student_number} * 2)\n"})
+
+    classroom_file_name = str(tmp_path / "classroom.json")
+    classroom = ClassroomBuilder(submissions_directory).set_settings_file(settings_file_name) \
+        .set_code_store(CodeStore(str(tmp_path / "classroom_code"))).build()
+    save_classroom_to_json(classroom, classroom_file_name)
+
+    return ClassroomFiles(classroom_file_name=classroom_file_name, settings_file_name=settings_file_name,
+                          submissions_directory=submissions_directory)
@@ -0,0 +1,80 @@
+import ast
+
+from moss_plag_checker.ast_normalizer import fingerprint_ast, normalize_ast, tokenize_ast
+
+ORIGINAL = """
+import math as m
+
+
+class Account:
+    def __init__(self, owner, balance=0):
+        self.owner = owner
+        self.balance = balance
+
+    def deposit(self, amount):
+        try:
+            self.balance += amount
+        except TypeError as error:
+            print(error, end="")
+        return self.balance
+
+
+def total(accounts):
+    return m.fsum(account.deposit(amount=0) for account in accounts)
+
+
+print(total([Account("a", balance=3)]))
+"""
+
+# Every identifier renamed: class, methods, attributes, parameters, keyword arguments, the import alias and the
+# exception name
+RENAMED = """
+import math as maths
+
+
+class Wallet:
+    def __init__(self, person, money=0):
+        self.person = person
+        self.money = money
+
+    def put(self, value):
+        try:
+            self.money += value
+        except TypeError as problem:
+            print(problem, end="")
+        return self.money
+
+
+def sum_all(wallets):
+    return maths.fsum(wallet.put(value=0) for wallet in wallets)
+
+
+print(sum_all([Wallet("a", money=3)]))
+"""
+
+
+def test_renamed_copy_normalizes_the_same():
+    assert ast.dump(normalize_ast(RENAMED)) == ast.dump(normalize_ast(ORIGINAL))
+    assert tokenize_ast(RENAMED) == tokenize_ast(ORIGINAL)
+    assert fingerprint_ast(RENAMED) == fingerprint_ast(ORIGINAL)
+
+
+def test_library_names_are_kept():
+    tokens = [token for token, _ in tokenize_ast("values = []\nvalues.append(1)\nprint(values, end='')\n")]
+
+    assert "Attribute.append" in tokens
+    assert "keyword.end" in tokens
+    assert "values" not in tokens
+
+
+def test_renamed_attributes_are_canonical():
+    tree = normalize_ast("class A:\n    def run(self):\n        self.count = 1\n        return self.count\n")
+
+    attributes = {node.attr for node in ast.walk(tree) if isinstance(node, ast.Attribute)}
+    assert attributes and all(attribute.startswith("v") for attribute in attributes)
+
+
+def test_changed_structure_differs():
+    changed = ORIGINAL.replace("self.balance += amount", "self.balance -= amount * 2")
+
+    assert tokenize_ast(changed) != tokenize_ast(ORIGINAL)
@@ -0,0 +1,123 @@
+import dataclasses
+import os
+import time
+
+import pytest
+
+from classroom_data import ClassroomBuilder, load_classroom_from_json
+from classroom_data import auto_grader
+from classroom_data.auto_grader import AutoGradeResult, AutoGrader, get_suggested_grade, run_test
+from classroom_data.question_data.question import Question
+from classroom_data.question_data import question as question_data
+from tests.conftest import add_submission
+
+ECHO_SUM = "print(sum(int(x) for x in input().split()))\n"
+
+
+def _run(tmp_path, code: str, test: question_data.TestCase = question_data.TestCase("sum", "1 2\n", "3\n"),
+         time_limit: float = 1, memory_limit: int = 256) -> tuple[bool, str]:
+    file_name = tmp_path / "submission.py"
+    file_name.write_text(code)
+    return run_test(str(file_name), test, time_limit, memory_limit)
+
+
+def _with_tests(question: Question) -> Question:
+    return dataclasses.replace(question, tests=[question_data.TestCase("sum", "1 2\n", "3\n"),
+                                                question_data.TestCase("zero", "0 0\n", "0\n")])
+
+
+def test_run_test_outcomes(tmp_path):
+    assert _run(tmp_path, ECHO_SUM) == (True, "")
+    assert _run(tmp_path, "print(4)\n") == (False, "Wrong output")
+    assert _run(tmp_path, "print(3)   \n\n\n") == (True, "")
+    assert _run(tmp_path, "raise ValueError('bad input')\n") == (False, "ValueError: bad input")
+    assert _run(tmp_path, "import sys\nsys.exit(3)\n") == (False, "Exited with code 3")
+
+
+def test_wall_clock_limit(tmp_path):
+    # Sleeping or waiting for input uses no CPU time, only the wall clock timeout ends it
+    started = time.monotonic()
+    assert _run(tmp_path, "import time\ntime.sleep(30)\n", time_limit=0.5) == (False, "Wall clock time limit exceeded")
+    assert time.monotonic() - started < 10
+
+
+@pytest.mark.skipif(auto_grader.resource is None, reason="limits need the resource module")
+def test_cpu_time_limit(tmp_path):
+    assert _run(tmp_path, "while True:\n    pass\n", time_limit=1) == (False, "CPU time limit exceeded")
+
+
+@pytest.mark.skipif(auto_grader.resource is None, reason="limits need the resource module")
+def test_memory_limit(tmp_path):
+    assert _run(tmp_path, "data = bytearray(512 * 1024 * 1024)\nprint(3)\n", memory_limit=128) \
+        == (False, "MemoryError")
+
+
+@pytest.mark.skipif(not hasattr(os, "killpg"), reason="process groups are not available")
+def test_background_processes_are_killed(tmp_path):
+    # The submission leaves a process behind, detached from its output, that would write a file after it finished
+    leftover = tmp_path / "leftover"
+    child_code = f"import time; time.sleep(1); open({str(leftover)!r}, 'w')"
+    code = ("import subprocess, sys\n"
+            f"subprocess.Popen([sys.executable, '-c', {child_code!r}], stdin=subprocess.DEVNULL,\n"
+            "                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)\n"
+            "print(3)\n")
+    assert _run(tmp_path, code) == (True, "")
+    time.sleep(2)
+    assert not leftover.exists()
+
+
+def test_results_are_cached_by_code_and_suite(classroom_files, tmp_path, monkeypatch):
+    add_submission(classroom_files.submissions_directory, "Ali Kaya", 100, {"q1.py": ECHO_SUM})
+    add_submission(classroom_files.submissions_directory, "Ayse Demir", 101, {"q1.py": ECHO_SUM})
+    classroom = ClassroomBuilder(classroom_files.submissions_directory) \
+        .set_settings_file(classroom_files.settings_file_name).build()
+    question = _with_tests(classroom.get_questions()[0])
+
+    graded_codes = []
+    grade_code = auto_grader.grade_code
+    monkeypatch.setattr(auto_grader, "grade_code",
+                        lambda question, code: graded_codes.append(code) or grade_code(question, code))
+
+    results = AutoGrader(str(tmp_path / "cache"), workers=2).grade_question(classroom.students, question)
+    assert [result.score for _, result in results] == [10, 10, 0]
+    assert [test_result.reason for test_result in results[2][1].test_results] == ["Wrong output", "Wrong output"]
+    # The two identical submissions ran once
+    assert sorted(graded_codes) == sorted([ECHO_SUM, "print(102)\n"])
+
+    # A new grader on the same directory reads the results from disk instead of running them again
+    graded_codes.clear()
+    assert AutoGrader(str(tmp_path / "cache")).grade_question(classroom.students, question) == results
+    assert graded_codes == []
+
+    # Changing a limit is a new suite
+    changed_question = dataclasses.replace(question, time_limit=3)
+    assert AutoGrader(str(tmp_path / "cache")).get_cached_result(changed_question, ECHO_SUM) is None
+    assert AutoGrader(str(tmp_path / "cache")).get_cached_result(question, ECHO_SUM) == results[0][1]
+
+
+def test_prefill_never_overwrites_a_grade(classroom_files, tmp_path):
+    classroom = load_classroom_from_json(classroom_files.classroom_file_name, classroom_files.settings_file_name)
+    other = load_classroom_from_json(classroom_files.classroom_file_name, classroom_files.settings_file_name)
+    students = {student.student_number: student for student in classroom.students}
+    question = _with_tests(classroom.get_questions()[0])
+
+    # 100 is graded, 101 has an earlier suggestion and 102 was graded by another process after this one loaded
+    classroom.set_grade(students[100], "Question1", 0, True)
+    classroom.set_grade(students[101], "Question1", 5, False)
+    other.set_grade(next(student for student in other.students if student.student_number == 102), "Question1", 5, True)
+
+    grader = AutoGrader(str(tmp_path / "cache"))
+    result = AutoGradeResult(code_hash="", suite_hash="", test_results=[], score=10)
+    assert grader.prefill_grades(classroom, question, [(student, result) for student in students.values()]) == 0
+    assert [(students[number].get_question_info("Question1").grade, students[number].is_graded["Question1"])
+            for number in (100, 101, 102)] == [(0, True), (5, False), (5, True)]
+
+    # An untouched submission gets the suggestion, still marked as not graded
+    assert grader.prefill_grades(classroom, _with_tests(classroom.get_questions()[1]), [(students[100], result)]) == 1
+    assert (students[100].get_question_info("Question2").grade, students[100].is_graded["Question2"]) == (10, False)
+
+
+def test_suggested_grade():
+    question = Question("Question1", ["q1"], [0, 5, 10], 10, "")
+    assert [get_suggested_grade(question, AutoGradeResult("", "", [], score)) for score in (0, 4.9, 5, 9.99, 10)] \
+        == [0, 0, 5, 5, 10]
@@ -0,0 +1,63 @@
+from classroom_data import ClassroomBuilder
+from classroom_data import classroom as classroom_module
+from tests.conftest import add_submission
+
+
+def _get_builder(classroom_files) -> ClassroomBuilder:
+    return ClassroomBuilder(classroom_files.submissions_directory) \
+        .set_settings_file(classroom_files.settings_file_name).set_read_archives(True)
+
+
+def _add_problem_submissions(classroom_files):
+    # An extra unmatched file, a file used for both questions, a missing question and an unreadable archive
+    add_submission(classroom_files.submissions_directory, "Ali Kaya", 100, {"helpers.py": "X = 1\n"})
+    add_submission(classroom_files.submissions_directory, "Deniz Ak", 200, {"q1_q2.py": "print(200)\n"})
+    directory = add_submission(classroom_files.submissions_directory, "Ece Bal", 201, {"q2.py": "print(201)\n"})
+    with open(f"{directory}/homework.zip", "wb") as f:
+        f.write(b"not a zip")
+
+
+def _get_warnings(events) -> list[tuple[int, str, list[str]]]:
+    return [(warning.student.student_number, warning.kind, warning.questions)
+            for event in events for warning in event.warnings]
+
+
+def test_streamed_students_match_build(classroom_files, capsys, monkeypatch):
+    _add_problem_submissions(classroom_files)
+    built = _get_builder(classroom_files).build()
+    printed = capsys.readouterr().out.splitlines()
+
+    # A small read-ahead makes submissions finish parsing while earlier students are still being yielded
+    monkeypatch.setattr(classroom_module, "_PARSE_AHEAD", 2)
+    builder = _get_builder(classroom_files)
+    events = list(builder.iter_students())
+    assert capsys.readouterr().out == ""
+
+    assert [event.student.to_json() for event in events] == [student.to_json() for student in built.students]
+    assert all(warning.student is event.student for event in events for warning in event.warnings)
+    assert sorted(_get_warnings(events)) == [
+        (100, "unmatched", []),
+        (200, "multiple_questions", ["Question1", "Question2"]),
+        (201, "missing_submission", ["Question1"]),
+        (201, "unreadable_archive", [])
+    ]
+
+    # build() prints the same warnings it would have streamed, apart from the ones only collected in the reports
+    assert printed == [warning.message for event in events for warning in event.warnings
+                       if warning.kind == "missing_submission"]
+    assert [issue.kind for issue in builder.scan_report.issues] == ["unmatched", "multiple_questions"]
+    assert [failure.zip_path for failure in builder.unzip_failures] == \
+           [f"{events[-1].student.submission_directory}/homework.zip"]
+
+
+def test_stopping_early_keeps_the_order(classroom_files, monkeypatch):
+    _add_problem_submissions(classroom_files)
+    monkeypatch.setattr(classroom_module, "_PARSE_AHEAD", 1)
+
+    students = []
+    for event in _get_builder(classroom_files).iter_students():
+        students.append(event.student.student_number)
+        if len(students) == 2:
+            break
+
+    assert students == [100, 101]
@@ -0,0 +1,48 @@
+import json
+
+from classroom_data import load_classroom_from_json, save_classroom_to_json
+
+
+def get_codes(classroom) -> dict:
+    return {(student.student_number, q_info.question.question): q_info.code
+            for student in classroom.students for q_info in student.question_info}
+
+
+def test_index_round_trip(classroom_files):
+    with open(classroom_files.classroom_file_name, "r") as f:
+        data = json.load(f)
+    assert isinstance(data, dict) and "code" not in data["students"][0]["question_info"][0]
+
+    classroom = load_classroom_from_json(classroom_files.classroom_file_name, classroom_files.settings_file_name)
+    q_info = classroom.students[0].question_info[0]
+    assert classroom.code_store is not None
+    assert q_info.code_hash is not None
+    # Read from the code store on access
+    assert q_info.code == f"print({classroom.students[0].student_number})\n"
+
+    q_info.code = "print('changed')\n"
+    assert q_info.code_hash is None
+    save_classroom_to_json(classroom, classroom_files.classroom_file_name)
+    assert q_info.code_hash is not None
+
+    reloaded = load_classroom_from_json(classroom_files.classroom_file_name, classroom_files.settings_file_name)
+    assert get_codes(reloaded) == get_codes(classroom)
+    assert reloaded.students[0].question_info[0].code == "print('changed')\n"
+
+
+def test_inline_export(classroom_files, tmp_path):
+    classroom = load_classroom_from_json(classroom_files.classroom_file_name, classroom_files.settings_file_name)
+    classroom.set_grade(classroom.students[1], "Question2", 5, True)
+
+    export_file_name = str(tmp_path / "export.json")
+    save_classroom_to_json(classroom, export_file_name, inline_code=True)
+    with open(export_file_name, "r") as f:
+        data = json.load(f)
+    assert isinstance(data, list)
+    assert all("code" in info for student_json in data for info in student_json["question_info"])
+
+    exported = load_classroom_from_json(export_file_name, classroom_files.settings_file_name)
+    assert exported.code_store is None
+    assert get_codes(exported) == get_codes(classroom)
+    assert exported.students[1].get_question_info("Question2").grade == 5
+    assert exported.students[1].is_graded["Question2"]
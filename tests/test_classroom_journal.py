@@ -0,0 +1,151 @@
+import pytest
+
+from classroom_data import ClassroomBuilder, GradeConflictError, load_classroom_from_json, save_classroom_to_json
+from classroom_data.grade_journal import GradeEntry, GradeJournal
+from tests.conftest import add_submission
+
+
+def load(classroom_files):
+    return load_classroom_from_json(classroom_files.classroom_file_name, classroom_files.settings_file_name)
+
+
+def get_student(classroom, student_number: int):
+    return next(student for student in classroom.students if student.student_number == student_number)
+
+
+def get_grade(classroom, student_number: int, question_name: str = "Question1") -> tuple[float, bool]:
+    student = get_student(classroom, student_number)
+    return student.get_question_info(question_name).grade, student.is_graded[question_name]
+
+
+def test_grades_survive_reload(classroom_files):
+    classroom = load(classroom_files)
+    classroom.set_grade(get_student(classroom, 100), "Question1", 5, True, grader="first")
+    classroom.set_grade(get_student(classroom, 100), "Question1", 10, True, grader="first")
+
+    reloaded = load(classroom_files)
+    assert get_grade(reloaded, 100) == (10, True)
+    assert reloaded.get_version(get_student(reloaded, 100), "Question1") == 2
+    assert reloaded.grade_entries[(100, "Question1")].grader == "first"
+
+
+def test_sync_applies_grades_of_other_processes(classroom_files):
+    first, second = load(classroom_files), load(classroom_files)
+    first.set_grade(get_student(first, 101), "Question2", 5, True)
+
+    assert second.sync()
+    assert get_grade(second, 101, "Question2") == (5, True)
+    assert second.get_ungraded_queues().graded_count("Question2") == 1
+
+
+def test_stale_write_is_a_conflict(classroom_files):
+    first, second = load(classroom_files), load(classroom_files)
+    version = second.get_version(get_student(second, 100), "Question1")
+    first.set_grade(get_student(first, 100), "Question1", 5, True, grader="first")
+
+    with pytest.raises(GradeConflictError) as error:
+        second.set_grade(get_student(second, 100), "Question1", 10, True, expected_version=version)
+    assert error.value.entry.grader == "first"
+    assert get_grade(load(classroom_files), 100) == (5, True)
+
+    # Writing the grade that is already there is not a conflict
+    assert not second.set_grade(get_student(second, 100), "Question1", 5, True, expected_version=version)
+
+
+def test_conflicting_group_write_writes_nothing(classroom_files):
+    first, second = load(classroom_files), load(classroom_files)
+    students = [get_student(second, student_number) for student_number in (100, 101, 102)]
+    versions = [second.get_version(student, "Question1") for student in students]
+    first.set_grade(get_student(first, 102), "Question1", 0, True)
+
+    with pytest.raises(GradeConflictError):
+        second.set_grades(students, "Question1", 10, True, expected_versions=versions)
+    assert [get_grade(load(classroom_files), student_number) for student_number in (100, 101)] == [(0, False)] * 2
+
+
+def test_compaction_starts_a_new_generation(classroom_files):
+    first, second = load(classroom_files), load(classroom_files)
+    first.grade_journal.compact_every = 2
+    first.set_grade(get_student(first, 100), "Question1", 5, True)
+    first.set_grade(get_student(first, 101), "Question1", 10, True)
+
+    assert first.grade_journal.generation == 1
+    assert first.grade_journal.read() == []
+
+    # The other process notices the new generation and reads the new snapshot
+    assert second.sync()
+    assert second.grade_journal.generation == 1
+    assert get_grade(second, 100) == (5, True)
+    assert get_grade(second, 101) == (10, True)
+
+    second.set_grade(get_student(second, 102), "Question1", 0, True)
+    reloaded = load(classroom_files)
+    assert [get_grade(reloaded, student_number) for student_number in (100, 101, 102)] == \
+        [(5, True), (10, True), (0, True)]
+
+
+def test_compaction_keeps_students_of_other_processes(classroom_files):
+    first, second = load(classroom_files), load(classroom_files)
+
+    # The first process rescans, finds a new student and a changed submission, and saves
+    add_submission(classroom_files.submissions_directory, "Deniz Arslan", 103, {"q1.py": "print(103)\n"})
+    add_submission(classroom_files.submissions_directory, "Ali Kaya", 100, {"q1.py": "print('changed')\n"})
+    ClassroomBuilder(classroom_files.submissions_directory).set_settings_file(classroom_files.settings_file_name) \
+        .refresh(first)
+    save_classroom_to_json(first, classroom_files.classroom_file_name)
+    first.set_grade(get_student(first, 103), "Question1", 10, True)
+
+    # The second process only knew the old students when it compacts
+    version = second.structure_version
+    second.set_grade(get_student(second, 101), "Question1", 5, True)
+    save_classroom_to_json(second, classroom_files.classroom_file_name)
+    assert second.structure_version != version
+
+    reloaded = load(classroom_files)
+    assert sorted(student.student_number for student in reloaded.students) == [100, 101, 102, 103]
+    assert get_grade(reloaded, 103) == (10, True)
+    assert get_grade(reloaded, 101) == (5, True)
+    assert get_student(reloaded, 100).get_question_info("Question1").code == "print('changed')\n"
+
+
+def test_entries_of_unknown_students_survive_compaction(classroom_files):
+    classroom = load(classroom_files)
+    # Written by a process that knows a student this one does not
+    entry = GradeEntry(student_number=999, question="Question1", grade=5, is_graded=True, version=1)
+    GradeJournal(classroom_files.classroom_file_name).append(entry)
+
+    classroom.sync()
+    save_classroom_to_json(classroom, classroom_files.classroom_file_name)
+    assert classroom.grade_journal.read() == [entry]
+
+
+def test_refresh_regrade_survives_reload(classroom_files):
+    classroom = load(classroom_files)
+    classroom.set_grade(get_student(classroom, 102), "Question2", 10, True)
+
+    add_submission(classroom_files.submissions_directory, "Can Celik", 102, {"q2.py": "print('changed')\n"})
+    ClassroomBuilder(classroom_files.submissions_directory).set_settings_file(classroom_files.settings_file_name) \
+        .refresh(classroom)
+    assert get_grade(classroom, 102, "Question2") == (10, False)
+
+    reloaded = load(classroom_files)
+    assert get_grade(reloaded, 102, "Question2") == (10, False)
+    assert reloaded.get_version(get_student(reloaded, 102), "Question2") == 2
+
+
+
+def test_refresh_applies_parked_entries_of_added_students(classroom_files):
+    classroom = load(classroom_files)
+    # Graded by a process that already scanned the new student
+    entry = GradeEntry(student_number=103, question="Question1", grade=10, is_graded=True, version=1, grader="other")
+    GradeJournal(classroom_files.classroom_file_name).append(entry)
+    classroom.sync()
+
+    add_submission(classroom_files.submissions_directory, "Deniz Arslan", 103, {"q1.py": "print(103)\n"})
+    ClassroomBuilder(classroom_files.submissions_directory).set_settings_file(classroom_files.settings_file_name) \
+        .refresh(classroom)
+
+    assert get_grade(classroom, 103) == (10, True)
+    assert classroom.get_version(get_student(classroom, 103), "Question1") == 1
+    assert classroom.get_ungraded_queues().graded_count("Question1") == 1
+    assert classroom._unknown_entries == {}
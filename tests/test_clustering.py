@@ -0,0 +1,91 @@
+from classroom_data import ClassroomBuilder
+from classroom_data.clustering import cluster_submissions, get_shingles, normalize_tokens
+from tests.conftest import add_submission
+
+SOLUTION = """def grade(score):
+    if score >= 90:
+        return "A"
+    if score >= 80:
+        return "B"
+    if score >= 70:
+        return "C"
+    if score >= 60:
+        return "D"
+    return "F"
+
+
+for line in open(0):
+    print(grade(int(line)))
+"""
+
+COMMENTED = """# Letter grades
+def grade(score):
+  # highest first
+  if score >= 90:
+    return "A"
+
+  if score >= 80:
+    return "B"
+  if score >= 70:  # C
+    return "C"
+  if score >= 60:
+    return "D"
+  return "F"
+for line in open(0):
+  print(grade(int(line)))
+"""
+
+
+def _build(classroom_files, codes: dict[str, str]):
+    for student_number, (name, code) in enumerate(codes.items(), 200):
+        add_submission(classroom_files.submissions_directory, name, student_number, {"q1.py": code})
+    classroom = ClassroomBuilder(classroom_files.submissions_directory) \
+        .set_settings_file(classroom_files.settings_file_name).build()
+    students = {f"{student.name} {student.surname}": student for student in classroom.students}
+    return classroom, students
+
+
+def _jaccard(first: str, second: str) -> float:
+    first_shingles, second_shingles = (get_shingles(normalize_tokens(code), 4) for code in (first, second))
+    return len(first_shingles & second_shingles) / len(first_shingles | second_shingles)
+
+
+def test_exact_and_layout_only_duplicates(classroom_files):
+    classroom, students = _build(classroom_files, {"Deniz Ak": SOLUTION, "Ece Bal": SOLUTION,
+                                                   "Ece Kara": COMMENTED})
+    clusters = cluster_submissions(classroom.students, classroom.get_questions()[0])
+
+    # The three fixture submissions print different numbers and stay on their own
+    assert [len(cluster.members) for cluster in clusters] == [3, 1, 1, 1]
+    cluster = clusters[0]
+    assert cluster.members == [students[name] for name in ("Deniz Ak", "Ece Bal", "Ece Kara")]
+    assert cluster.representative in (students["Deniz Ak"], students["Ece Bal"])
+    assert cluster.is_exact()
+    assert cluster.similarity(students["Ece Kara"]) == 1.0
+
+
+def test_near_miss_below_the_threshold(classroom_files):
+    # One changed boundary is a real difference in what the code does
+    near_miss = SOLUTION.replace(">= 70", "> 70")
+    similarity = _jaccard(SOLUTION, near_miss)
+    assert 0.85 < similarity < 0.9
+
+    classroom, students = _build(classroom_files, {"Deniz Ak": SOLUTION, "Ece Bal": SOLUTION,
+                                                   "Ece Kara": near_miss})
+    question = classroom.get_questions()[0]
+    clusters = cluster_submissions(classroom.students, question)
+    assert clusters[0].members == [students["Deniz Ak"], students["Ece Bal"]]
+    assert [students["Ece Kara"]] in [cluster.members for cluster in clusters]
+
+    # At a threshold it reaches it joins the cluster, which is then no longer exact
+    cluster = cluster_submissions(classroom.students, question, threshold=similarity)[0]
+    assert cluster.members == [students[name] for name in ("Deniz Ak", "Ece Bal", "Ece Kara")]
+    assert cluster.similarity(students["Ece Kara"]) == similarity
+    assert not cluster.is_exact()
+
+
+def test_renamed_identifiers_are_not_layout(classroom_files):
+    classroom, students = _build(classroom_files, {"Deniz Ak": SOLUTION,
+                                                   "Ece Bal": SOLUTION.replace("score", "points")})
+    clusters = cluster_submissions(classroom.students, classroom.get_questions()[0])
+    assert all(len(cluster.members) == 1 for cluster in clusters)
@@ -0,0 +1,67 @@
+from classroom_data.grade_journal import GradeEntry, GradeJournal
+
+
+def get_entry(student_number: int, grade: float, version: int = 1) -> GradeEntry:
+    return GradeEntry(student_number=student_number, question="Question1", grade=grade, is_graded=True,
+                      version=version)
+
+
+def test_append_and_read(tmp_path):
+    journal = GradeJournal(str(tmp_path / "classroom.json"))
+    journal.append(get_entry(1, 5))
+    journal.append_many([get_entry(2, 10), get_entry(1, 10, 2)])
+
+    assert GradeJournal(journal.snapshot_file_name).read() == [get_entry(1, 5), get_entry(2, 10), get_entry(1, 10, 2)]
+
+
+def test_partial_last_line_is_dropped(tmp_path):
+    journal = GradeJournal(str(tmp_path / "classroom.json"))
+    journal.append(get_entry(1, 5))
+    with open(journal.file_name, "a") as f:
+        f.write('{"student_number": 2, "quest')
+
+    reader = GradeJournal(journal.snapshot_file_name)
+    assert reader.read() == [get_entry(1, 5)]
+    reader.append(get_entry(2, 10))
+    assert GradeJournal(journal.snapshot_file_name).read() == [get_entry(1, 5), get_entry(2, 10)]
+
+
+def test_read_new_follows_other_writers(tmp_path):
+    writer = GradeJournal(str(tmp_path / "classroom.json"))
+    reader = GradeJournal(writer.snapshot_file_name)
+    assert reader.read_new() == []
+
+    writer.append(get_entry(1, 5))
+    assert reader.read_new() == [get_entry(1, 5)]
+    assert reader.read_new() == []
+
+    writer.append_many([get_entry(2, 10), get_entry(3, 0)])
+    assert reader.read_new() == [get_entry(2, 10), get_entry(3, 0)]
+
+
+def test_read_new_reports_a_new_generation(tmp_path):
+    writer = GradeJournal(str(tmp_path / "classroom.json"))
+    writer.append(get_entry(1, 5))
+    reader = GradeJournal(writer.snapshot_file_name)
+    reader.read()
+
+    writer.reset(writer.generation + 1)
+    assert reader.read_new() is None
+
+    writer.append(get_entry(2, 10))
+    assert reader.read() == [get_entry(2, 10)]
+    assert reader.generation == writer.generation
+    assert reader.read_new() == []
+
+
+def test_needs_compaction(tmp_path):
+    journal = GradeJournal(str(tmp_path / "classroom.json"), compact_every=3)
+    journal.append_many([get_entry(1, 5), get_entry(2, 5)])
+    assert not journal.needs_compaction()
+
+    journal.append(get_entry(3, 5))
+    assert journal.needs_compaction()
+
+    journal.clear()
+    assert not journal.needs_compaction()
+    assert journal.read() == []
@@ -0,0 +1,46 @@
+import numpy as np
+
+from classroom_data import GradeChange, load_classroom_from_json
+from classroom_data.grade_matrix import GradeMatrix
+
+
+def _assert_matches_fresh_matrix(classroom):
+    matrix = classroom.get_grade_matrix()
+    fresh = GradeMatrix(classroom.students, classroom.get_questions())
+
+    np.testing.assert_array_equal(matrix.grades, fresh.grades)
+    np.testing.assert_array_equal(matrix.graded, fresh.graded)
+    np.testing.assert_array_equal(matrix.totals(), fresh.totals())
+    np.testing.assert_array_equal(matrix.progress(), fresh.progress())
+    statistics, fresh_statistics = matrix.statistics(), fresh.statistics()
+    for name in ("graded_count", "mean", "std", "min", "max"):
+        np.testing.assert_array_equal(getattr(statistics, name), getattr(fresh_statistics, name))
+    for question_id in range(len(fresh.questions)):
+        np.testing.assert_array_equal(matrix.distribution(question_id)[1], fresh.distribution(question_id)[1])
+
+
+def test_incremental_updates_match_a_fresh_matrix(classroom_files):
+    classroom = load_classroom_from_json(classroom_files.classroom_file_name, classroom_files.settings_file_name)
+    other = load_classroom_from_json(classroom_files.classroom_file_name, classroom_files.settings_file_name)
+    matrix, other_matrix = classroom.get_grade_matrix(), other.get_grade_matrix()
+    ali, ayse, can = classroom.students
+
+    # Regrades, a suggestion that is later confirmed, a grade taken back and one batch touching a cell twice
+    classroom.set_grade_changes([GradeChange(ali, "Question1", 10, True), GradeChange(ayse, "Question1", 5, True),
+                                 GradeChange(can, "Question2", 5, False)])
+    classroom.set_grades([ali, ayse], "Question2", 10, True)
+    classroom.set_grade_changes([GradeChange(ayse, "Question1", 0, True), GradeChange(can, "Question2", 5, True),
+                                 GradeChange(ali, "Question2", 0, False), GradeChange(ali, "Question2", 5, True)])
+    classroom.set_grade(ayse, "Question2", 10, False)
+
+    assert classroom.get_grade_matrix() is matrix
+    np.testing.assert_array_equal(matrix.grades, [[10, 5], [0, 10], [0, 5]])
+    np.testing.assert_array_equal(matrix.graded, [[True, True], [True, False], [False, True]])
+    _assert_matches_fresh_matrix(classroom)
+
+    # Another grading process gets the same matrix through sync, which applies the journaled entries
+    assert other.sync()
+    assert other.get_grade_matrix() is other_matrix
+    np.testing.assert_array_equal(other_matrix.grades, matrix.grades)
+    np.testing.assert_array_equal(other_matrix.graded, matrix.graded)
+    _assert_matches_fresh_matrix(other)
@@ -0,0 +1,23 @@
+from classroom_data.student_data.student import Student
+from streamlit_grading_ui.grade_widgets import forget_grade_widgets, get_grade_widget_keys
+
+
+def get_student(student_number: int) -> Student:
+    return Student(name="Ali", surname="Kaya", student_number=student_number, submission_directory="",
+                   question_info=[], is_graded={})
+
+
+def test_students_with_the_same_name_get_their_own_keys():
+    first, second = get_student(100), get_student(101)
+
+    assert set(get_grade_widget_keys("Question1", first)).isdisjoint(get_grade_widget_keys("Question1", second))
+    assert set(get_grade_widget_keys("Question1", first)).isdisjoint(get_grade_widget_keys("Question2", first))
+
+
+def test_forget_only_touches_the_given_students():
+    first, second = get_student(100), get_student(101)
+    session_state = {key: 1 for student in (first, second) for key in get_grade_widget_keys("Question1", student)}
+    session_state["selected_question"] = "Question1"
+
+    forget_grade_widgets(session_state, "Question1", [first])
+    assert set(session_state) == {*get_grade_widget_keys("Question1", second), "selected_question"}
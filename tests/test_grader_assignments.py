@@ -0,0 +1,31 @@
+from classroom_data.grader_assignments import GraderAssignments
+from classroom_data.student_data.student import Student
+
+
+def get_student(student_number: int) -> Student:
+    return Student(name="Name", surname="Surname", student_number=student_number, submission_directory="",
+                   question_info=[], is_graded={})
+
+
+def test_save_and_load(tmp_path):
+    assignments = GraderAssignments()
+    assignments.assign("first", ["Question1"], [1, 2])
+    assignments.assign("second")
+    assignments.save(str(tmp_path / "assignments.json"))
+
+    loaded = GraderAssignments.load(str(tmp_path / "assignments.json"))
+    assert loaded == assignments
+    assert loaded.is_assigned("first", get_student(2), "Question1")
+    assert not loaded.is_assigned("first", get_student(3), "Question1")
+    assert not loaded.is_assigned("first", get_student(1), "Question2")
+    assert loaded.is_assigned("second", get_student(3), "Question2")
+    assert loaded.is_assigned("unknown", get_student(3), "Question2")
+
+
+def test_split_students():
+    students = [get_student(student_number) for student_number in range(5)]
+    assignments = GraderAssignments()
+    assignments.split_students(["first", "second"], students)
+
+    assert assignments.get_students("first", "Question1", students) == students[0::2]
+    assert assignments.get_students("second", "Question1", students) == students[1::2]
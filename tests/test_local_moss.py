@@ -0,0 +1,41 @@
+from classroom_data import ClassroomBuilder
+from moss_plag_checker import LocalMossAPI
+from tests.conftest import add_submission
+
+SOLUTION = """def average(values):
+    total = 0
+    for value in values:
+        total += value
+    if len(values) == 0:
+        return 0
+    return total / len(values)
+
+
+print(average([int(x) for x in input().split()]))
+"""
+
+OTHER = """numbers = list(map(int, input().split()))
+best = numbers[0]
+while numbers:
+    best = max(best, numbers.pop())
+print("best:", best)
+"""
+
+
+def test_finds_the_copied_pair(classroom_files, tmp_path):
+    # 100 and 102 hand in the same solution with renamed variables, 101 something else
+    add_submission(classroom_files.submissions_directory, "Ali Kaya", 100, {"q1.py": SOLUTION})
+    add_submission(classroom_files.submissions_directory, "Ayse Demir", 101, {"q1.py": OTHER})
+    add_submission(classroom_files.submissions_directory, "Can Celik", 102,
+                   {"q1.py": SOLUTION.replace("total", "acc").replace("value", "item")})
+    classroom = ClassroomBuilder(classroom_files.submissions_directory) \
+        .set_settings_file(classroom_files.settings_file_name).build()
+
+    for mode in ("tokens", "ast"):
+        matches = LocalMossAPI(classroom, mode=mode, workers=1, max_share=1.0).run_moss(
+            "Question1", str(tmp_path / mode))
+
+        assert len(matches) == 1
+        assert sorted(name.split()[0] for name in (matches[0].first, matches[0].second)) == ["Ali", "Can"]
+        assert matches[0].first_percent == matches[0].second_percent == 100
+        assert (tmp_path / mode / "report.html").exists()
@@ -0,0 +1,26 @@
+from moss_plag_checker.MossAPI import get_missing_report_pages
+
+
+def write_page(directory, name: str, body: str):
+    (directory / name).write_text(f"<html><body>{body}</body></html>", encoding="utf-8")
+
+
+def test_complete_report(tmp_path):
+    write_page(tmp_path, "index.html", '<a href="match0.html">a</a><A HREF="match1.html">b</A>')
+    write_page(tmp_path, "match0.html", '<frame src="match0-top.html"><frame src="match0-0.html#1">')
+    write_page(tmp_path, "match1.html", "")
+    write_page(tmp_path, "match0-top.html", "")
+    write_page(tmp_path, "match0-0.html", "")
+
+    assert get_missing_report_pages(str(tmp_path)) == []
+
+
+def test_missing_pages(tmp_path):
+    write_page(tmp_path, "index.html", '<a href="match0.html">a</a><a href="match1.html">b</a>')
+    write_page(tmp_path, "match0.html", '<frame src="match0-top.html">')
+
+    assert get_missing_report_pages(str(tmp_path)) == ["match0-top.html", "match1.html"]
+
+
+def test_missing_index(tmp_path):
+    assert get_missing_report_pages(str(tmp_path)) == ["index.html"]
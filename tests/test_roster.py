@@ -0,0 +1,65 @@
+from classroom_data import ClassroomBuilder
+from classroom_data.roster import RosterEntry, RosterMatcher
+from tests.conftest import add_submission
+
+
+def get_matcher(*names: str) -> RosterMatcher:
+    entries = [RosterEntry(student_number=100 + i, name=name.rsplit(" ", 1)[0], surname=name.rsplit(" ", 1)[1])
+               for i, name in enumerate(names)]
+    return RosterMatcher(entries)
+
+
+def test_exact_match_wins_over_longer_surname():
+    matcher = get_matcher("Ali Can Veli", "Ali Can Velioglu")
+
+    entry, _ = matcher.resolve("Ali Can", "Veli")
+    assert entry.student_number == 100
+
+    entry, _ = matcher.resolve("Ali Can", "Velioglu")
+    assert entry.student_number == 101
+
+
+def test_two_exact_matches_are_ambiguous():
+    matcher = get_matcher("Ali Can Veli", "Ali Can Veli")
+
+    entry, candidates = matcher.resolve("Ali Can", "Veli")
+    assert entry is None
+    assert len(candidates) == 2
+
+
+def test_close_matches_are_ambiguous():
+    matcher = get_matcher("Muhammed Kaya", "Muhammet Kaya")
+
+    entry, candidates = matcher.resolve("Muhamme", "Kaya")
+    assert entry is None
+    assert {candidate.entry.student_number for candidate in candidates} == {100, 101}
+
+
+def test_transliterated_name_matches():
+    matcher = get_matcher("Ayşe Öztürk", "Mehmet Demir")
+
+    entry, _ = matcher.resolve("Ayse", "Ozturk")
+    assert entry.student_number == 100
+
+
+def test_unknown_name_is_unmatched():
+    matcher = get_matcher("Ayşe Öztürk", "Mehmet Demir")
+
+    assert matcher.resolve("Zeynep", "Arslan") == (None, [])
+
+
+def test_builder_and_refresh_take_names_from_the_roster(classroom_files, tmp_path):
+    roster_file_name = tmp_path / "student_list.csv"
+    roster_file_name.write_text("STD NO,NAME,SURNAME\n2001,Ali,Kaya\n2002,Ayşe,Demir\n2003,Can,Çelik\n"
+                                "2004,Deniz,Arslan\n", encoding="utf-8")
+    roster = RosterMatcher.from_csv(str(roster_file_name))
+
+    classroom = ClassroomBuilder(classroom_files.submissions_directory) \
+        .set_settings_file(classroom_files.settings_file_name).set_roster(roster).build()
+    assert sorted((student.student_number, student.name, student.surname) for student in classroom.students) == \
+        [(2001, "Ali", "Kaya"), (2002, "Ayşe", "Demir"), (2003, "Can", "Çelik")]
+
+    add_submission(classroom_files.submissions_directory, "Deniz Arslan", 103, {"q1.py": "print(103)\n"})
+    builder = ClassroomBuilder(classroom_files.submissions_directory).set_roster(roster)
+    builder.refresh(classroom)
+    assert [student.student_number for student in builder.refresh_report.added] == [2004]
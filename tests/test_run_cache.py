@@ -0,0 +1,88 @@
+import json
+
+from classroom_data import ClassroomBuilder
+from moss_plag_checker.MossAPI import MossAPI
+from moss_plag_checker.run_cache import MossRunCache, get_run_key
+from moss_plag_checker.submissions import get_student_submissions
+from tests.conftest import add_submission
+
+
+def _build(classroom_files):
+    return ClassroomBuilder(classroom_files.submissions_directory) \
+        .set_settings_file(classroom_files.settings_file_name).build()
+
+
+def _get_run_key(classroom, question_name="Question1"):
+    question = next(q for q in classroom.get_questions() if q.question == question_name)
+    return get_run_key(question, get_student_submissions(classroom, question_name))
+
+
+def _store_report(cache, tmp_path, run_key, url):
+    save_dir = tmp_path / url.rsplit("/", 1)[-1]
+    (save_dir / "report").mkdir(parents=True)
+    (save_dir / "report.html").write_text(f"<a href='{url}'>report</a>")
+    (save_dir / "report" / "index.html").write_text("index")
+    return cache.store("Question1", run_key, url, 3, str(save_dir))
+
+
+def test_hit_on_unchanged_submissions_and_miss_after_a_change(classroom_files, tmp_path):
+    cache = MossRunCache(str(tmp_path / "cache"))
+    run_key = _get_run_key(_build(classroom_files))
+    assert cache.lookup("Question1", run_key) is None
+
+    record = _store_report(cache, tmp_path, run_key, "http://moss/results/1")
+    assert record.has_full_report
+
+    # A rebuilt classroom with the same code gets the same key, other questions have their own history
+    assert _get_run_key(_build(classroom_files)) == run_key
+    assert cache.lookup("Question1", run_key, needs_full_report=True) == record
+    assert cache.lookup("Question2", run_key) is None
+
+    restore_dir = tmp_path / "restored"
+    cache.restore("Question1", record, str(restore_dir))
+    assert (restore_dir / "report.html").read_text() == "<a href='http://moss/results/1'>report</a>"
+    assert (restore_dir / "report" / "index.html").read_text() == "index"
+
+    add_submission(classroom_files.submissions_directory, "Ayse Demir", 101, {"q1.py": "print(1010)\n"})
+    changed_key = _get_run_key(_build(classroom_files))
+    assert changed_key != run_key
+    assert cache.lookup("Question1", changed_key) is None
+
+
+def test_history_keeps_every_run(classroom_files, tmp_path):
+    cache = MossRunCache(str(tmp_path / "cache"))
+    run_key = _get_run_key(_build(classroom_files))
+    _store_report(cache, tmp_path, "old", "http://moss/results/1")
+    first = _store_report(cache, tmp_path, run_key, "http://moss/results/2")
+    second = _store_report(cache, tmp_path, run_key, "http://moss/results/3")
+
+    with open(tmp_path / "cache" / "Question1" / "history.json") as f:
+        assert [record["url"] for record in json.load(f)] == [f"http://moss/results/{i}" for i in (1, 2, 3)]
+
+    # The latest run of a key wins, and a new cache on the same directory reads the same history
+    assert MossRunCache(str(tmp_path / "cache")).get_history("Question1")[1:] == [first, second]
+    assert MossRunCache(str(tmp_path / "cache")).lookup("Question1", run_key) == second
+
+
+def test_summary_only_run_does_not_answer_a_full_report(classroom_files, tmp_path):
+    cache = MossRunCache(str(tmp_path / "cache"))
+    run_key = _get_run_key(_build(classroom_files))
+    save_dir = tmp_path / "summary"
+    save_dir.mkdir()
+    (save_dir / "report.html").write_text("summary")
+    record = cache.store("Question1", run_key, "http://moss/results/1", 3, str(save_dir))
+
+    assert not record.has_full_report
+    assert cache.lookup("Question1", run_key) == record
+    assert cache.lookup("Question1", run_key, needs_full_report=True) is None
+
+
+def test_moss_api_reuses_the_cached_report(classroom_files, tmp_path):
+    classroom = _build(classroom_files)
+    cache = MossRunCache(str(tmp_path / "cache"))
+    _store_report(cache, tmp_path, _get_run_key(classroom), "http://moss/results/1")
+
+    # A hit never reaches the server, so an unreachable one is fine
+    moss_api = MossAPI(classroom, api_key="key", server="localhost", port=1, retries=0, run_cache=cache)
+    assert moss_api.run_moss("Question1", str(tmp_path / "plag_report")) == "http://moss/results/1"
+    assert (tmp_path / "plag_report" / "report.html").exists()
@@ -0,0 +1,37 @@
+from classroom_data.question_data.question import Question
+from classroom_data.scanner import QuestionMatcher
+
+
+def get_question(name: str, keys: list[str], question_id: int = 0) -> Question:
+    return Question(question=name, keys=keys, possible_grades=[0, 10], grade=10, base_code="",
+                    question_id=question_id)
+
+
+def get_names(questions: list[Question]) -> list[str]:
+    return sorted(question.question for question in questions)
+
+
+def test_matches_keys_inside_longer_keys():
+    matcher = QuestionMatcher([get_question("Question1", ["q1"]), get_question("Question10", ["q10"], 1)])
+
+    assert get_names(matcher.match("hw/Q1.py")) == ["Question1"]
+    assert get_names(matcher.match("hw/q10.py")) == ["Question1", "Question10"]
+    assert matcher.match("hw/helpers.py") == []
+
+
+def test_questions_without_keys_match_nothing():
+    matcher = QuestionMatcher([get_question("Question1", []), get_question("Question2", [], 1)])
+
+    assert matcher.match("hw/q1.py") == []
+
+
+def test_empty_keys_are_ignored():
+    matcher = QuestionMatcher([get_question("Question1", ["", "q1"]), get_question("Question2", ["q2"], 1)])
+
+    assert get_names(matcher.match("hw/q2.py")) == ["Question2"]
+    assert get_names(matcher.match("hw/q1.py")) == ["Question1"]
+    assert matcher.match("hw/main.py") == []
+
+
+def test_no_questions():
+    assert QuestionMatcher([]).match("hw/q1.py") == []
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+import yaml
+
+from classroom_data import load_classroom_from_json, settings_loader
+from classroom_data.settings_loader import get_settings
+
+
+def _write_settings(file_name: str, questions: list[tuple[str, int]]):
+    # Every write moves the modification time forward, even on file systems with a coarse clock
+    mtime = os.stat(file_name).st_mtime + 10 if os.path.exists(file_name) else None
+    with open(file_name, "w", encoding="utf-8") as f:
+        yaml.safe_dump({"Questions": [{"question": question, "keys": [question.lower()], "grade": grade,
+                                       "possible_grades": [0, 5, 10, 20]} for question, grade in questions]}, f)
+    if mtime is not None:
+        os.utime(file_name, (mtime, mtime))
+
+
+def test_settings_are_cached_until_the_file_changes(tmp_path):
+    file_name = str(tmp_path / "settings.yml")
+    _write_settings(file_name, [("Question1", 10), ("Question2", 10)])
+    settings = get_settings(file_name)
+    assert get_settings(file_name) is settings
+    assert get_settings(os.path.relpath(file_name)) is settings
+
+    # The same size with a new modification time
+    _write_settings(file_name, [("Question1", 20), ("Question2", 10)])
+    assert os.stat(file_name).st_size == settings.version[1]
+    edited = get_settings(file_name)
+    assert edited is not settings
+    assert edited.get_question("Question1").grade == 20
+    assert get_settings(file_name) is edited
+
+    # A different size alone is enough too
+    mtime = os.stat(file_name).st_mtime
+    _write_settings(file_name, [("Question1", 20), ("Question2", 10), ("Question3", 5)])
+    os.utime(file_name, (mtime, mtime))
+    assert [question.question for question in get_settings(file_name).questions] == \
+           ["Question1", "Question2", "Question3"]
+
+
+def test_settings_are_cached_per_file(tmp_path):
+    (tmp_path / "other").mkdir()
+    first, second = str(tmp_path / "settings.yml"), str(tmp_path / "other" / "settings.yml")
+    _write_settings(first, [("Question1", 10)])
+    _write_settings(second, [("Question1", 20)])
+
+    assert get_settings(first).get_question("Question1").grade == 10
+    assert get_settings(second).get_question("Question1").grade == 20
+    assert get_settings(first) is get_settings(first)
+
+
+def test_classroom_picks_up_grades_but_not_reordered_questions(classroom_files, capsys):
+    classroom = load_classroom_from_json(classroom_files.classroom_file_name, classroom_files.settings_file_name)
+    student = classroom.students[0]
+
+    _write_settings(classroom_files.settings_file_name, [("Question1", 20), ("Question2", 10)])
+    assert [question.grade for question in classroom.get_questions()] == [20, 10]
+    assert student.get_question_info("Question1").question.grade == 20
+
+    _write_settings(classroom_files.settings_file_name, [("Question2", 5), ("Question1", 10)])
+    questions = classroom.get_questions()
+    assert [(question.question, question.grade) for question in questions] == [("Question1", 20), ("Question2", 10)]
+    assert "rebuild the classroom" in capsys.readouterr().out
+
+    # The rejected file is only reported once
+    assert classroom.get_questions() is questions
+    assert capsys.readouterr().out == ""
+
+
+def test_module_questions_read_the_default_settings(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _write_settings("settings.yml", [("Question1", 10)])
+
+    assert [question.question for question in settings_loader.questions] == ["Question1"]
+    with pytest.raises(AttributeError):
+        settings_loader.missing
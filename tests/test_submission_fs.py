@@ -0,0 +1,89 @@
+import io
+import zipfile
+
+import pytest
+
+from classroom_data import ClassroomBuilder
+from classroom_data.submission_fs import group_by_archive, get_archive_file, is_archive_path, list_archive, \
+    read_archive_members
+
+
+def _zip_bytes(members: dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zip_file:
+        for member_name, content in members.items():
+            zip_file.writestr(member_name, content)
+    return buffer.getvalue()
+
+
+def _write_zip(path, members: dict[str, bytes]) -> str:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(_zip_bytes(members))
+    return str(path)
+
+
+def test_nested_members(tmp_path):
+    inner = _zip_bytes({"q2.py": "print('iç')\n".encode("utf-8"), "notes.txt": b"skip"})
+    zip_path = _write_zip(tmp_path / "homework.zip", {
+        "homework/q1.py": b"print(1)\n",
+        "homework/inner.zip": inner,
+        "homework/broken.zip": b"not a zip",
+        "__MACOSX/homework/._q1.py": b"\x00\x05",
+        "homework/": b""
+    })
+
+    failures = []
+    paths = list_archive(zip_path, failures)
+    assert paths == [f"{zip_path}!/homework/q1.py", f"{zip_path}!/homework/inner.zip!/q2.py"]
+    assert [failure.zip_path for failure in failures] == [f"{zip_path}!/homework/broken.zip"]
+    assert all(is_archive_path(path) and get_archive_file(path) == zip_path for path in paths)
+
+    assert read_archive_members(paths) == {paths[0]: "print(1)\n", paths[1]: "print('iç')\n"}
+
+
+def test_group_by_archive():
+    paths = ["a.zip!/q1.py", "b.zip!/q1.py", "a.zip!/inner.zip!/q2.py"]
+    assert group_by_archive(paths) == {"a.zip": ["a.zip!/q1.py", "a.zip!/inner.zip!/q2.py"],
+                                       "b.zip": ["b.zip!/q1.py"]}
+
+
+def test_missing_members(tmp_path):
+    zip_path = _write_zip(tmp_path / "homework.zip", {"q1.py": b"print(1)\n",
+                                                      "inner.zip": _zip_bytes({"q2.py": b"print(2)\n"})})
+
+    with pytest.raises(KeyError):
+        read_archive_members([f"{zip_path}!/q1.py", f"{zip_path}!/q3.py"])
+    with pytest.raises(KeyError):
+        read_archive_members([f"{zip_path}!/inner.zip!/q3.py"])
+    with pytest.raises(KeyError):
+        read_archive_members([f"{zip_path}!/other.zip!/q2.py"])
+
+    failures = []
+    assert list_archive(str(tmp_path / "missing.zip"), failures) == []
+    assert [failure.zip_path for failure in failures] == [str(tmp_path / "missing.zip")]
+
+
+def test_non_utf8_members_fail_like_plain_files(tmp_path):
+    # Submissions are read as UTF-8 whether they are in an archive or not
+    zip_path = _write_zip(tmp_path / "homework.zip", {"q1.py": "print('ı')\n".encode("cp1254"),
+                                                      "inner.zip": _zip_bytes({"q2.py": b"\xff\xfe"})})
+
+    with pytest.raises(UnicodeDecodeError):
+        read_archive_members([f"{zip_path}!/q1.py"])
+    with pytest.raises(UnicodeDecodeError):
+        read_archive_members([f"{zip_path}!/inner.zip!/q2.py"])
+
+
+def test_builder_reads_archives(classroom_files, tmp_path):
+    submission_directory = tmp_path / "submissions" / "Deniz Ak_200_assignsubmission_file"
+    _write_zip(submission_directory / "homework.zip",
+               {"homework/q1.py": b"print(200)\n", "homework/inner.zip": _zip_bytes({"q2.py": b"print(400)\n"})})
+
+    builder = ClassroomBuilder(classroom_files.submissions_directory) \
+        .set_settings_file(classroom_files.settings_file_name).set_read_archives(True)
+    student = next(student for student in builder.build().students if student.student_number == 200)
+
+    assert student.get_question_info("Question1").code == "print(200)\n"
+    assert student.get_question_info("Question2").code == "print(400)\n"
+    assert builder.unzip_failures == []
+    assert not (submission_directory / "extracted_homework").exists()
@@ -0,0 +1,49 @@
+import random
+
+from classroom_data.student_data.student import Student
+from classroom_data.ungraded_queues import UngradedQueues
+
+
+def get_students(graded: list[bool]) -> list[Student]:
+    return [Student(name=f"Name{i}", surname="Surname", student_number=str(i), submission_directory="",
+                    question_info=[], is_graded={"Question1": is_graded}) for i, is_graded in enumerate(graded)]
+
+
+def get_expected(students: list[Student], after: Student | None) -> list[Student]:
+    start = 0 if after is None else students.index(after) + 1
+    return [student for student in students[start:] + students[:start] if not student.is_graded["Question1"]]
+
+
+def test_follows_random_marks():
+    rng = random.Random(0)
+    students = get_students([rng.random() < 0.5 for _ in range(50)])
+    queues = UngradedQueues(students, ["Question1"])
+
+    for _ in range(500):
+        student = rng.choice(students)
+        student.is_graded["Question1"] = rng.random() < 0.5
+        queues.mark(student, "Question1", student.is_graded["Question1"])
+
+        after = rng.choice(students + [None])
+        assert queues.get_ungraded("Question1") == get_expected(students, None)
+        assert list(queues.iter_ungraded("Question1", after)) == get_expected(students, after)
+        assert queues.ungraded_count("Question1") + queues.graded_count("Question1") == len(students)
+
+
+def test_everything_graded():
+    students = get_students([True, True, True])
+    queues = UngradedQueues(students, ["Question1"])
+
+    assert queues.get_ungraded("Question1") == []
+    assert queues.next_ungraded("Question1", students[1]) is None
+    assert queues.graded_count("Question1") == 3
+
+
+def test_next_ungraded_wraps_around():
+    students = get_students([False, True, True, False, True])
+    queues = UngradedQueues(students, ["Question1"])
+
+    assert queues.next_ungraded("Question1", students[3]) is students[0]
+    assert queues.next_ungraded("Question1", students[0]) is students[3]
+    queues.mark(students[3], "Question1", True)
+    assert queues.next_ungraded("Question1", students[0]) is students[0]
@@ -0,0 +1,52 @@
+import os
+import zipfile
+
+from classroom_data.unzipper import MANIFEST_FILE_NAME, extract_archives, get_extract_dir
+
+
+def write_zip(path: str, members: dict[str, bytes]):
+    with zipfile.ZipFile(path, "w") as zip_file:
+        for name, data in members.items():
+            zip_file.writestr(name, data)
+
+
+def test_extracts_nested_archives(tmp_path):
+    inner_path = tmp_path / "inner.zip"
+    write_zip(str(inner_path), {"q2.py": b"print(2)\n"})
+    write_zip(str(tmp_path / "homework.zip"), {"q1.py": b"print(1)\n", "part/inner.zip": inner_path.read_bytes()})
+    inner_path.unlink()
+
+    assert extract_archives(str(tmp_path), workers=1) == []
+
+    extract_dir = get_extract_dir(str(tmp_path / "homework.zip"))
+    assert open(os.path.join(extract_dir, "q1.py")).read() == "print(1)\n"
+    nested_dir = get_extract_dir(os.path.join(extract_dir, "part", "inner.zip"))
+    assert open(os.path.join(nested_dir, "q2.py")).read() == "print(2)\n"
+    assert os.path.exists(tmp_path / MANIFEST_FILE_NAME)
+
+
+def test_unchanged_archives_are_skipped(tmp_path):
+    zip_path = str(tmp_path / "homework.zip")
+    write_zip(zip_path, {"q1.py": b"print(1)\n"})
+    extract_archives(str(tmp_path), workers=1)
+
+    # A file removed from the extracted folder only comes back if the archive is extracted again
+    extracted_file = os.path.join(get_extract_dir(zip_path), "q1.py")
+    os.remove(extracted_file)
+    extract_archives(str(tmp_path), workers=1)
+    assert not os.path.exists(extracted_file)
+
+    write_zip(zip_path, {"q1.py": b"print('changed')\n"})
+    extract_archives(str(tmp_path), workers=1)
+    assert open(extracted_file).read() == "print('changed')\n"
+
+
+def test_corrupt_archive_is_reported_without_a_folder(tmp_path):
+    (tmp_path / "bad.zip").write_bytes(b"not a zip file")
+    write_zip(str(tmp_path / "good.zip"), {"q1.py": b"print(1)\n"})
+
+    for _ in range(2):
+        failures = extract_archives(str(tmp_path), workers=1)
+        assert [os.path.basename(failure.zip_path) for failure in failures] == ["bad.zip"]
+        assert not os.path.exists(get_extract_dir(str(tmp_path / "bad.zip")))
+        assert os.path.isdir(get_extract_dir(str(tmp_path / "good.zip")))
@@ -0,0 +1,79 @@
+import random
+
+from moss_plag_checker.winnowing import Fingerprint, count_shared_fingerprints, fingerprint_code, hash_k_grams, \
+    winnow
+
+
+def get_tokens(rng: random.Random, count: int, alphabet: str = "abcdefgh") -> list[tuple[str, int]]:
+    return [(rng.choice(alphabet), line) for line in range(count)]
+
+
+def get_hashes(fingerprints: list[Fingerprint]) -> set[int]:
+    return {fingerprint.hash for fingerprint in fingerprints}
+
+
+def test_winnow_selects_the_rightmost_minimum_of_every_window():
+    rng = random.Random(0)
+    for _ in range(200):
+        # Lines are the positions, so the selected positions can be compared with a brute force selection
+        k_gram_hashes = [Fingerprint(hash=rng.randrange(10), line=i) for i in range(rng.randrange(1, 40))]
+        window_size = rng.randrange(1, 8)
+
+        expected = []
+        for start in range(max(1, len(k_gram_hashes) - window_size + 1)):
+            window = k_gram_hashes[start:start + window_size]
+            selected = min(window, key=lambda fingerprint: (fingerprint.hash, -fingerprint.line))
+            if not expected or expected[-1] != selected.line:
+                expected.append(selected.line)
+
+        assert [fingerprint.line for fingerprint in winnow(k_gram_hashes, window_size)] == expected
+
+
+def test_winnow_of_nothing():
+    assert winnow([], 4) == []
+
+
+def test_matches_of_the_guarantee_threshold_share_a_fingerprint():
+    rng = random.Random(1)
+    k, window_size = 5, 4
+    for _ in range(200):
+        shared = get_tokens(rng, window_size + k - 1)
+        first = get_tokens(rng, rng.randrange(0, 30), "ijklmnop") + shared + get_tokens(rng, rng.randrange(0, 30))
+        second = get_tokens(rng, rng.randrange(0, 30), "qrstuvwx") + shared + get_tokens(rng, rng.randrange(0, 30))
+
+        assert get_hashes(winnow(hash_k_grams(first, k), window_size)) \
+            & get_hashes(winnow(hash_k_grams(second, k), window_size))
+
+
+def test_identical_disjoint_and_partially_shared_documents():
+    rng = random.Random(2)
+    k, window_size = 5, 4
+    document = get_tokens(rng, 200)
+
+    def fingerprint(tokens):
+        return get_hashes(winnow(hash_k_grams(tokens, k), window_size))
+
+    assert fingerprint(document) == fingerprint(list(document))
+    assert not fingerprint(document) & fingerprint(get_tokens(rng, 200, "ijklmnop"))
+
+    partial = document[:100] + get_tokens(rng, 100, "ijklmnop")
+    shared = fingerprint(document) & fingerprint(partial)
+    assert shared and shared < fingerprint(document)
+
+
+def test_renamed_code_has_the_same_fingerprints():
+    code = "def total(values):\n    result = 0\n    for value in values:\n        result += value * 2\n    return result\n"
+    renamed = code.replace("values", "items").replace("value", "item").replace("result", "acc")
+
+    assert fingerprint_code(renamed) == fingerprint_code(code)
+    assert get_hashes(fingerprint_code(code.replace("* 2", "/ 2 - 1"))) != get_hashes(fingerprint_code(code))
+
+
+def test_count_shared_fingerprints():
+    fingerprint_sets = [{1, 2, 3, 9}, {1, 2, 4, 9}, {2, 3, 5, 9}, {6, 9}]
+
+    # 9 is in every submission and 5 only in one, 1 is ignored like base code
+    assert count_shared_fingerprints(fingerprint_sets, {1}, 3) == {(0, 1): 1, (0, 2): 2, (1, 2): 1}
+    assert count_shared_fingerprints(fingerprint_sets, set(), 4) == \
+        {(0, 1): 3, (0, 2): 3, (1, 2): 2, (0, 3): 1, (1, 3): 1, (2, 3): 1}
+    assert count_shared_fingerprints([{1}, {2}], set(), 2) == {}